@@ -26,6 +26,14 @@ data = {
 commit = project.commits.create(data)
 # end create
 
+# builder
+builder = project.commits.builder('master', 'Update vendored files')
+for name in os.listdir('vendor'):
+    builder.update('vendor/' + name, path=os.path.join('vendor', name))
+builder.delete('vendor/obsolete.py')
+commits = builder.submit()
+# end builder
+
 # get
 commit = project.commits.get('e3d5a71b')
 # end get
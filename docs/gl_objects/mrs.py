@@ -6,6 +6,19 @@ mrs = project.mergerequests.list()
 mrs = project.mergerequests.list(state='merged', order_by='updated_at')
 # end filtered list
 
+# group list
+mrs = group.mergerequests.list(state='opened')
+# end group list
+
+# fan out
+from gitlab import utils
+
+projects = gl.projects.list(all=True, membership=True)
+for project, mr in utils.fan_out(projects, 'mergerequests', workers=16,
+                                 state='opened'):
+    print(project.name, mr.title)
+# end fan out
+
 # get
 mr = project.mergerequests.get(mr_id)
 # end get
@@ -141,6 +141,18 @@ items = project.repository_tree()
 items = project.repository_tree(path='docs', ref='branch1')
 # end repository tree
 
+# repository walk
+# list all the files and folders of the repository
+items = project.repository_walk(ref='branch1')
+rst_files = [i['path'] for i in items if i['path'].endswith('.rst')]
+# end repository walk
+
+# repository mirror
+# download the docs folder in /tmp/docs, skipping the up-to-date files
+downloaded = project.repository_mirror('/tmp/docs', 'branch1', path='docs',
+                                       workers=16)
+# end repository mirror
+
 # repository blob
 items = project.repository_tree(path='docs', ref='branch1')
 file_info = p.repository_blob(items[0]['id'])
@@ -188,6 +200,13 @@ print(f.content)
 
 # get the decoded content
 print(f.decode())
+
+# decode the content by chunks, without a full copy in memory (v4)
+with open('/tmp/README.rst', 'wb') as fd:
+    f.decode(streamed=True, action=fd.write)
+
+# only get the content, using the raw endpoint (v4)
+content = project.files.get(file_path='README.rst', ref='master', raw=True)
 # end files get
 
 # files create
@@ -23,12 +23,15 @@ import inspect
 import itertools
 import json
 import re
+import time
 import warnings
 
 import requests
 import six
 
+import gitlab.base
 import gitlab.config
+import gitlab.utils
 from gitlab.const import *  # noqa
 from gitlab.exceptions import *  # noqa
 from gitlab.v3.objects import *  # noqa
@@ -68,12 +71,22 @@ class Gitlab(object):
         http_username (str): Username for HTTP authentication
         http_password (str): Password for HTTP authentication
         api_version (str): Gitlab API version to use (3 or 4)
+        session (requests.Session): HTTP session to use for the requests
+        transport (gitlab.transport.Transport): Transport used to send the
+            requests (API v4 only). Defaults to a
+            :class:`gitlab.transport.RequestsTransport` using `session`
+        identity_map (bool): If True, objects loaded several times are
+            deduplicated (API v4 only, see :class:`gitlab.base.IdentityMap`)
+        thread_safe (bool): If True and `transport` is not set, use a
+            :class:`gitlab.transport.ThreadLocalTransport` so that the client
+            can be shared by several threads (API v4 only)
     """
 
     def __init__(self, url, private_token=None, oauth_token=None, email=None,
                  password=None, ssl_verify=True, http_username=None,
                  http_password=None, timeout=None, api_version='3',
-                 session=None):
+                 session=None, identity_map=False, transport=None,
+                 thread_safe=False):
 
         self._api_version = str(api_version)
         self._server_version = self._server_revision = None
@@ -95,6 +108,22 @@ class Gitlab(object):
 
         #: Create a session object for requests
         self.session = session or requests.Session()
+        #: The transport used by :meth:`http_request`
+        self.transport = transport
+        if transport is None:
+            transports = importlib.import_module('gitlab.transport')
+            if thread_safe:
+                self.transport = transports.ThreadLocalTransport(self.session)
+            else:
+                self.transport = transports.RequestsTransport(self.session)
+
+        self._identity_map = None
+        if identity_map:
+            self._identity_map = gitlab.base.IdentityMap()
+        self._intern_table = None
+        self._hooks = {'request': [], 'response': [], 'error': []}
+        #: The request metrics (see :meth:`enable_metrics`)
+        self.metrics = None
 
         objects = importlib.import_module('gitlab.v%s.objects' %
                                           self._api_version)
@@ -306,14 +335,18 @@ class Gitlab(object):
         self.private_token = private_token if private_token else None
         self.oauth_token = oauth_token if oauth_token else None
 
+        # the headers are replaced, not modified, so that the requests sent
+        # by other threads copy a consistent dict
+        headers = self.headers.copy()
         if private_token:
-            self.headers["PRIVATE-TOKEN"] = private_token
-            if 'Authorization' in self.headers:
-                del self.headers["Authorization"]
+            headers["PRIVATE-TOKEN"] = private_token
+            if 'Authorization' in headers:
+                del headers["Authorization"]
         elif oauth_token:
-            self.headers['Authorization'] = "Bearer %s" % oauth_token
-            if "PRIVATE-TOKEN" in self.headers:
-                del self.headers["PRIVATE-TOKEN"]
+            headers['Authorization'] = "Bearer %s" % oauth_token
+            if "PRIVATE-TOKEN" in headers:
+                del headers["PRIVATE-TOKEN"]
+        self.headers = headers
 
     def set_credentials(self, email, password):
         """Sets the email/login and password for authentication.
@@ -342,6 +375,104 @@ class Gitlab(object):
         requests_log.setLevel(logging.DEBUG)
         requests_log.propagate = True
 
+    def add_hook(self, event, hook):
+        """Register a function called for each HTTP request.
+
+        The hooks receive a dict describing the request:
+
+        * ``verb``, ``url``: the request
+        * ``route``: the URL path without the variable parts (e.g.
+          ``/projects/:id/issues``)
+        * ``status``: the status code of the response
+        * ``bytes``: the size of the response body (None if unknown)
+        * ``retries``: the number of retries (rate limit)
+        * ``prep_time``: the time spent to prepare the request, the sum of
+          ``opts_time`` (headers and authentication), ``prepare_time``
+          (``requests`` preparation) and ``url_time`` (URL encoding)
+        * ``network_time``: the time spent waiting for the server
+        * ``json_time``: the time spent to decode the JSON data
+        * ``error``: the raised exception
+
+        The times are in seconds. While hooks are registered, the JSON
+        responses are decoded as soon as they are received.
+
+        Args:
+            event (str): 'request' (before the request is sent, only
+                ``verb``, ``url``, ``route`` and ``prep_time`` are set),
+                'response' (when a response is received) or 'error' (when
+                the request fails)
+            hook (callable): The function to call
+
+        Raises:
+            ValueError: If the event is unknown
+        """
+        if event not in self._hooks:
+            raise ValueError('Unknown hook event: %s' % event)
+        # copy-on-write, the list may be used by other threads
+        self._hooks[event] = self._hooks[event] + [hook]
+
+    def remove_hook(self, event, hook):
+        """Unregister a function registered with :meth:`add_hook`.
+
+        Args:
+            event (str): 'request', 'response' or 'error'
+            hook (callable): The function to remove
+        """
+        hooks = list(self._hooks[event])
+        hooks.remove(hook)
+        self._hooks[event] = hooks
+
+    @property
+    def _has_hooks(self):
+        return any(six.itervalues(self._hooks))
+
+    def _run_hooks(self, event, info):
+        for hook in self._hooks[event]:
+            hook(info)
+
+    def pmap(self, func, items, processes=None, chunksize=1, ordered=True):
+        """Apply ``func`` to every item using a pool of processes.
+
+        Use this for CPU-heavy processing of the API data. Each worker
+        process creates its own connection, with the URL, authentication and
+        options of this one (the session, transport and hooks are not
+        shared). The RESTObject items and results are sent as their class and
+        attributes, and rebuilt on the other side with the local connection.
+
+        Args:
+            func (callable): Function to call for each item (must be
+                picklable, e.g. a module level function)
+            items (iterable): Items to process
+            processes (int): Number of worker processes (defaults to the
+                number of CPUs)
+            chunksize (int): Number of items sent to a worker at once
+            ordered (bool): If False, the results are yielded as soon as
+                they are available
+
+        Returns:
+            generator: The results of the ``func`` calls
+        """
+        from gitlab import parallel
+        return parallel.pmap(self, func, items, processes=processes,
+                             chunksize=chunksize, ordered=ordered)
+
+    def enable_metrics(self, buckets=None):
+        """Collect latency histograms of the requests.
+
+        Args:
+            buckets (tuple): The upper bounds of the histogram buckets, in
+                seconds (defaults to :data:`gitlab.metrics.BUCKETS`)
+
+        Returns:
+            gitlab.metrics.Metrics: The metrics (also available as the
+                ``metrics`` attribute)
+        """
+        from gitlab import metrics
+        if self.metrics is None:
+            self.metrics = metrics.Metrics(buckets or metrics.BUCKETS)
+            self.add_hook('response', self.metrics.observe)
+        return self.metrics
+
     def _create_headers(self, content_type=None):
         request_headers = self.headers.copy()
         if content_type is not None:
@@ -652,7 +783,9 @@ class Gitlab(object):
             return '%s%s' % (self._url, path)
 
     def http_request(self, verb, path, query_data={}, post_data={},
-                     streamed=False, files=None, **kwargs):
+                     streamed=False, files=None, obey_rate_limit=True,
+                     max_retries=10, max_retry_wait=60,
+                     object_pairs_hook=None, **kwargs):
         """Make an HTTP request to the Gitlab server.
 
         Args:
@@ -664,6 +797,16 @@ class Gitlab(object):
             post_data (dict): Data to send in the body (will be converted to
                               json)
             streamed (bool): Whether the data should be streamed
+            obey_rate_limit (bool): Whether to wait and retry the request
+                when the server answers with a 429 status code (rate limit
+                reached). The Retry-After header is used if available
+            max_retries (int): Maximum number of retries (-1 means no limit)
+            max_retry_wait (float): Maximum total time to wait for the
+                retries, in seconds (None means no limit). The request is not
+                retried if the next delay would exceed it
+            object_pairs_hook (callable): The hook used when the hooks decode
+                the JSON response (see :func:`json.loads`), to decode it only
+                once if the caller uses the same hook
             **kwargs: Extra data to make the query (e.g. sudo, per_page, page)
 
         Returns:
@@ -678,10 +821,13 @@ class Gitlab(object):
             new_path = parsed.path.replace('.', '%2E')
             return parsed._replace(path=new_path).geturl()
 
+        clock = gitlab.utils.clock
+        start = clock()
         url = self._build_url(path)
         params = query_data.copy()
         params.update(kwargs)
         opts = self._get_session_opts(content_type='application/json')
+        opts_end = clock()
 
         # don't set the content-type header when uploading files
         if files is not None:
@@ -699,9 +845,56 @@ class Gitlab(object):
         req = requests.Request(verb, url, json=post_data, params=params,
                                files=files, **opts)
         prepped = self.session.prepare_request(req)
+        prepare_end = clock()
         prepped.url = sanitized_url(prepped.url)
-        result = self.session.send(prepped, stream=streamed, verify=verify,
-                                   timeout=timeout)
+
+        info = None
+        if self._has_hooks:
+            now = clock()
+            info = self._new_request_info(verb, prepped.url)
+            info['prep_time'] = now - start
+            info['opts_time'] = opts_end - start
+            info['prepare_time'] = prepare_end - opts_end
+            info['url_time'] = now - prepare_end
+            self._run_hooks('request', info)
+
+        retries = 0
+        waited = 0.0
+        network_time = 0.0
+        while True:
+            send_start = clock()
+            try:
+                result = self.transport.send(prepped, stream=streamed,
+                                             verify=verify, timeout=timeout)
+            except Exception as e:
+                if info is not None:
+                    info['error'] = e
+                    self._run_hooks('error', info)
+                raise
+            network_time += clock() - send_start
+
+            if (result.status_code == 429 and obey_rate_limit and
+                    (max_retries == -1 or retries < max_retries)):
+                wait_time = None
+                if 'Retry-After' in result.headers:
+                    wait_time = gitlab.utils.retry_after(
+                        result.headers['Retry-After'])
+                if wait_time is None:
+                    wait_time = 2 ** retries * 0.1
+                if (max_retry_wait is None or
+                        waited + wait_time <= max_retry_wait):
+                    retries += 1
+                    waited += wait_time
+                    time.sleep(wait_time)
+                    continue
+
+            break
+
+        if info is not None:
+            info['retries'] = retries
+            info['network_time'] = network_time
+            self._response_info(info, result, streamed, object_pairs_hook)
+            self._run_hooks('response', info)
 
         if 200 <= result.status_code < 300:
             return result
@@ -712,13 +905,64 @@ class Gitlab(object):
             error_message = result.content
 
         if result.status_code == 401:
-            raise GitlabAuthenticationError(response_code=result.status_code,
-                                            error_message=error_message,
-                                            response_body=result.content)
+            error = GitlabAuthenticationError(
+                response_code=result.status_code,
+                error_message=error_message,
+                response_body=result.content)
+        else:
+            error = GitlabHttpError(response_code=result.status_code,
+                                    error_message=error_message,
+                                    response_body=result.content)
+        if info is not None:
+            info['error'] = error
+            self._run_hooks('error', info)
+        raise error
+
+    def _new_request_info(self, verb, url):
+        from gitlab import metrics
+        return {
+            'verb': verb,
+            'url': url,
+            'route': metrics.route_template(url, self._url),
+            'status': None,
+            'bytes': None,
+            'retries': 0,
+            'prep_time': None,
+            'opts_time': None,
+            'prepare_time': None,
+            'url_time': None,
+            'network_time': None,
+            'json_time': None,
+            'error': None,
+        }
+
+    def _response_info(self, info, result, streamed, object_pairs_hook=None):
+        info['status'] = result.status_code
+        if streamed:
+            length = result.headers.get('Content-Length')
+            info['bytes'] = int(length) if length else None
+            return
+
+        info['bytes'] = len(result.content)
+        if 'json' not in result.headers.get('Content-Type', ''):
+            return
+
+        # Decode the data now to measure the time, the callers get the
+        # cached result
+        json_kwargs = {}
+        if object_pairs_hook is not None:
+            json_kwargs['object_pairs_hook'] = object_pairs_hook
+        json_start = gitlab.utils.clock()
+        try:
+            data = result.json(**json_kwargs)
+        except ValueError:
+            return
+        info['json_time'] = gitlab.utils.clock() - json_start
+        decode = result.json
 
-        raise GitlabHttpError(response_code=result.status_code,
-                              error_message=error_message,
-                              response_body=result.content)
+        def cached_json(**kwargs):
+            return data if kwargs == json_kwargs else decode(**kwargs)
+        result.json = cached_json
 
     def http_get(self, path, query_data={}, streamed=False, **kwargs):
         """Make a GET request to the Gitlab server.
@@ -751,13 +995,24 @@ class Gitlab(object):
         else:
             return result
 
-    def http_list(self, path, query_data={}, as_list=None, **kwargs):
+    def http_list(self, path, query_data={}, as_list=None,
+                  intern_strings=False, checkpoint=None, **kwargs):
         """Make a GET request to the Gitlab server for list-oriented queries.
 
         Args:
             path (str): Path or full URL to query ('/projects' or
                         'http://whatever/v4/api/projecs')
             query_data (dict): Data to send as query parameters
+            intern_strings (bool): If True, share the repeated keys and short
+                string values between the items to reduce memory usage (see
+                :class:`gitlab.utils.InternTable`)
+            checkpoint (str): A token returned by
+                :meth:`GitlabList.checkpoint`, to resume an interrupted
+                listing
+            on_checkpoint (callable): Function called with a checkpoint token
+                before each next page request
+            checkpoint_every (int): Number of pages between two calls of
+                `on_checkpoint`
             **kwargs: Extra data to make the query (e.g. sudo, per_page, page,
                       all)
 
@@ -766,7 +1021,12 @@ class Gitlab(object):
             False and no pagination-related arguments (`page`, `per_page`,
             `all`) are defined then a GitlabList object (generator) is returned
             instead. This object will make API calls when needed to fetch the
-            next items from the server.
+            next items from the server. When resuming from a checkpoint, a
+            GitlabList object is returned unless `all` is True.
+
+            Complete iterations (`all` or generator) of the collections
+            listed in ``KEYSET_PAGINATION`` use keyset pagination, unless a
+            page, a pagination mode or another order is requested.
 
         Raises:
             GitlabHttpError: When the return code is not 2xx
@@ -779,6 +1039,17 @@ class Gitlab(object):
         get_all = kwargs.get('all', False)
         url = self._build_url(path)
 
+        if intern_strings:
+            kwargs['intern_table'] = self._get_intern_table()
+
+        if checkpoint is not None:
+            obj = GitlabList.from_checkpoint(self, checkpoint, **kwargs)
+            return list(obj) if get_all is True else obj
+
+        paginated = 'page' in kwargs or 'per_page' in kwargs
+        if get_all is True or (as_list is False and not paginated):
+            query_data = self._keyset_query(url, query_data, kwargs)
+
         if get_all is True:
             return list(GitlabList(self, url, query_data, **kwargs))
 
@@ -790,6 +1061,29 @@ class Gitlab(object):
         # No pagination, generator requested
         return GitlabList(self, url, query_data, **kwargs)
 
+    def _keyset_query(self, url, query_data, kwargs):
+        # Use keyset pagination for the complete iterations of collections
+        # supporting it, if the caller didn't choose a pagination or order
+        path = url[len(self._url):] if url.startswith(self._url) else None
+        order_by = KEYSET_PAGINATION.get(path)
+        if order_by is None:
+            return query_data
+        options = dict(query_data, **kwargs)
+        if 'page' in options or 'pagination' in options:
+            return query_data
+        if options.get('order_by', order_by) != order_by:
+            return query_data
+        query_data = dict(query_data)
+        query_data['pagination'] = 'keyset'
+        query_data['order_by'] = order_by
+        return query_data
+
+    def _get_intern_table(self):
+        # shared by all the listings to dedupe strings between calls
+        if self._intern_table is None:
+            self._intern_table = gitlab.utils.InternTable()
+        return self._intern_table
+
     def http_post(self, path, query_data={}, post_data={}, files=None,
                   **kwargs):
         """Make a POST request to the Gitlab server.
@@ -863,21 +1157,52 @@ class Gitlab(object):
         return self.http_request('delete', path, **kwargs)
 
 
+#: The collections supporting keyset pagination, and the required order
+KEYSET_PAGINATION = {
+    '/projects': 'id',
+}
+
+
 class GitlabList(object):
     """Generator representing a list of remote objects.
 
     The object handles the links returned by a query to the API, and will call
     the API again when needed.
+
+    The position in the list can be saved with :meth:`checkpoint`, and
+    restored with :meth:`from_checkpoint`. If `on_checkpoint` is defined, it
+    is called with a checkpoint token every `checkpoint_every` pages, before
+    the next page is requested.
     """
 
-    def __init__(self, gl, url, query_data, get_next=True, **kwargs):
+    #: The http_request() arguments that are not query parameters
+    _REQUEST_OPTIONS = ('streamed', 'obey_rate_limit', 'max_retries',
+                        'max_retry_wait')
+
+    def __init__(self, gl, url, query_data, get_next=True, intern_table=None,
+                 on_checkpoint=None, checkpoint_every=1, **kwargs):
         self._gl = gl
+        self._intern_table = intern_table
+        # used for all the pages, but not saved in the checkpoints
+        self._request_options = dict((k, kwargs.pop(k))
+                                     for k in self._REQUEST_OPTIONS
+                                     if k in kwargs)
+        self._on_checkpoint = on_checkpoint
+        self._checkpoint_every = checkpoint_every
+        self._pages = 0
         self._query(url, query_data, **kwargs)
         self._get_next = get_next
 
     def _query(self, url, query_data={}, **kwargs):
+        hook = None
+        if self._intern_table is not None:
+            hook = self._intern_table.object_pairs_hook
         result = self._gl.http_request('get', url, query_data=query_data,
-                                       **kwargs)
+                                       object_pairs_hook=hook,
+                                       **dict(self._request_options, **kwargs))
+        # needed to request the page again when resuming from a checkpoint
+        self._url = url
+        self._params = dict(query_data, **kwargs)
         try:
             self._next_url = result.links['next']['url']
         except KeyError:
@@ -890,7 +1215,10 @@ class GitlabList(object):
         self._total = result.headers.get('X-Total')
 
         try:
-            self._data = result.json()
+            if hook is not None:
+                self._data = result.json(object_pairs_hook=hook)
+            else:
+                self._data = result.json()
         except Exception:
             raise GitlabParsingError(
                 error_message="Failed to parse the server message")
@@ -899,8 +1227,8 @@ class GitlabList(object):
 
     @property
     def current_page(self):
-        """The current page number."""
-        return int(self._current_page)
+        """The current page number, or None if unknown (keyset pagination)."""
+        return int(self._current_page) if self._current_page else None
 
     @property
     def prev_page(self):
@@ -920,24 +1248,39 @@ class GitlabList(object):
 
     @property
     def per_page(self):
-        """The number of items per page."""
-        return int(self._per_page)
+        """The number of items per page, or None if unknown."""
+        return int(self._per_page) if self._per_page else None
 
     @property
     def total_pages(self):
-        """The total number of pages."""
-        return int(self._total_pages)
+        """The total number of pages, or None if unknown.
+
+        GitLab doesn't count the items of large collections, and keyset
+        pagination doesn't provide the total.
+        """
+        return int(self._total_pages) if self._total_pages else None
 
     @property
     def total(self):
-        """The total number of items."""
-        return int(self._total)
+        """The total number of items, or None if unknown."""
+        return int(self._total) if self._total else None
 
     def __iter__(self):
         return self
 
     def __len__(self):
-        return int(self._total)
+        total = self.total
+        if total is None:
+            raise TypeError('The number of items is unknown (keyset '
+                            'pagination or large collection), see the total '
+                            'attribute')
+        return total
+
+    def __bool__(self):
+        # assume there are items if the total is unknown
+        return self._total is None or self.total > 0
+
+    __nonzero__ = __bool__
 
     def __next__(self):
         return self.next()
@@ -949,7 +1292,72 @@ class GitlabList(object):
             return item
         except IndexError:
             if self._next_url and self._get_next is True:
+                self._pages += 1
+                if (self._on_checkpoint is not None and
+                        self._pages % self._checkpoint_every == 0):
+                    self._on_checkpoint(self._make_checkpoint(
+                        self._next_url, {}, 0))
                 self._query(self._next_url)
                 return self.next()
 
             raise StopIteration
+
+    def _make_checkpoint(self, url, params, offset):
+        return json.dumps({'url': url, 'params': params, 'offset': offset},
+                          sort_keys=True)
+
+    def checkpoint(self):
+        """Return a token describing the position in the list.
+
+        The token is a string, which can be stored and used later with
+        :meth:`from_checkpoint` to continue the iteration from the same item.
+
+        Returns:
+            str: The checkpoint token
+        """
+        return self._make_checkpoint(self._url, self._params, self._current)
+
+    @classmethod
+    def from_checkpoint(cls, gl, token, **kwargs):
+        """Create a list positioned at a checkpoint.
+
+        The page holding the next item is requested again.
+
+        Args:
+            gl (Gitlab): The Gitlab connection
+            token (str): A token returned by :meth:`checkpoint`
+            **kwargs: Extra arguments for the list (e.g. on_checkpoint) and
+                the requests (e.g. obey_rate_limit, max_retries), which are
+                not saved in the token
+
+        Returns:
+            GitlabList: The list
+
+        Raises:
+            GitlabHttpError: When the return code is not 2xx
+            GitlabParsingError: If the json data could not be parsed
+        """
+        state = json.loads(token)
+        # the pagination parameters are already in the saved URL and query
+        for key in ('page', 'per_page', 'all'):
+            kwargs.pop(key, None)
+        obj = cls(gl, state['url'], state['params'], **kwargs)
+        obj._current = state['offset']
+        return obj
+
+    def to_columns(self, fields, parse_dates=(), as_numpy=False):
+        """Consume the remaining items and store them by columns.
+
+        See :func:`gitlab.export.to_columns` for details.
+
+        Args:
+            fields (list): The fields to extract
+            parse_dates (list): The fields to convert to timestamps
+            as_numpy (bool): If True, return a NumPy structured array
+
+        Returns:
+            dict or numpy.ndarray: The columns, indexed by field name
+        """
+        from gitlab import export
+        return export.to_columns(self, fields, parse_dates=parse_dates,
+                                 as_numpy=as_numpy)
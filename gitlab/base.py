@@ -20,8 +20,14 @@ import importlib
 import itertools
 import json
 import sys
+import threading
+import weakref
 
 import six
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 import gitlab
 from gitlab.exceptions import *  # noqa
@@ -568,6 +574,7 @@ class RESTObject(object):
 
     def __getstate__(self):
         state = self.__dict__.copy()
+        state.pop('_attributes_view', None)
         module = state.pop('_module')
         state['_module_name'] = module.__name__
         return state
@@ -575,7 +582,7 @@ class RESTObject(object):
     def __setstate__(self, state):
         module_name = state.pop('_module_name')
         self.__dict__.update(state)
-        self._module = importlib.import_module(module_name)
+        self.__dict__['_module'] = importlib.import_module(module_name)
 
     def __getattr__(self, name):
         try:
@@ -592,11 +599,16 @@ class RESTObject(object):
                 # method never push the new data to the server.
                 # See https://github.com/python-gitlab/python-gitlab/issues/306
                 #
+                # The copy is deep so that _attrs stays a snapshot of the
+                # server data: _get_changed_attrs() compares both to find the
+                # attributes that have really been modified.
+                #
                 # note: _parent_attrs will only store simple values (int) so we
                 # don't make this check in the next except block.
                 if isinstance(value, list):
-                    self.__dict__['_updated_attrs'][name] = value[:]
-                    return self.__dict__['_updated_attrs'][name]
+                    value = copy.deepcopy(value)
+                    self.__dict__['_updated_attrs'][name] = value
+                    return value
 
                 return value
 
@@ -636,6 +648,16 @@ class RESTObject(object):
         self.__dict__['_updated_attrs'] = {}
         self.__dict__['_attrs'].update(new_attrs)
 
+    def _get_changed_attrs(self):
+        """Returns the attributes modified since the server data was loaded.
+
+        Returns:
+            dict: The modified attributes and their new values
+        """
+        attrs = self.__dict__['_attrs']
+        return {k: v for k, v in six.iteritems(self.__dict__['_updated_attrs'])
+                if k not in attrs or attrs[k] != v}
+
     def get_id(self):
         """Returns the id of the resource."""
         if self._id_attr is None:
@@ -644,12 +666,170 @@ class RESTObject(object):
 
     @property
     def attributes(self):
-        d = self.__dict__['_updated_attrs'].copy()
-        d.update(self.__dict__['_attrs'])
-        d.update(self.__dict__['_parent_attrs'])
+        """Read-only view of the object attributes.
+
+        The view reads the object data on each access and doesn't copy it. Use
+        ``dict(obj.attributes)`` (or ``obj.attributes.copy()``) to get a dict.
+        """
+        try:
+            return self.__dict__['_attributes_view']
+        except KeyError:
+            view = _AttributesView(self.__dict__)
+            self.__dict__['_attributes_view'] = view
+            return view
+
+
+class _AttributesView(Mapping):
+    """Read-only mapping of the attributes of a RESTObject.
+
+    The keys are looked up in the parent, server and updated attributes, in
+    this order.
+    """
+    __slots__ = ('_data', )
+
+    def __init__(self, data):
+        # data is the __dict__ of the object, the attributes dicts can be
+        # replaced
+        self._data = data
+
+    def __getitem__(self, key):
+        data = self._data
+        attrs = data['_parent_attrs']
+        if key in attrs:
+            return attrs[key]
+        attrs = data['_attrs']
+        if key in attrs:
+            return attrs[key]
+        return data['_updated_attrs'][key]
+
+    def __contains__(self, key):
+        data = self._data
+        return (key in data['_parent_attrs'] or key in data['_attrs'] or
+                key in data['_updated_attrs'])
+
+    def __iter__(self):
+        data = self._data
+        attrs = data['_attrs']
+        parent_attrs = data['_parent_attrs']
+        updated_attrs = data['_updated_attrs']
+        if not parent_attrs and not updated_attrs:
+            # objects read from the server
+            return iter(attrs)
+        keys = [k for k in updated_attrs
+                if k not in attrs and k not in parent_attrs]
+        keys.extend(k for k in attrs if k not in parent_attrs)
+        keys.extend(parent_attrs)
+        return iter(keys)
+
+    def __len__(self):
+        data = self._data
+        return len(set(data['_updated_attrs']).union(data['_attrs'],
+                                                     data['_parent_attrs']))
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def copy(self):
+        """Returns the attributes as a new dict."""
+        data = self._data
+        d = data['_updated_attrs'].copy()
+        d.update(data['_attrs'])
+        d.update(data['_parent_attrs'])
         return d
 
 
+#: The nested attributes holding users, shared whatever their name
+_USER_ATTRIBUTES = frozenset(['assignee', 'assignees', 'author', 'closed_by',
+                              'merged_by', 'owner', 'user'])
+
+
+class _SharedDict(dict):
+    """A dict that can be weakly referenced."""
+
+
+class IdentityMap(object):
+    """Registry of the RESTObjects loaded through a Gitlab connection.
+
+    Objects are identified by their class, manager path and ID: loading an
+    already known object refreshes and returns the existing instance. Nested
+    dicts holding an ``id`` (users, milestones, namespaces...) are shared
+    between all the objects when they are found in attributes of the same
+    name (or holding users) and have the same keys and values. The shared dicts are never modified: a nested dict with new values
+    replaces the shared one for the next objects.
+
+    Only weak references are kept, unused objects are garbage collected
+    normally.
+    """
+
+    def __init__(self):
+        self._objects = weakref.WeakValueDictionary()
+        self._dicts = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # the registry is local to a process
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def _intern_dict(self, name, value):
+        # resources of different types can have the same ID and keys (users
+        # and namespaces for instance)
+        kind = 'user' if name in _USER_ATTRIBUTES else name
+        try:
+            key = (kind, tuple(sorted(value)), value['id'])
+            shared = self._dicts.get(key)
+        except TypeError:
+            # unhashable id, keep the dict as is
+            return value
+        if shared is None or shared != value:
+            # the objects holding the previous dict keep their data
+            shared = _SharedDict(value)
+            self._dicts[key] = shared
+        return shared
+
+    def _intern_value(self, name, value):
+        if isinstance(value, dict) and 'id' in value:
+            return self._intern_dict(name, value)
+        if isinstance(value, list):
+            return [self._intern_value(name, v) for v in value]
+        return value
+
+    def get(self, manager, obj_cls, attrs):
+        """Return the object matching the server data.
+
+        Args:
+            manager: the RESTManager to attach to the object
+            obj_cls: the class of the object
+            attrs (dict): the server data
+
+        Returns:
+            RESTObject: The known object refreshed with `attrs`, or a new
+                object
+        """
+        with self._lock:
+            for k, v in six.iteritems(attrs):
+                if isinstance(v, (dict, list)):
+                    attrs[k] = self._intern_value(k, v)
+
+            obj_id = attrs.get(obj_cls._id_attr) if obj_cls._id_attr else None
+            if obj_id is None:
+                return obj_cls(manager, attrs)
+
+            key = (obj_cls, manager.path, obj_id)
+            obj = self._objects.get(key)
+            if obj is None:
+                obj = obj_cls(manager, attrs)
+                self._objects[key] = obj
+            else:
+                obj._update_attrs(attrs)
+            return obj
+
+
 class RESTObjectList(object):
     """Generator object representing a list of RESTObject's.
 
@@ -685,12 +865,17 @@ class RESTObjectList(object):
     def __len__(self):
         return len(self._list)
 
+    def __bool__(self):
+        return bool(self._list)
+
+    __nonzero__ = __bool__
+
     def __next__(self):
         return self.next()
 
     def next(self):
         data = self._list.next()
-        return self._obj_cls(self.manager, data)
+        return self.manager._create_object(data, self._obj_cls)
 
     @property
     def current_page(self):
@@ -720,14 +905,42 @@ class RESTObjectList(object):
 
     @property
     def total_pages(self):
-        """The total number of pages."""
+        """The total number of pages, or None if unknown."""
         return self._list.total_pages
 
     @property
     def total(self):
-        """The total number of items."""
+        """The total number of items, or None if unknown."""
         return self._list.total
 
+    def checkpoint(self):
+        """Return a token describing the position in the list.
+
+        Use the token with the ``checkpoint`` argument of ``list()`` to
+        continue the iteration from the same item.
+
+        Returns:
+            str: The checkpoint token
+        """
+        return self._list.checkpoint()
+
+    def to_columns(self, fields, parse_dates=(), as_numpy=False):
+        """Consume the remaining items and store them by columns.
+
+        The data is read directly, no RESTObject is created. See
+        :func:`gitlab.export.to_columns` for details.
+
+        Args:
+            fields (list): The fields to extract
+            parse_dates (list): The fields to convert to timestamps
+            as_numpy (bool): If True, return a NumPy structured array
+
+        Returns:
+            dict or numpy.ndarray: The columns, indexed by field name
+        """
+        return self._list.to_columns(fields, parse_dates=parse_dates,
+                                     as_numpy=as_numpy)
+
 
 class RESTManager(object):
     """Base class for CRUD operations on objects.
@@ -757,6 +970,32 @@ class RESTManager(object):
     def parent_attrs(self):
         return self._parent_attrs
 
+    def _create_object(self, attrs, obj_cls=None):
+        """Build an object from server data.
+
+        If the Gitlab connection uses an identity map, the known objects are
+        reused.
+
+        Args:
+            attrs (dict): the server data
+            obj_cls: the class of the object (defaults to ``_obj_cls``)
+
+        Returns:
+            RESTObject: The object
+        """
+        obj_cls = obj_cls or self._obj_cls
+        profiler = getattr(self.gitlab, '_profiler', None)
+        if profiler is not None:
+            start = gitlab.utils.clock()
+        identity_map = getattr(self.gitlab, '_identity_map', None)
+        if identity_map is None:
+            obj = obj_cls(self, attrs)
+        else:
+            obj = identity_map.get(self, obj_cls, attrs)
+        if profiler is not None:
+            profiler.add_object(gitlab.utils.clock() - start)
+        return obj
+
     def _compute_path(self, path=None):
         self._parent_attrs = {}
         if path is None:
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Fetch only the items changed since the last poll (API v4 only)."""
+
+import json
+import os
+
+import six
+
+from gitlab import utils
+
+
+class MemoryStore(object):
+    """Keep the cursors in memory.
+
+    Stores must provide the ``get(key)`` and ``set(key, value)`` methods.
+    The values are JSON-serializable dicts.
+    """
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        """Return the value associated to a key, or None."""
+        return self._data.get(key)
+
+    def set(self, key, value):
+        """Associate a value to a key."""
+        self._data[key] = value
+
+
+class JSONFileStore(MemoryStore):
+    """Keep the cursors in a JSON file.
+
+    The file is rewritten each time a cursor is saved.
+
+    Args:
+        filename (str): The path of the file
+    """
+
+    def __init__(self, filename):
+        super(JSONFileStore, self).__init__()
+        self.filename = filename
+        if os.path.exists(filename):
+            with open(filename) as f:
+                self._data = json.load(f)
+
+    def set(self, key, value):
+        super(JSONFileStore, self).set(key, value)
+        with utils.atomic_write(self.filename) as f:
+            json.dump(self._data, f, sort_keys=True)
+
+
+class Cursor(object):
+    """Remember the position in a listing between polls.
+
+    With ``field='updated_at'`` (issues, merge requests, pipelines), the
+    listing is filtered with ``updated_after`` and sorted by update date. The
+    items updated at the exact time of the previous mark are returned by the
+    server again: they are skipped. The dates are compared as datetimes, so
+    the time zone and precision of the values can change.
+
+    With ``field='id'`` (events), the listing is read in descending order
+    until an item already seen is found.
+
+    Args:
+        manager: The manager to poll (e.g. ``project.issues``)
+        store: The cursor store (see :class:`MemoryStore`)
+        field (str): 'updated_at' or 'id'
+        key (str): The key of the cursor in the store (defaults to the
+            manager path and query)
+        **query: The filters of the listing
+    """
+
+    def __init__(self, manager, store, field='updated_at', key=None,
+                 **query):
+        if field not in ('updated_at', 'id'):
+            raise ValueError('Unsupported cursor field: %s' % field)
+        self.manager = manager
+        self.store = store
+        self.field = field
+        self.query = query
+        if key is None:
+            key = manager.path
+            if query:
+                key += '?' + six.moves.urllib.parse.urlencode(
+                    sorted(query.items()))
+        self.key = key
+        self._pending = None
+
+    @property
+    def mark(self):
+        """The high-water mark (``updated_at`` value or ID), or None."""
+        state = self.store.get(self.key)
+        return state['value'] if state else None
+
+    def _key(self, value):
+        # The comparable form of a mark
+        if self.field == 'updated_at':
+            return utils.parse_datetime(value)
+        return value
+
+    def _list(self, **kwargs):
+        kwargs.update(self.query)
+        return self.manager.list(as_list=False, **kwargs)
+
+    def _fetch(self, state):
+        if self.field == 'id':
+            for obj in self._list(sort='desc'):
+                if state is not None and obj.id <= state['value']:
+                    return
+                yield obj
+            return
+
+        kwargs = {'order_by': 'updated_at', 'sort': 'asc'}
+        if state is not None:
+            kwargs['updated_after'] = state['value']
+        seen = set(state['ids']) if state is not None else set()
+        mark = self._key(state['value']) if state is not None else None
+        for obj in self._list(**kwargs):
+            if mark is not None:
+                updated_at = self._key(obj.updated_at)
+                if updated_at < mark or (updated_at == mark and
+                                         obj.id in seen):
+                    continue
+            yield obj
+
+    def poll(self, commit=True):
+        """Return the items created or changed since the last poll.
+
+        Args:
+            commit (bool): If False, the cursor is not saved: call
+                :meth:`commit` once the items have been processed
+
+        Returns:
+            list: The new items (RESTObjects)
+
+        Raises:
+            GitlabListError: If the server cannot perform the request
+        """
+        state = self.store.get(self.key)
+        items = list(self._fetch(state))
+
+        value = state['value'] if state else None
+        key = self._key(value) if value is not None else None
+        ids = set(state['ids']) if state else set()
+        for obj in items:
+            obj_value = getattr(obj, self.field)
+            obj_key = self._key(obj_value)
+            if key is None or obj_key > key:
+                value, key = obj_value, obj_key
+                ids = set()
+            if obj_key == key:
+                ids.add(obj.id)
+
+        if value is not None:
+            if self.field == 'id':
+                ids = set()
+            self._pending = {'value': value, 'ids': sorted(ids)}
+        if commit:
+            self.commit()
+        return items
+
+    def commit(self):
+        """Save the position reached by the last poll."""
+        if self._pending is not None:
+            self.store.set(self.key, self._pending)
+            self._pending = None
+
+    def reset(self):
+        """Forget the position: the next poll returns all the items."""
+        self._pending = None
+        self.store.set(self.key, None)
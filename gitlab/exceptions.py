@@ -49,6 +49,10 @@ class GitlabConnectionError(GitlabError):
     pass
 
 
+class GitlabReplayError(GitlabConnectionError):
+    pass
+
+
 class GitlabOperationError(GitlabError):
     pass
 
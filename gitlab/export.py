@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Export listings without building RESTObjects (API v4 only)."""
+
+from __future__ import absolute_import
+import array
+import calendar
+import csv
+import gzip
+import json
+import os
+
+import six
+
+import gitlab
+from gitlab import exceptions as exc
+from gitlab import utils
+
+
+# 'q' (long long) is not available with python 2
+_INT_TYPECODE = 'q' if six.PY3 else 'l'
+
+
+def parse_date(value):
+    """Convert a GitLab date or datetime string to a UTC timestamp.
+
+    Args:
+        value (str): The date (e.g. '2017-11-03' or
+            '2017-11-03T10:00:00.000Z')
+
+    Returns:
+        float: The number of seconds since the epoch, or None if `value` is
+            None
+
+    Raises:
+        ValueError: If the value is not a valid date
+    """
+    if value is None:
+        return None
+    dt = utils.parse_datetime(value)
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+
+
+def get_field(item, field):
+    """Return the value of a field, following dots in nested dicts.
+
+    Args:
+        item (dict): The data
+        field (str): The field name (e.g. 'author.username')
+
+    Returns:
+        The value, or None if the field doesn't exist
+    """
+    for part in field.split('.'):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(part)
+    return item
+
+
+class _Column(object):
+    """Column using a typed array as long as the values allow it."""
+
+    def __init__(self):
+        self.kind = None
+        self.values = []
+        self._len = 0
+
+    def _to_list(self):
+        if self.kind in ('int', 'float', 'date'):
+            self.values = self.values.tolist()
+            if self.kind == 'date':
+                self.values = [None if v != v else v for v in self.values]
+        self.kind = 'object'
+
+    def append(self, value, is_date=False):
+        if self.kind is None and value is not None:
+            # the first value defines the type of the column
+            if is_date:
+                self.kind = 'date'
+                values = array.array('d', [float('nan')] * self._len)
+            elif isinstance(value, bool):
+                self.kind = 'bool'
+                values = [None] * self._len
+            elif isinstance(value, six.integer_types) and self._len == 0:
+                self.kind = 'int'
+                values = array.array(_INT_TYPECODE)
+            elif isinstance(value, float) and self._len == 0:
+                self.kind = 'float'
+                values = array.array('d')
+            else:
+                self.kind = 'object'
+                values = self.values
+            self.values = values
+
+        if self.kind == 'date':
+            value = parse_date(value)
+            self.values.append(float('nan') if value is None else value)
+        elif self.kind == 'int':
+            if (isinstance(value, six.integer_types) and
+                    not isinstance(value, bool)):
+                self.values.append(value)
+            else:
+                self._to_list()
+                self.values.append(value)
+        elif self.kind == 'float':
+            if isinstance(value, (float, six.integer_types)):
+                self.values.append(value)
+            else:
+                self._to_list()
+                self.values.append(value)
+        else:
+            self.values.append(value)
+        self._len += 1
+
+
+_NUMPY_DTYPES = {
+    'int': 'i8',
+    'float': 'f8',
+    'date': 'datetime64[ms]',
+    'bool': 'O',
+    'object': 'O',
+    None: 'O',
+}
+
+
+def to_columns(items, fields, parse_dates=(), as_numpy=False):
+    """Store the items of a listing by columns.
+
+    The items are consumed one by one, without building RESTObjects, so
+    listing generators can be used to process large listings.
+
+    Integer, float and date columns are stored in typed arrays
+    (``array.array``). Other columns, and columns with missing or mixed
+    values, are stored in lists. Dates are stored as UTC timestamps, NaN
+    meaning no date.
+
+    Args:
+        items (iterable): The data (dicts), for instance a GitlabList
+        fields (list): The fields to extract ('author.username' gets the
+            username in the author dict)
+        parse_dates (list): The fields to convert to timestamps
+        as_numpy (bool): If True, return a NumPy structured array (requires
+            NumPy)
+
+    Returns:
+        dict or numpy.ndarray: The columns, indexed by field name
+    """
+    columns = [(field, _Column(), field in parse_dates) for field in fields]
+    for item in items:
+        for field, column, is_date in columns:
+            column.append(get_field(item, field), is_date)
+
+    if not as_numpy:
+        return dict((field, column.values) for field, column, _ in columns)
+
+    import numpy
+
+    count = columns[0][1]._len if columns else 0
+    dtype = [(str(field), _NUMPY_DTYPES[column.kind])
+             for field, column, _ in columns]
+    result = numpy.empty(count, dtype=dtype)
+    for field, column, _ in columns:
+        values = column.values
+        if column.kind == 'date':
+            ms = numpy.asarray(values) * 1000
+            values = numpy.where(
+                numpy.isnan(ms), numpy.datetime64('NaT', 'ms'),
+                numpy.nan_to_num(ms).astype('i8').astype('datetime64[ms]'))
+        result[str(field)] = values
+    return result
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif not isinstance(value, six.string_types):
+        value = str(value)
+    if six.PY2 and isinstance(value, six.text_type):
+        value = value.encode('utf-8')
+    return value
+
+
+def _format_page(items, format, fields, header=False):
+    buf = six.StringIO()
+    if format == 'csv':
+        writer = csv.writer(buf, lineterminator='\n')
+        if header:
+            writer.writerow([_csv_value(field) for field in fields])
+        for item in items:
+            writer.writerow([_csv_value(get_field(item, field))
+                             for field in fields])
+    else:
+        for item in items:
+            if fields:
+                item = dict((field, get_field(item, field))
+                            for field in fields)
+            buf.write(json.dumps(item, sort_keys=True))
+            buf.write('\n')
+    data = buf.getvalue()
+    if isinstance(data, six.text_type):
+        data = data.encode('utf-8')
+    return data
+
+
+def _compress(data):
+    buf = six.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _write_state(filename, state):
+    with utils.atomic_write(filename) as f:
+        json.dump(state, f)
+
+
+@exc.on_http_error(exc.GitlabListError)
+def export(manager, filename, format='csv', fields=None, compress=False,
+           resume=False, per_page=100, **kwargs):
+    """Write the items of a listing to a CSV or NDJSON file.
+
+    The pages are written as soon as they are received, so the memory usage
+    doesn't depend on the size of the listing. After each page the position
+    in the listing is saved in a ``<filename>.state`` file, which is removed
+    when the export is complete. If the export is interrupted, call the
+    function again with ``resume=True`` to continue from the last complete
+    page.
+
+    When `compress` is True, each page is written as a gzip member: the
+    result is a valid gzip file which can be resumed.
+
+    Args:
+        manager: The manager to export (must support listing)
+        filename (str): The output file
+        format (str): 'csv' or 'json' (one JSON document per line)
+        fields (list): The fields to export ('author.username' gets the
+            username in the author dict). Required for CSV if the first
+            item doesn't provide all the columns
+        compress (bool): If True, gzip the output
+        resume (bool): If True, continue an interrupted export
+        per_page (int): Number of items to retrieve per request
+        **kwargs: Extra options to send to the server (e.g. filters)
+
+    Returns:
+        int: The number of exported items
+
+    Raises:
+        GitlabListError: If the server cannot perform the request
+        ValueError: If the format is unknown
+    """
+    if format not in ('csv', 'json'):
+        raise ValueError('Unknown export format: %s' % format)
+
+    state_file = filename + '.state'
+    state = None
+    if resume and os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+
+    if state is None:
+        url = manager.gitlab._build_url(manager.path)
+        kwargs['per_page'] = per_page
+        lst = gitlab.GitlabList(manager.gitlab, url, {}, **kwargs)
+        fp = open(filename, 'wb')
+        count = 0
+    else:
+        # the next URL already holds the filters
+        fields = state['fields']
+        count = state['count']
+        lst = gitlab.GitlabList(manager.gitlab, state['next_url'], {})
+        fp = open(filename, 'r+b')
+        fp.truncate(state['offset'])
+        fp.seek(state['offset'])
+
+    header = state is None
+    with fp:
+        while True:
+            items = lst._data
+            if fields is None and format == 'csv':
+                fields = list(items[0].keys()) if items else []
+            data = _format_page(items, format, fields,
+                                header=header and bool(fields))
+            header = False
+            if compress and data:
+                data = _compress(data)
+            fp.write(data)
+            fp.flush()
+            count += len(items)
+
+            if lst._next_url is None:
+                break
+            _write_state(state_file, {'next_url': lst._next_url,
+                                      'offset': fp.tell(),
+                                      'fields': fields,
+                                      'count': count})
+            lst._query(lst._next_url)
+
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    return count
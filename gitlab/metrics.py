@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Request instrumentation and latency metrics."""
+
+import bisect
+import json
+import re
+import threading
+
+import six
+
+
+#: The upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_RE = re.compile(r'^(\d+|.*%[0-9A-Fa-f]{2}.*)$')
+
+#: The collections of the API: the segment following one of them is an ID
+#: (number, name, SHA, path...)
+COLLECTIONS = frozenset([
+    'access_requests', 'artifacts', 'award_emoji', 'blobs', 'boards',
+    'branches', 'broadcast_messages', 'comments', 'commits',
+    'custom_attributes', 'deploy_keys', 'deployments', 'discussions',
+    'dockerfiles', 'emails', 'environments', 'events', 'files',
+    'gitignores', 'gitlab_ci_ymls', 'gpg_keys', 'groups', 'hooks', 'issues',
+    'jobs', 'keys', 'labels', 'licenses', 'lists', 'members',
+    'merge_requests', 'milestones', 'namespaces', 'notes', 'pipelines',
+    'projects', 'protected_branches', 'runners', 'services', 'snippets',
+    'statuses', 'subgroups', 'tags', 'todos', 'triggers', 'users',
+    'variables', 'versions', 'wikis',
+])
+
+
+def route_template(url, base_url=''):
+    """Return the route of a URL, without the variable parts.
+
+    The path segments following a collection name (see :data:`COLLECTIONS`),
+    and the numeric or URL-encoded ones are replaced by ``:id``, and the query
+    string is removed. For example
+    ``http://gitlab/api/v4/projects/12/repository/commits/ed899a2f?page=2``
+    becomes ``/projects/:id/repository/commits/:id``.
+
+    Args:
+        url (str): The URL (or path) of the request
+        base_url (str): The API URL, removed from the route
+
+    Returns:
+        str: The route
+    """
+    path = six.moves.urllib.parse.urlparse(url).path
+    base_path = six.moves.urllib.parse.urlparse(base_url).path
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    route = []
+    previous = None
+    for segment in path.split('/'):
+        if segment and (_ID_RE.match(segment) or
+                        (previous in COLLECTIONS and
+                         segment not in COLLECTIONS)):
+            route.append(':id')
+        else:
+            route.append(segment)
+        previous = segment
+    return '/'.join(route)
+
+
+class Histogram(object):
+    """Latency histogram with cumulative buckets (Prometheus style)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add a value to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Return the (upper bound, cumulative count) tuples.
+
+        The last bound is ``float('inf')``.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'), ), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics(object):
+    """In-process latency metrics for the requests sent to the server.
+
+    The requests are grouped by verb, route template and status code. Use
+    :meth:`gitlab.Gitlab.enable_metrics` to collect them.
+
+    Args:
+        buckets (tuple): The upper bounds of the histogram buckets
+    """
+
+    #: The measured timings, see :meth:`gitlab.Gitlab.add_hook`
+    TIMINGS = ('prep_time', 'network_time', 'json_time')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget all the observations."""
+        #: {(verb, route, status): {timing: Histogram}}
+        self.histograms = {}
+        #: {(verb, route, status): received bytes}
+        self.bytes = {}
+
+    def observe(self, info):
+        """Record a request (a 'response' hook).
+
+        Args:
+            info (dict): The request information
+        """
+        key = (info['verb'].upper(), info['route'], info['status'])
+        with self._lock:
+            histograms = self.histograms.get(key)
+            if histograms is None:
+                histograms = dict((t, Histogram(self.buckets))
+                                  for t in self.TIMINGS)
+                self.histograms[key] = histograms
+                self.bytes[key] = 0
+            for timing in self.TIMINGS:
+                if info.get(timing) is not None:
+                    histograms[timing].observe(info[timing])
+            self.bytes[key] += info.get('bytes') or 0
+
+    def as_dict(self):
+        """Return the metrics as a JSON-serializable dict.
+
+        Returns:
+            dict: A list of series, with the labels, bytes count and the
+                count, sum and buckets of each timing
+        """
+        series = []
+        with self._lock:
+            for key in sorted(self.histograms, key=str):
+                verb, route, status = key
+                item = {'verb': verb, 'route': route, 'status': status,
+                        'bytes': self.bytes[key]}
+                for timing, histogram in six.iteritems(self.histograms[key]):
+                    item[timing] = {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'buckets': [['+Inf' if b == float('inf') else b, c]
+                                    for b, c in histogram.cumulative()],
+                    }
+                series.append(item)
+        return {'series': series}
+
+    def to_json(self):
+        """Return the metrics as a JSON document."""
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+    def to_prometheus(self, prefix='gitlab_client'):
+        """Return the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): The prefix of the metric names
+
+        Returns:
+            str: The metrics
+        """
+        lines = []
+        data = self.as_dict()['series']
+        for timing in self.TIMINGS:
+            name = '%s_%s_seconds' % (prefix, timing.replace('_time', ''))
+            lines.append('# TYPE %s histogram' % name)
+            for item in data:
+                labels = 'verb="%s",route="%s",status="%s"' % (
+                    item['verb'], item['route'], item['status'])
+                histogram = item[timing]
+                for bound, count in histogram['buckets']:
+                    lines.append('%s_bucket{%s,le="%s"} %d' %
+                                 (name, labels, bound, count))
+                lines.append('%s_sum{%s} %r' %
+                             (name, labels, histogram['sum']))
+                lines.append('%s_count{%s} %d' %
+                             (name, labels, histogram['count']))
+        name = '%s_response_bytes_total' % prefix
+        lines.append('# TYPE %s counter' % name)
+        for item in data:
+            lines.append('%s{verb="%s",route="%s",status="%s"} %d' %
+                         (name, item['verb'], item['route'], item['status'],
+                          item['bytes']))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Local SQLite mirror of the instance metadata (API v4 only).
+
+The projects, groups, users, members and labels are stored as JSON documents,
+and can be queried without sending requests to the server:
+
+.. code-block:: python
+
+   from gitlab import mirror
+
+   m = mirror.Mirror(gl, 'gitlab.db')
+   m.sync()
+   projects = m.find('projects', {'namespace.id': 12,
+                                  'issues_enabled': True})
+   users = m.find('users', {'created_at__gt': '2017-10-01'})
+"""
+
+import json
+import sqlite3
+
+import six
+
+
+#: The tables and their key columns
+TABLES = {
+    'projects': ('id', ),
+    'groups': ('id', ),
+    'users': ('id', ),
+    'members': ('source_type', 'source_id', 'id'),
+    'labels': ('project_id', 'name'),
+}
+
+_OPERATORS = {
+    'gt': '>',
+    'ge': '>=',
+    'lt': '<',
+    'le': '<=',
+    'ne': '!=',
+    'like': 'LIKE',
+}
+
+
+class Mirror(object):
+    """A local copy of the projects, groups, users, members and labels.
+
+    The first :meth:`sync` fetches everything. The next ones only fetch the
+    projects with a recent activity (``last_activity_after``) and the new
+    users (``created_after``), and refresh the members and labels of the
+    updated projects. Groups are small and always listed completely, and the
+    members of the new groups and of the groups of the updated projects are
+    refreshed.
+
+    Incremental synchronizations can't detect deleted or modified users,
+    deleted projects, and the membership changes of the groups without
+    project activity: use ``sync(full=True)`` from time to time to get an
+    exact copy.
+
+    Args:
+        gl (Gitlab): The connection to the server
+        database (str): The SQLite database file (in memory by default)
+    """
+
+    def __init__(self, gl, database=':memory:'):
+        self.gitlab = gl
+        self._db = sqlite3.connect(database)
+        with self._db:
+            for table, keys in six.iteritems(TABLES):
+                columns = ', '.join('%s NOT NULL' % key for key in keys)
+                self._db.execute('CREATE TABLE IF NOT EXISTS %s (%s, data '
+                                 'TEXT NOT NULL, PRIMARY KEY (%s))' %
+                                 (table, columns, ', '.join(keys)))
+            self._db.execute('CREATE TABLE IF NOT EXISTS sync_state '
+                             '(resource TEXT PRIMARY KEY, value TEXT)')
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def _get_state(self, resource):
+        row = self._db.execute('SELECT value FROM sync_state '
+                               'WHERE resource = ?', (resource, )).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, resource, value):
+        self._db.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?)',
+                         (resource, value))
+
+    def _store(self, table, items, scope=None, prune=False):
+        # Insert or replace the items. If prune is True, delete the rows of
+        # the scope (a dict of key values) that were not received
+        keys = TABLES[table]
+        sql = 'INSERT OR REPLACE INTO %s VALUES (%s)' % (
+            table, ', '.join('?' * (len(keys) + 1)))
+        scope = scope or {}
+        seen = set()
+        count = 0
+        for data in items:
+            data = data.copy()
+            data.update(scope)
+            row = tuple(data[key] for key in keys)
+            self._db.execute(sql, row + (json.dumps(data), ))
+            seen.add(row)
+            count += 1
+
+        if prune:
+            where = ' AND '.join('%s = ?' % k for k in sorted(scope)) or '1'
+            params = tuple(scope[k] for k in sorted(scope))
+            cursor = self._db.execute('SELECT %s FROM %s WHERE %s' %
+                                      (', '.join(keys), table, where), params)
+            for row in [r for r in cursor if tuple(r) not in seen]:
+                self._db.execute('DELETE FROM %s WHERE %s' % (
+                    table, ' AND '.join('%s = ?' % k for k in keys)), row)
+        return count
+
+    def _list(self, manager, ids=None, **kwargs):
+        # The IDs of the listed items are added to ids
+        for obj in manager.list(as_list=False, **kwargs):
+            if ids is not None:
+                ids.append(obj.get_id())
+            yield obj.attributes
+
+    def _sync_incremental(self, manager, table, state_attr, filter, full):
+        high_water = None if full else self._get_state(table)
+        kwargs = {}
+        if high_water is not None:
+            kwargs[filter] = high_water
+
+        ids = []
+        count = self._store(table, self._list(manager, ids, **kwargs),
+                            prune=high_water is None)
+        cursor = self._db.execute('SELECT MAX(json_extract(data, ?)) FROM %s'
+                                  % table, ('$.' + state_attr, ))
+        self._set_state(table, cursor.fetchone()[0])
+        return count, ids
+
+    def _namespaces(self, project_ids):
+        # Return the namespace IDs of the stored projects
+        for project_id in project_ids:
+            row = self._db.execute('SELECT json_extract(data, ?) FROM '
+                                   'projects WHERE id = ?',
+                                   ('$.namespace.id', project_id)).fetchone()
+            if row and row[0] is not None:
+                yield row[0]
+
+    def _sync_children(self, parents, name, table, scope_key, scope=None):
+        count = 0
+        for parent in parents:
+            values = dict(scope or {})
+            values[scope_key] = parent.id
+            count += self._store(table, self._list(getattr(parent, name)),
+                                 scope=values, prune=True)
+        return count
+
+    def sync(self, full=False):
+        """Update the mirror.
+
+        Args:
+            full (bool): If True, fetch all the data even if the mirror has
+                already been synchronized
+
+        Returns:
+            dict: The number of received items for each table
+
+        Raises:
+            GitlabListError: If the server cannot perform a request
+        """
+        gl = self.gitlab
+        result = {}
+        with self._db:
+            known_groups = set(r[0] for r in
+                               self._db.execute('SELECT id FROM groups'))
+            group_ids = []
+            result['groups'] = self._store('groups',
+                                           self._list(gl.groups, group_ids),
+                                           prune=True)
+
+            result['projects'], project_ids = self._sync_incremental(
+                gl.projects, 'projects', 'last_activity_at',
+                'last_activity_after', full)
+            result['users'], _ = self._sync_incremental(
+                gl.users, 'users', 'created_at', 'created_after', full)
+
+            projects = [gl.projects.get(i, lazy=True) for i in project_ids]
+            if not full:
+                # new groups and groups of the updated projects
+                updated = set(self._namespaces(project_ids))
+                group_ids = [i for i in group_ids
+                             if i not in known_groups or i in updated]
+            groups = [gl.groups.get(i, lazy=True) for i in group_ids]
+            result['members'] = (
+                self._sync_children(projects, 'members', 'members',
+                                    'source_id', {'source_type': 'project'}) +
+                self._sync_children(groups, 'members', 'members',
+                                    'source_id', {'source_type': 'group'}))
+            result['labels'] = self._sync_children(projects, 'labels',
+                                                   'labels', 'project_id')
+
+            # remove the children of deleted parents
+            self._db.execute("DELETE FROM members WHERE source_type = "
+                             "'project' AND source_id NOT IN "
+                             "(SELECT id FROM projects)")
+            self._db.execute("DELETE FROM members WHERE source_type = "
+                             "'group' AND source_id NOT IN "
+                             "(SELECT id FROM groups)")
+            self._db.execute('DELETE FROM labels WHERE project_id NOT IN '
+                             '(SELECT id FROM projects)')
+        return result
+
+    def last_sync(self, table):
+        """Return the synchronization high-water mark of a table.
+
+        Args:
+            table (str): 'projects' or 'users'
+
+        Returns:
+            str: The most recent ``last_activity_at`` (projects) or
+                ``created_at`` (users) value, or None
+        """
+        return self._get_state(table)
+
+    def _expression(self, table, field, params):
+        if field in TABLES[table]:
+            return field
+        params.append('$.' + field)
+        return 'json_extract(data, ?)'
+
+    def find(self, table, filters=None, order_by=None, limit=None):
+        """Search the mirror.
+
+        The filters are matched against the attributes of the items. Use dots
+        for nested attributes (e.g. ``namespace.id``), and add a ``__gt``,
+        ``__ge``, ``__lt``, ``__le``, ``__ne`` or ``__like`` suffix to use
+        another comparison than the equality.
+
+        Args:
+            table (str): 'projects', 'groups', 'users', 'members' (the
+                ``source_type`` and ``source_id`` attributes identify the
+                project or group) or 'labels' (use ``project_id``)
+            filters (dict): The attributes to match
+            order_by (str): The attribute to sort by
+            limit (int): The maximum number of items to return
+
+        Returns:
+            list: The items (dicts)
+
+        Raises:
+            ValueError: If the table is unknown
+        """
+        if table not in TABLES:
+            raise ValueError('Unknown table: %s' % table)
+
+        params = []
+        conditions = []
+        for key, value in sorted(six.iteritems(filters or {})):
+            field, op = key, '='
+            if '__' in key:
+                field, suffix = key.rsplit('__', 1)
+                op = _OPERATORS.get(suffix)
+                if op is None:
+                    field, op = key, '='
+            expression = self._expression(table, field, params)
+            if value is None:
+                op = 'IS NOT' if op == '!=' else 'IS'
+            conditions.append('%s %s ?' % (expression, op))
+            params.append(value)
+
+        sql = 'SELECT data FROM %s' % table
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if order_by is not None:
+            sql += ' ORDER BY ' + self._expression(table, order_by, params)
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [json.loads(row[0]) for row in self._db.execute(sql, params)]
+
+    def get(self, table, id):
+        """Return an item of the mirror.
+
+        Args:
+            table (str): 'projects', 'groups' or 'users'
+            id (int): The ID of the item
+
+        Returns:
+            dict: The item, or None if it is unknown
+        """
+        result = self.find(table, {'id': id})
+        return result[0] if result else None
@@ -46,7 +46,7 @@ class GetMixin(object):
         if lazy is True:
             return self._obj_cls(self, {self._obj_cls._id_attr: id})
         server_data = self.gitlab.http_get(path, **kwargs)
-        return self._obj_cls(self, server_data)
+        return self._create_object(server_data)
 
 
 class GetWithoutIdMixin(object):
@@ -65,7 +65,7 @@ class GetWithoutIdMixin(object):
             GitlabGetError: If the server cannot perform the request
         """
         server_data = self.gitlab.http_get(self.path, **kwargs)
-        return self._obj_cls(self, server_data)
+        return self._create_object(server_data)
 
 
 class ListMixin(object):
@@ -79,6 +79,12 @@ class ListMixin(object):
             page (int): ID of the page to return (starts with page 1)
             as_list (bool): If set to False and no pagination option is
                 defined, return a generator instead of a list
+            checkpoint (str): Resume the listing from a checkpoint token
+                (see :meth:`RESTObjectList.checkpoint`)
+            on_checkpoint (callable): Function called with a checkpoint token
+                before the next pages are requested
+            checkpoint_every (int): Number of pages between two calls of
+                `on_checkpoint`
             **kwargs: Extra options to send to the Gitlab server (e.g. sudo)
 
         Returns:
@@ -93,7 +99,7 @@ class ListMixin(object):
         path = kwargs.pop('path', self.path)
         obj = self.gitlab.http_list(path, **kwargs)
         if isinstance(obj, list):
-            return [self._obj_cls(self, item) for item in obj]
+            return [self._create_object(item) for item in obj]
         else:
             return base.RESTObjectList(self, self._obj_cls, obj)
 
@@ -168,7 +174,7 @@ class CreateMixin(object):
         # Handle specific URL for creation
         path = kwargs.pop('path', self.path)
         server_data = self.gitlab.http_post(path, post_data=data, **kwargs)
-        return self._obj_cls(self, server_data)
+        return self._create_object(server_data)
 
 
 class UpdateMixin(object):
@@ -252,20 +258,27 @@ class NoUpdateMixin(GetMixin, ListMixin, CreateMixin, DeleteMixin):
 class SaveMixin(object):
     """Mixin for RESTObject's that can be updated."""
     def _get_updated_data(self):
+        changed_attrs = self._get_changed_attrs()
+        if not changed_attrs:
+            # Nothing to send
+            return {}
+
         updated_data = {}
         required, optional = self.manager.get_update_attrs()
         for attr in required:
-            # Get everything required, no matter if it's been updated
+            # Get everything required by the API, no matter if it's been
+            # updated
             updated_data[attr] = getattr(self, attr)
         # Add the updated attributes
-        updated_data.update(self._updated_attrs)
+        updated_data.update(changed_attrs)
 
         return updated_data
 
     def save(self, **kwargs):
         """Save the changes made to the object to the server.
 
-        The object is updated to match what the server returns.
+        The object is updated to match what the server returns. No request is
+        made if no attribute has been modified.
 
         Args:
             **kwargs: Extra options to send to the server (e.g. sudo)
@@ -275,6 +288,8 @@ class SaveMixin(object):
             GitlabUpdateError: If the server cannot perform the request
         """
         updated_data = self._get_updated_data()
+        if not updated_data:
+            return
 
         # call the manager
         obj_id = self.get_id()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Process the API objects in worker processes (API v4 only).
+
+See :meth:`gitlab.Gitlab.pmap`. Pickling a :class:`~gitlab.base.RESTObject`
+also pickles its manager, its parent objects and the connection. Instead, the
+workers receive a description of the connection once, build their own
+``Gitlab`` object, and the objects are sent as payloads holding only their
+class and attributes.
+"""
+
+import collections
+import importlib
+import multiprocessing
+
+import gitlab
+from gitlab import base
+
+
+#: The Gitlab attributes sent to the workers
+SPEC_ATTRIBUTES = ('private_token', 'oauth_token', 'email', 'password',
+                   'ssl_verify', 'timeout', 'http_username', 'http_password',
+                   'api_version')
+
+# The connection of a worker process
+_worker_gitlab = None
+
+_Payload = collections.namedtuple('_Payload', ['obj_cls', 'manager_cls',
+                                               'parent_attrs', 'attrs',
+                                               'updated_attrs'])
+
+
+def client_spec(gl):
+    """Return the description of a connection.
+
+    Args:
+        gl (Gitlab): The connection
+
+    Returns:
+        dict: The URL, authentication and options of the connection
+    """
+    spec = dict((attr, getattr(gl, attr)) for attr in SPEC_ATTRIBUTES)
+    spec['url'] = gl._url.rsplit('/api/v', 1)[0]
+    return spec
+
+
+def client_from_spec(spec):
+    """Create a connection from its description.
+
+    Args:
+        spec (dict): The value returned by :func:`client_spec`
+
+    Returns:
+        Gitlab: The connection
+    """
+    return gitlab.Gitlab(**spec)
+
+
+def _class_path(cls):
+    return cls.__module__, cls.__name__
+
+
+def _load_class(path):
+    module, name = path
+    return getattr(importlib.import_module(module), name)
+
+
+def pack(item):
+    """Return a lightweight payload for a RESTObject.
+
+    The other values are returned unchanged.
+
+    Args:
+        item: The value to pack
+
+    Returns:
+        The payload: a tuple holding the object and manager classes, the
+            manager parent attributes and the object attributes
+    """
+    if not isinstance(item, base.RESTObject):
+        return item
+    attrs = item.__dict__
+    return _Payload(_class_path(type(item)), _class_path(type(item.manager)),
+                    item.manager.parent_attrs, attrs['_attrs'],
+                    attrs['_updated_attrs'])
+
+
+def unpack(payload, gl):
+    """Rebuild a RESTObject from a payload returned by :func:`pack`.
+
+    Args:
+        payload: The value to unpack
+        gl (Gitlab): The connection of the object
+
+    Returns:
+        The object, or the unchanged value if it's not a payload
+    """
+    if not isinstance(payload, _Payload):
+        return payload
+    manager = _load_class(payload.manager_cls)(gl)
+    if payload.parent_attrs:
+        manager._parent_attrs = payload.parent_attrs
+        manager._computed_path = manager._path % payload.parent_attrs
+    obj = _load_class(payload.obj_cls)(manager, payload.attrs)
+    obj.__dict__['_updated_attrs'].update(payload.updated_attrs)
+    return obj
+
+
+def _init_worker(spec):
+    global _worker_gitlab
+    _worker_gitlab = client_from_spec(spec)
+
+
+def _call(args):
+    func, payload = args
+    return pack(func(unpack(payload, _worker_gitlab)))
+
+
+def pmap(gl, func, items, processes=None, chunksize=1, ordered=True):
+    """Apply ``func`` to every item using a pool of processes.
+
+    Args:
+        gl (Gitlab): The connection
+        func (callable): Function to call for each item (must be picklable,
+            e.g. a module level function)
+        items (iterable): Items to process
+        processes (int): Number of worker processes (defaults to the number
+            of CPUs)
+        chunksize (int): Number of items sent to a worker at once
+        ordered (bool): If False, the results are yielded as soon as they are
+            available
+
+    Returns:
+        generator: The results of the ``func`` calls
+    """
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                initargs=(client_spec(gl), ))
+    try:
+        method = pool.imap if ordered else pool.imap_unordered
+        tasks = ((func, pack(item)) for item in items)
+        for result in method(_call, tasks, chunksize):
+            yield unpack(result, gl)
+    finally:
+        pool.terminate()
+        pool.join()
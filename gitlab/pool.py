@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Spread the requests of a client on several tokens (API v4 only).
+
+The server rate limits apply to each token. A :class:`TokenPool` is a
+transport that sends each request with one of the tokens, so the throughput of
+a client (shared by several threads) grows with the number of tokens:
+
+.. code-block:: python
+
+   from gitlab import pool
+
+   tokens = ['token1', 'token2', 'token3']
+   gl = gitlab.Gitlab(url, api_version=4, transport=pool.TokenPool(tokens))
+   projects = gitlab.utils.thread_map(lambda id: gl.projects.get(id), ids)
+"""
+
+import itertools
+import threading
+import time
+
+import six
+
+import gitlab.transport
+import gitlab.utils
+
+
+class _Slot(object):
+    # The state of a token
+
+    def __init__(self, index, token):
+        self.index = index
+        self.token = token
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        #: Requests left in the rate limit window (None if unknown)
+        self.remaining = None
+        #: Time of the end of the rate limit window (None if unknown)
+        self.reset = None
+
+    def available(self, now):
+        if self.reset is None or self.reset <= now:
+            return True
+        return self.remaining is None or self.remaining > 0
+
+
+class TokenPool(gitlab.transport.Transport):
+    """A transport sending the requests with several tokens.
+
+    The token of the client is replaced by one of the pool tokens for each
+    request. The tokens exhausted for the current rate limit window (according
+    to the ``RateLimit-*`` headers or a 429 response) are skipped until the
+    window is reset, and a request rejected with a 429 status is sent again
+    with another token if one is available.
+
+    Args:
+        tokens (list): The tokens
+        strategy (str): ``round-robin`` to use the tokens in turn, or
+            ``least-loaded`` to pick the token with the fewest requests in
+            progress and the most requests left in its rate limit window
+        transport (gitlab.transport.Transport): The transport used to send
+            the requests (defaults to a ``requests`` transport)
+        header (str): The authentication header (``PRIVATE-TOKEN``, or
+            ``Authorization`` for OAuth tokens)
+    """
+
+    STRATEGIES = ('round-robin', 'least-loaded')
+
+    def __init__(self, tokens, strategy='round-robin', transport=None,
+                 header='PRIVATE-TOKEN'):
+        if not tokens:
+            raise ValueError('At least one token is required')
+        if strategy not in self.STRATEGIES:
+            raise ValueError('Unknown strategy: %s' % strategy)
+        self.strategy = strategy
+        self.transport = transport or gitlab.transport.RequestsTransport()
+        self.header = header
+        self._slots = [_Slot(i, token) for i, token in enumerate(tokens)]
+        self._cycle = itertools.cycle(self._slots)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        state.pop('_cycle')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._cycle = itertools.cycle(self._slots)
+
+    def _acquire(self):
+        now = time.time()
+        with self._lock:
+            available = [s for s in self._slots if s.available(now)]
+            if not available:
+                # all the tokens are throttled, use the first one reset
+                slot = min(self._slots, key=lambda s: s.reset)
+            elif self.strategy == 'least-loaded':
+                slot = min(available,
+                           key=lambda s: (s.in_flight,
+                                          -(s.remaining or 0), s.requests))
+            else:
+                slot = next(self._cycle)
+                while slot not in available:
+                    slot = next(self._cycle)
+            slot.in_flight += 1
+            slot.requests += 1
+            if slot.remaining is not None:
+                slot.remaining -= 1
+            return slot
+
+    def _release(self, slot, response):
+        now = time.time()
+        headers = response.headers if response is not None else {}
+        with self._lock:
+            slot.in_flight -= 1
+            if response is None:
+                return
+            if 'RateLimit-Remaining' in headers:
+                slot.remaining = int(headers['RateLimit-Remaining'])
+            if 'RateLimit-Reset' in headers:
+                slot.reset = float(headers['RateLimit-Reset'])
+            if response.status_code == 429:
+                slot.throttled += 1
+                slot.remaining = 0
+                retry_after = gitlab.utils.retry_after(
+                    headers.get('Retry-After', ''))
+                if retry_after is not None:
+                    slot.reset = now + retry_after
+                elif slot.reset is None or slot.reset <= now:
+                    slot.reset = now + 1
+
+    def _available(self):
+        now = time.time()
+        with self._lock:
+            return any(slot.available(now) for slot in self._slots)
+
+    def send(self, request, **kwargs):
+        # A 429 response is retried at once with another token if possible
+        for _ in self._slots:
+            slot = self._acquire()
+            prepped = request.copy()
+            if self.header == 'Authorization':
+                prepped.headers[self.header] = 'Bearer %s' % slot.token
+            else:
+                prepped.headers[self.header] = slot.token
+            response = None
+            try:
+                response = self.transport.send(prepped, **kwargs)
+            finally:
+                self._release(slot, response)
+            if response.status_code != 429 or not self._available():
+                break
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self):
+        """Return the state of each token.
+
+        Returns:
+            list: One dict per token (in the order of the `tokens` argument)
+                with the ``requests``, ``throttled``, ``in_flight``,
+                ``remaining`` and ``reset`` keys
+        """
+        with self._lock:
+            return [dict((k, v) for k, v in six.iteritems(vars(slot))
+                         if k != 'token')
+                    for slot in self._slots]
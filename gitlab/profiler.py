@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Measure where the time is spent outside the network (API v4 only).
+
+.. code-block:: python
+
+   from gitlab import profiler
+
+   with profiler.Profiler(gl) as prof:
+       issues = project.issues.list(all=True)
+   print(prof.report())
+"""
+
+import sys
+import threading
+
+import six
+
+import gitlab
+from gitlab import base
+
+
+#: The measured phases:
+#:
+#: * ``opts``: headers and authentication (``_get_session_opts``)
+#: * ``prepare``: ``requests`` request preparation
+#: * ``url``: URL sanitization
+#: * ``network``: sending the request and waiting for the response
+#: * ``json``: JSON decoding
+#: * ``objects``: RESTObject creation
+PHASES = ('opts', 'prepare', 'url', 'network', 'json', 'objects')
+
+
+def _caller(frame):
+    # Find the public method of a manager or object that led to this frame
+    while frame is not None:
+        obj = frame.f_locals.get('self')
+        name = frame.f_code.co_name
+        if isinstance(obj, base.RESTObjectList):
+            return '%s.list' % type(obj.manager).__name__
+        # skip the private methods and the comprehensions
+        if (isinstance(obj, (base.RESTManager, base.RESTObject)) and
+                name[0] not in '_<'):
+            return '%s.%s' % (type(obj).__name__, name)
+        frame = frame.f_back
+    return '<other>'
+
+
+class Profiler(object):
+    """Attribute the time spent in API calls to the client phases.
+
+    While the profiler is running, the time spent in each phase (see
+    :data:`PHASES`) is aggregated by manager or object method (e.g.
+    ``ProjectIssueManager.list``). The profiler can be used as a context
+    manager.
+
+    Args:
+        gl (Gitlab): The connection to profile
+    """
+
+    def __init__(self, gl):
+        self.gitlab = gl
+        self._lock = threading.Lock()
+        self._start = None
+        self.reset()
+
+    def reset(self):
+        """Forget the measures."""
+        #: {method: {'requests': n, 'objects': n, 'times': {phase: seconds}}}
+        self.stats = {}
+        #: Wall time of the profiling sessions, in seconds
+        self.wall_time = 0.0
+
+    def start(self):
+        """Start profiling."""
+        self.gitlab._profiler = self
+        self.gitlab.add_hook('response', self._on_response)
+        self._start = gitlab.utils.clock()
+
+    def stop(self):
+        """Stop profiling."""
+        self.wall_time += gitlab.utils.clock() - self._start
+        self.gitlab.remove_hook('response', self._on_response)
+        self.gitlab._profiler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _get_stats(self, frame):
+        method = _caller(frame)
+        stats = self.stats.get(method)
+        if stats is None:
+            stats = {'requests': 0, 'objects': 0,
+                     'times': dict((phase, 0.0) for phase in PHASES)}
+            self.stats[method] = stats
+        return stats
+
+    def _on_response(self, info):
+        frame = sys._getframe(1)
+        with self._lock:
+            stats = self._get_stats(frame)
+            stats['requests'] += 1
+            for phase in ('opts', 'prepare', 'url', 'network', 'json'):
+                stats['times'][phase] += info['%s_time' % phase] or 0.0
+
+    def add_object(self, duration):
+        """Record the creation of a RESTObject.
+
+        Args:
+            duration (float): The creation time in seconds
+        """
+        frame = sys._getframe(1)
+        with self._lock:
+            stats = self._get_stats(frame)
+            stats['objects'] += 1
+            stats['times']['objects'] += duration
+
+    def totals(self):
+        """Return the sum of each phase for all the methods.
+
+        Returns:
+            dict: The time spent in each phase, in seconds
+        """
+        totals = dict((phase, 0.0) for phase in PHASES)
+        with self._lock:
+            for stats in six.itervalues(self.stats):
+                for phase in PHASES:
+                    totals[phase] += stats['times'][phase]
+        return totals
+
+    def report(self):
+        """Return a text report of the measures.
+
+        The methods are sorted by client time (all the phases except
+        ``network``). Times are in milliseconds.
+
+        Returns:
+            str: The report
+        """
+        rows = []
+        with self._lock:
+            for method, stats in six.iteritems(self.stats):
+                times = [stats['times'][phase] * 1000 for phase in PHASES]
+                client = sum(times) - times[PHASES.index('network')]
+                rows.append((client, method, stats['requests'],
+                             stats['objects'], times))
+        rows.sort(key=lambda row: (-row[0], row[1]))
+
+        header = ['method', 'requests', 'objects', 'client'] + list(PHASES)
+        lines = ['%-40s %8s %8s %10s' % tuple(header[:4]) +
+                 ''.join(' %10s' % h for h in header[4:])]
+        for client, method, requests, objects, times in rows:
+            lines.append('%-40s %8d %8d %10.2f' % (method, requests, objects,
+                                                   client) +
+                         ''.join(' %10.2f' % t for t in times))
+
+        totals = self.totals()
+        network = totals.pop('network')
+        client = sum(totals.values())
+        lines.append('')
+        lines.append('wall time: %.2f ms, network: %.2f ms, client: %.2f ms, '
+                     'other: %.2f ms' % (self.wall_time * 1000,
+                                         network * 1000, client * 1000,
+                                         (self.wall_time - network - client) *
+                                         1000))
+        return '\n'.join(lines)
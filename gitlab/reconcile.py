@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Bring GitLab resources to a desired state (API v4 only).
+
+The desired state is described by a dict. The ``settings`` key holds the
+attributes of the parent object itself, the other keys are names of the parent
+managers, associated to the list of expected items:
+
+.. code-block:: python
+
+   spec = {
+       'settings': {'issues_enabled': True},
+       'labels': [{'name': 'bug', 'color': '#d9534f'}],
+       'variables': [{'key': 'DEPLOY', 'value': '1'}],
+       'protectedbranches': [{'name': 'master', 'push_access_level': 40}],
+       'hooks': [{'url': 'http://ci.example.com', 'push_events': True}],
+       'members': [{'user_id': 12, 'access_level': 30}],
+   }
+"""
+
+import six
+
+from gitlab import utils
+
+
+#: For each manager: the attribute identifying an item in the spec, and the
+#: matching attribute in the server data
+KEYS = {
+    'labels': ('name', 'name'),
+    'variables': ('key', 'key'),
+    'protectedbranches': ('name', 'name'),
+    'hooks': ('url', 'url'),
+    'members': ('user_id', 'id'),
+}
+
+
+def _protected_branch_attrs(obj):
+    # The access levels are returned as lists of rules
+    attrs = obj.attributes.copy()
+    for level in ('push_access_level', 'merge_access_level'):
+        rules = attrs.get('%ss' % level)
+        if rules:
+            attrs[level] = rules[0]['access_level']
+    return attrs
+
+
+_NORMALIZERS = {
+    'protectedbranches': _protected_branch_attrs,
+}
+
+
+def _normalize(name, obj):
+    if name in _NORMALIZERS:
+        return _NORMALIZERS[name](obj)
+    return obj.attributes
+
+
+class Change(object):
+    """A change required to reach the desired state.
+
+    Attributes:
+        parent: The object owning the modified resource
+        manager (str): The name of the parent manager, or 'settings'
+        action (str): 'create', 'update' or 'delete'
+        key: The identifier of the item
+        data (dict): The attributes to send to the server
+        diff (dict): The changed attributes, as (current, desired) tuples
+        obj: The current RESTObject, if it exists
+        error (Exception): The error raised when the change was applied
+    """
+
+    def __init__(self, parent, manager, action, key, data=None, diff=None,
+                 obj=None):
+        self.parent = parent
+        self.manager = manager
+        self.action = action
+        self.key = key
+        self.data = data or {}
+        self.diff = diff or {}
+        self.obj = obj
+        self.error = None
+
+    def __str__(self):
+        details = ', '.join('%s: %r -> %r' % (k, old, new)
+                            for k, (old, new) in sorted(self.diff.items()))
+        target = self.manager
+        if self.key is not None:
+            target = '%s %r' % (self.manager, self.key)
+        msg = '%s %s: %s %s' % (type(self.parent).__name__,
+                                self.parent.get_id(), self.action, target)
+        if details:
+            msg = '%s (%s)' % (msg, details)
+        if self.error is not None:
+            msg = '%s [failed: %s]' % (msg, self.error)
+        return msg
+
+    def __repr__(self):
+        return '<Change %s>' % self
+
+
+def _compare(desired, current, ignore=()):
+    diff = {}
+    for attr, value in six.iteritems(desired):
+        # write-only attributes (hook tokens for instance) are not returned
+        # by the server and cannot be compared
+        if attr in ignore or attr not in current:
+            continue
+        if current[attr] != value:
+            diff[attr] = (current[attr], value)
+    return diff
+
+
+def diff(parent, name, desired, current, prune=False):
+    """Compute the changes required for the items of a manager.
+
+    Args:
+        parent: The object owning the manager
+        name (str): The name of the manager
+        desired (list): The expected items (dicts)
+        current (list): The existing items (RESTObjects)
+        prune (bool): If True, delete the existing items missing from
+            `desired`
+
+    Returns:
+        list: The Change objects
+    """
+    spec_key, server_key = KEYS[name]
+    existing = dict((obj.attributes[server_key], obj) for obj in current)
+
+    changes = []
+    for item in desired:
+        key = item[spec_key]
+        obj = existing.pop(key, None)
+        if obj is None:
+            changes.append(Change(parent, name, 'create', key, data=item))
+            continue
+        delta = _compare(item, _normalize(name, obj), ignore=(spec_key, ))
+        if delta:
+            data = dict((k, v[1]) for k, v in six.iteritems(delta))
+            changes.append(Change(parent, name, 'update', key, data=data,
+                                  diff=delta, obj=obj))
+
+    if prune:
+        for key, obj in six.iteritems(existing):
+            changes.append(Change(parent, name, 'delete', key, obj=obj))
+
+    return changes
+
+
+def _plan_one(task):
+    parent, name, desired, prune = task
+    if name == 'settings':
+        obj = parent.manager.get(parent.get_id())
+        delta = _compare(desired, obj.attributes)
+        if not delta:
+            return []
+        data = dict((k, v[1]) for k, v in six.iteritems(delta))
+        return [Change(parent, name, 'update', None, data=data, diff=delta,
+                       obj=obj)]
+
+    current = getattr(parent, name).list(all=True)
+    return diff(parent, name, desired, current, prune=prune)
+
+
+def plan(parents, spec, prune=False, workers=8):
+    """Compute the changes required to bring the parents to the spec.
+
+    The current state of the resources is fetched concurrently, the
+    connection must be created with ``thread_safe=True``. Only read requests
+    are sent to the server.
+
+    Args:
+        parents (iterable): The objects to reconcile (e.g. projects, lazy
+            objects are supported)
+        spec (dict): The desired state
+        prune (bool): If True, delete the existing items missing from the
+            spec
+        workers (int): Maximum number of concurrent requests
+
+    Returns:
+        list: The Change objects
+    """
+    tasks = [(parent, name, desired, prune)
+             for parent in parents
+             for name, desired in sorted(six.iteritems(spec))]
+    changes = []
+    for result in utils.thread_map(_plan_one, tasks, workers):
+        changes.extend(result)
+    return changes
+
+
+def _apply_one(change):
+    manager = getattr(change.parent, change.manager, None)
+    try:
+        if change.action == 'create':
+            manager.create(change.data)
+        elif change.action == 'delete':
+            change.obj.delete()
+        elif hasattr(change.obj, 'save'):
+            for attr, value in six.iteritems(change.data):
+                setattr(change.obj, attr, value)
+            change.obj.save()
+        else:
+            # no update support (protected branches): replace the item
+            spec_key = KEYS[change.manager][0]
+            current = _normalize(change.manager, change.obj)
+            data = dict((k, current[k]) for k in manager.get_create_attrs()[1]
+                        if k in current)
+            data.update(change.data)
+            data[spec_key] = change.key
+            change.obj.delete()
+            manager.create(data)
+    except Exception as e:
+        change.error = e
+    return change
+
+
+def apply(changes, workers=8):
+    """Apply changes on the server, concurrently.
+
+    Errors don't stop the process, they are stored in the ``error`` attribute
+    of the failed changes. The connection must be created with
+    ``thread_safe=True``.
+
+    Args:
+        changes (list): The Change objects to apply
+        workers (int): Maximum number of concurrent requests
+
+    Returns:
+        list: The failed changes
+    """
+    return [change for change in utils.thread_map(_apply_one, changes,
+                                                  workers)
+            if change.error is not None]
+
+
+def reconcile(parents, spec, dry_run=False, prune=False, workers=8):
+    """Bring the parents to the desired state.
+
+    If nothing needs to be changed, only read requests are sent. The requests
+    are sent concurrently, the connection must be created with
+    ``thread_safe=True``.
+
+    Args:
+        parents (iterable): The objects to reconcile (e.g. projects)
+        spec (dict): The desired state
+        dry_run (bool): If True, compute the changes but don't apply them
+        prune (bool): If True, delete the existing items missing from the
+            spec
+        workers (int): Maximum number of concurrent requests
+
+    Returns:
+        list: The Change objects (check their ``error`` attribute when
+            dry_run is False)
+    """
+    changes = plan(parents, spec, prune=prune, workers=workers)
+    if not dry_run:
+        apply(changes, workers=workers)
+    return changes
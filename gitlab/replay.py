@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Record the HTTP exchanges of a client, and replay them without a server.
+
+Both classes are :class:`requests.Session` objects, to use as the ``session``
+argument of :class:`gitlab.Gitlab`:
+
+.. code-block:: python
+
+   from gitlab import replay
+
+   with replay.RecordingSession('run.jsonl.gz') as session:
+       gl = gitlab.Gitlab(url, private_token, session=session)
+       run_the_workload(gl)
+
+   # later, without a server
+   gl = gitlab.Gitlab(url, session=replay.ReplaySession('run.jsonl.gz'))
+   run_the_workload(gl)
+
+The recordings are JSON lines files, gzip-compressed if the file name ends with
+``.gz``. The authentication data is not recorded: the authentication and
+cookie headers, the token and password fields of the query strings and JSON
+bodies, and the parameters of the requests sent to ``/session`` are redacted.
+"""
+
+import base64
+import collections
+import datetime
+import gzip
+import io
+import json
+import threading
+import time
+
+import requests
+import six
+
+import gitlab
+from gitlab import exceptions as exc
+
+
+#: Format version of the recordings
+VERSION = 1
+
+#: The request headers replaced by ``[redacted]`` in the recordings
+REDACTED_HEADERS = ('PRIVATE-TOKEN', 'JOB-TOKEN', 'Authorization', 'Cookie')
+
+#: The response headers replaced by ``[redacted]`` in the recordings
+REDACTED_RESPONSE_HEADERS = ('Set-Cookie', )
+
+#: The fields of the JSON bodies replaced by ``[redacted]`` in the recordings
+REDACTED_FIELDS = ('private_token', 'token', 'runners_token', 'password',
+                   'access_token', 'secret')
+
+#: The paths (ending) of the requests whose body is not recorded
+REDACTED_PATHS = ('/session', )
+
+REDACTED = '[redacted]'
+
+
+def _open(filename, mode):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    return io.open(filename, mode)
+
+
+def _encode_body(body):
+    # Return a (key, value) tuple for a body, base64 encoded if not text
+    if body is None:
+        return 'body', None
+    if isinstance(body, six.text_type):
+        return 'body', body
+    if not isinstance(body, bytes):
+        # file uploads and generators are not recorded
+        return 'body', None
+    try:
+        return 'body', body.decode('utf-8')
+    except UnicodeDecodeError:
+        return 'body_b64', base64.b64encode(body).decode('ascii')
+
+
+def _redact_fields(data):
+    # Return a copy of decoded JSON data without the secret fields, or None
+    # if there's nothing to redact
+    redacted = False
+    if isinstance(data, dict):
+        result = {}
+        for key, value in six.iteritems(data):
+            if key in REDACTED_FIELDS and value is not None:
+                value = REDACTED
+                redacted = True
+            else:
+                new_value = _redact_fields(value)
+                if new_value is not None:
+                    value = new_value
+                    redacted = True
+            result[key] = value
+    elif isinstance(data, list):
+        result = []
+        for value in data:
+            new_value = _redact_fields(value)
+            if new_value is not None:
+                value = new_value
+                redacted = True
+            result.append(value)
+    else:
+        return None
+    return result if redacted else None
+
+
+def _redact_headers(headers, names):
+    # Return a dict of the headers, with the values of the names (compared
+    # case-insensitively) redacted
+    names = set(name.lower() for name in names)
+    return dict((name, REDACTED if name.lower() in names else value)
+                for name, value in six.iteritems(headers))
+
+
+def _redact_body(body):
+    # Return the text body without the secret fields of JSON data
+    if not body or body[0] not in '{[':
+        return body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    data = _redact_fields(data)
+    return body if data is None else json.dumps(data)
+
+
+def _decode_body(entry):
+    if entry.get('body_b64') is not None:
+        return base64.b64decode(entry['body_b64'])
+    if entry.get('body') is None:
+        return b''
+    return entry['body'].encode('utf-8')
+
+
+def _redact_query(path, query):
+    # Redact the secret parameters of a parsed query string (all of them for
+    # the REDACTED_PATHS)
+    redact_all = path.endswith(REDACTED_PATHS)
+    return [(key, REDACTED if redact_all or key in REDACTED_FIELDS else value)
+            for key, value in query]
+
+
+def redact_url(url):
+    """Return a URL without the secret query parameters.
+
+    Args:
+        url (str): The request URL
+
+    Returns:
+        str: The URL, with the secret values replaced by ``[redacted]``
+    """
+    parsed = six.moves.urllib.parse.urlsplit(url)
+    if not parsed.query:
+        return url
+    query = six.moves.urllib.parse.parse_qsl(parsed.query,
+                                             keep_blank_values=True)
+    query = six.moves.urllib.parse.urlencode(_redact_query(parsed.path,
+                                                           query))
+    return parsed._replace(query=query).geturl()
+
+
+def request_key(method, url):
+    """Return the key used to match a request with a recorded one.
+
+    The key ignores the scheme and host, so a recording can be replayed with
+    any server URL, the order of the query parameters and the values of the
+    secret ones.
+
+    Args:
+        method (str): The HTTP verb
+        url (str): The request URL
+
+    Returns:
+        tuple: (method, path, sorted query parameters)
+    """
+    parsed = six.moves.urllib.parse.urlsplit(url)
+    query = six.moves.urllib.parse.parse_qsl(parsed.query,
+                                             keep_blank_values=True)
+    query = tuple(sorted(_redact_query(parsed.path, query)))
+    return method.upper(), parsed.path, query
+
+
+class RecordingSession(requests.Session):
+    """A session recording the request/response pairs in a file.
+
+    The exchanges are written as they happen. The file must be closed with
+    :meth:`close`, or by using the session as a context manager.
+
+    Args:
+        filename (str): The recording file (compressed if it ends with
+            ``.gz``)
+    """
+
+    def __init__(self, filename):
+        super(RecordingSession, self).__init__()
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._start = gitlab.utils.clock()
+        self._file = _open(filename, 'wb')
+        self._write({'version': VERSION,
+                     'date': datetime.datetime.utcnow().strftime(
+                         '%Y-%m-%dT%H:%M:%SZ')})
+
+    def _write(self, data):
+        line = json.dumps(data, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line.encode('utf-8'))
+
+    def send(self, request, **kwargs):
+        """Send the request and record the exchange."""
+        clock = gitlab.utils.clock
+        start = clock()
+        response = super(RecordingSession, self).send(request, **kwargs)
+        # reading the content makes a streamed response available from
+        # memory
+        content = response.content
+        end = clock()
+
+        headers = _redact_headers(request.headers, REDACTED_HEADERS)
+        response_headers = _redact_headers(response.headers,
+                                           REDACTED_RESPONSE_HEADERS)
+        entry = {
+            'method': request.method,
+            'url': redact_url(request.url),
+            'headers': headers,
+            'offset': start - self._start,
+            'duration': end - start,
+            'status': response.status_code,
+            'reason': response.reason,
+            'response_headers': response_headers,
+        }
+        key, value = _encode_body(request.body)
+        path = six.moves.urllib.parse.urlsplit(request.url).path
+        if path.endswith(REDACTED_PATHS):
+            key, value = 'body', None
+        elif key == 'body':
+            value = _redact_body(value)
+        entry[key] = value
+
+        key, value = _encode_body(content)
+        recorded = _redact_body(value) if key == 'body' else value
+        entry['response_%s' % key] = recorded
+        # the recorded content is decoded, and might have been redacted
+        if (response_headers.pop('Content-Encoding', None) or
+                recorded is not value):
+            response_headers['Content-Length'] = str(
+                len(_decode_body({key: recorded})))
+        self._write(entry)
+        return response
+
+    def close(self):
+        """Close the recording file and the session."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        super(RecordingSession, self).close()
+
+
+class ReplaySession(requests.Session):
+    """A session answering the requests with a recording.
+
+    Requests are matched by verb, path and query string (see
+    :func:`request_key`). Identical requests get the recorded responses in
+    order; the last one is reused if the request was sent more times than
+    recorded.
+
+    Args:
+        filename (str): The recording file
+        timing (bool): If True, wait for the recorded duration of each
+            exchange before returning the response
+        speed (float): Replay speed factor when `timing` is True (2 halves
+            the waits)
+    """
+
+    def __init__(self, filename, timing=False, speed=1.0):
+        super(ReplaySession, self).__init__()
+        self.filename = filename
+        self.timing = timing
+        self.speed = speed
+        self._lock = threading.Lock()
+        #: {request key: [entries]}
+        self.exchanges = collections.defaultdict(collections.deque)
+        with _open(filename, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            if header.get('version') != VERSION:
+                raise exc.GitlabReplayError(
+                    'Unsupported recording version: %s' %
+                    header.get('version'))
+            for line in f:
+                entry = json.loads(line.decode('utf-8'))
+                key = request_key(entry['method'], entry['url'])
+                self.exchanges[key].append(entry)
+
+    def _next_entry(self, request):
+        key = request_key(request.method, request.url)
+        with self._lock:
+            entries = self.exchanges.get(key)
+            if not entries:
+                raise exc.GitlabReplayError('No recorded response for %s %s' %
+                                            (request.method, request.url))
+            if len(entries) > 1:
+                return entries.popleft()
+            return entries[0]
+
+    def send(self, request, **kwargs):
+        """Return the recorded response for the request."""
+        entry = self._next_entry(request)
+        if self.timing:
+            time.sleep(entry['duration'] / self.speed)
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = requests.structures.CaseInsensitiveDict(
+            entry['response_headers'])
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        response.raw = io.BytesIO(_decode_body(
+            {'body': entry.get('response_body'),
+             'body_b64': entry.get('response_body_b64')}))
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=entry['duration'])
+        return response
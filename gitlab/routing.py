@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Send the read requests to secondary servers (API v4 only).
+
+With GitLab Geo, the secondary nodes can serve the read requests. A
+:class:`ReplicaRouter` is a transport sending the GET requests to the fastest
+healthy secondary, and the other requests to the primary:
+
+.. code-block:: python
+
+   from gitlab import routing
+
+   router = routing.ReplicaRouter('https://gitlab.example.com',
+                                  ['https://geo-eu.example.com',
+                                   'https://geo-us.example.com'])
+   gl = gitlab.Gitlab('https://gitlab.example.com', token, api_version=4,
+                      transport=router)
+"""
+
+import threading
+
+import requests
+
+import gitlab.transport
+import gitlab.utils
+
+
+class _Node(object):
+    # The state of a server
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.healthy = True
+        #: Average response time of the health checks, in seconds
+        self.latency = None
+        self.last_check = None
+        self.requests = 0
+        self.errors = 0
+
+
+class ReplicaRouter(gitlab.transport.Transport):
+    """A transport sending the read requests to secondary servers.
+
+    The GET and HEAD requests are sent to the healthy secondary with the
+    lowest latency, measured by health checks. A secondary is checked when it
+    is selected and its last check is older than `check_interval`: the check
+    is an unauthenticated request, and the server is healthy if it answers
+    with a 2xx or 401 status. If a
+    secondary can't be reached or answers with a 5xx status, it is marked as
+    unhealthy and the request is sent to the primary. Requests answered with a
+    404 status (the data might not be replicated yet) are also sent to the
+    primary.
+
+    The other requests are sent to the primary, as well as the read requests
+    following a write for `write_stickiness` seconds, to read your writes
+    despite the replication delay.
+
+    Args:
+        primary (str): URL of the primary server
+        secondaries (list): URLs of the secondary servers
+        transport (gitlab.transport.Transport): The transport used to send
+            the requests (defaults to a ``requests`` transport)
+        health_path (str): Path of the health check (``/-/liveness`` and
+            ``/-/readiness`` are only available from the whitelisted IPs)
+        check_interval (float): Delay between two health checks of a server,
+            in seconds
+        check_timeout (float): Timeout of the health checks, in seconds
+        write_stickiness (float): Delay after a write during which the reads
+            are sent to the primary, in seconds
+        retry_not_found (bool): Whether requests answered with a 404 status
+            by a secondary are sent to the primary
+    """
+
+    READ_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, primary, secondaries, transport=None,
+                 health_path='/api/v4/version', check_interval=30.0,
+                 check_timeout=2.0, write_stickiness=10.0,
+                 retry_not_found=True):
+        self.transport = transport or gitlab.transport.RequestsTransport()
+        self.health_path = health_path
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.write_stickiness = write_stickiness
+        self.retry_not_found = retry_not_found
+        self.primary = _Node(primary)
+        self.secondaries = [_Node(url) for url in secondaries]
+        self._last_write = None
+        self._lock = threading.Lock()
+        self._checking = set()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        state['_checking'] = set()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _split(self, url):
+        # Return the node and the path of a URL
+        for node in [self.primary] + self.secondaries:
+            if url.startswith(node.url + '/'):
+                return node, url[len(node.url):]
+        return None, None
+
+    def check(self, node, verify=True):
+        """Run the health check of a server.
+
+        Args:
+            node: The server (an item of :attr:`secondaries`)
+            verify (bool|str): Whether the SSL certificates are validated
+
+        Returns:
+            bool: Whether the server is healthy
+        """
+        request = requests.Request('GET', node.url + self.health_path)
+        start = gitlab.utils.clock()
+        try:
+            response = self.transport.send(request.prepare(), verify=verify,
+                                           timeout=self.check_timeout)
+            status = response.status_code
+            healthy = 200 <= status < 300 or status == 401
+        except requests.exceptions.RequestException:
+            healthy = False
+        duration = gitlab.utils.clock() - start
+        with self._lock:
+            node.healthy = healthy
+            node.last_check = gitlab.utils.clock()
+            if healthy:
+                node.latency = (duration if node.latency is None
+                                else 0.7 * node.latency + 0.3 * duration)
+        return healthy
+
+    def check_all(self, verify=True):
+        """Run the health check of all the secondaries."""
+        for node in self.secondaries:
+            self.check(node, verify=verify)
+
+    def _stale(self, node, now):
+        return (node.last_check is None or
+                now - node.last_check > self.check_interval)
+
+    def _select(self, verify):
+        # Return the best secondary, or None
+        now = gitlab.utils.clock()
+        with self._lock:
+            if (self._last_write is not None and
+                    now - self._last_write < self.write_stickiness):
+                return None
+            # only one thread checks a server, the other ones use its
+            # previous state
+            stale = [n for n in self.secondaries
+                     if self._stale(n, now) and n not in self._checking]
+            self._checking.update(stale)
+        try:
+            for node in stale:
+                self.check(node, verify=verify)
+        finally:
+            with self._lock:
+                self._checking.difference_update(stale)
+
+        with self._lock:
+            healthy = [n for n in self.secondaries
+                       if n.healthy and n.latency is not None]
+            if not healthy:
+                return None
+            return min(healthy, key=lambda n: n.latency)
+
+    def _send(self, node, request, path, **kwargs):
+        if node.url + path != request.url:
+            request = request.copy()
+            request.url = node.url + path
+        with self._lock:
+            node.requests += 1
+        return self.transport.send(request, **kwargs)
+
+    def send(self, request, **kwargs):
+        node, path = self._split(request.url)
+        if node is None:
+            # not a request for this cluster
+            return self.transport.send(request, **kwargs)
+
+        if request.method.upper() not in self.READ_METHODS:
+            with self._lock:
+                self._last_write = gitlab.utils.clock()
+            return self._send(self.primary, request, path, **kwargs)
+
+        secondary = self._select(kwargs.get('verify', True))
+        if secondary is not None:
+            try:
+                response = self._send(secondary, request, path, **kwargs)
+            except requests.exceptions.RequestException:
+                response = None
+            if response is not None and response.status_code < 500:
+                if response.status_code != 404 or not self.retry_not_found:
+                    return response
+                response.close()
+            else:
+                if response is not None:
+                    response.close()
+                with self._lock:
+                    secondary.errors += 1
+                    secondary.healthy = False
+                    secondary.last_check = gitlab.utils.clock()
+        return self._send(self.primary, request, path, **kwargs)
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self):
+        """Return the state of the servers.
+
+        Returns:
+            dict: {url: {'healthy', 'latency', 'requests', 'errors'}}
+        """
+        with self._lock:
+            return dict((node.url, {'healthy': node.healthy,
+                                    'latency': node.latency,
+                                    'requests': node.requests,
+                                    'errors': node.errors})
+                        for node in [self.primary] + self.secondaries)
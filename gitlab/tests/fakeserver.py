@@ -0,0 +1,559 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Local stand-in for a GitLab server (API v4), for tests and benchmarks.
+
+The server runs in a thread and serves synthetic data, generated on demand
+from a seed. It supports the listing, get, create, update and delete requests
+on the main collections, offset and keyset pagination, raw file downloads,
+and can inject latency, errors and rate limiting:
+
+.. code-block:: python
+
+   from gitlab.tests.fakeserver import FakeGitlabServer
+
+   with FakeGitlabServer(projects=1000, latency=0.01) as server:
+       gl = gitlab.Gitlab(server.url, private_token='token', api_version=4)
+       projects = gl.projects.list(all=True)
+"""
+
+import collections
+import json
+import random
+import socket
+import threading
+import time
+
+import six
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse
+
+
+_DATE = '2017-%02d-%02dT%02d:%02d:00.000Z'
+_WORDS = ('alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf',
+          'hotel', 'india', 'juliet', 'kilo', 'lima', 'mike', 'november')
+
+
+def _date(rnd):
+    return _DATE % (rnd.randint(1, 12), rnd.randint(1, 28),
+                    rnd.randint(0, 23), rnd.randint(0, 59))
+
+
+def _text(rnd, count):
+    return ' '.join(rnd.choice(_WORDS) for _ in range(count))
+
+
+class _Collection(object):
+    # Items of a collection, indexed by key, in creation order
+
+    def __init__(self, key='id'):
+        self.key = key
+        self.items = []
+        self.index = {}
+
+    def add(self, item):
+        key = str(item[self.key])
+        if key in self.index:
+            self.items[self.index[key]] = item
+        else:
+            self.index[key] = len(self.items)
+            self.items.append(item)
+        return item
+
+    def get(self, key):
+        position = self.index.get(str(key))
+        if position is None:
+            return None
+        return self.items[position]
+
+    def delete(self, key):
+        position = self.index.pop(str(key), None)
+        if position is None:
+            return False
+        self.items[position] = None
+        return True
+
+    def values(self):
+        return [item for item in self.items if item is not None]
+
+
+class FakeGitlabServer(object):
+    """A threaded HTTP server emulating the GitLab v4 API.
+
+    Args:
+        projects (int): Number of projects
+        users (int): Number of users
+        groups (int): Number of groups (the projects are spread in them)
+        children (int): Number of issues, merge requests, members, labels,
+            pipelines and events of each project
+        file_size (int): Size of the raw files
+        latency (float): Delay added to each response, in seconds
+        error_rate (float): Probability to answer with a 500 error
+        throttle_rate (float): Probability to answer with a 429 error
+        rate_limit (int): Maximum number of requests per second and token
+            (429 errors are returned above)
+        seed (int): Seed of the generated data and injected failures
+    """
+
+    #: The project children: name -> key attribute
+    PROJECT_CHILDREN = {
+        'issues': 'iid',
+        'merge_requests': 'iid',
+        'members': 'id',
+        'labels': 'name',
+        'pipelines': 'id',
+        'events': 'id',
+        'variables': 'key',
+        'hooks': 'id',
+    }
+
+    def __init__(self, projects=100, users=100, groups=10, children=20,
+                 file_size=1024 * 1024, latency=0.0, error_rate=0.0,
+                 throttle_rate=0.0, rate_limit=None, seed=0):
+        self.counts = {'projects': projects, 'users': users,
+                       'groups': max(groups, 1), 'children': children}
+        self.file_size = file_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.seed = seed
+        #: Number of requests received
+        self.requests = 0
+        #: Number of requests received for each token
+        self.tokens = collections.Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        #: {token: (second, requests)}
+        self._windows = {}
+        self._collections = {}
+        self._server = None
+        self._thread = None
+        self.url = None
+
+    # Server management
+
+    def start(self):
+        """Start the server in a background thread."""
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self.url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # Data generation
+
+    def _rnd(self, *key):
+        return random.Random('%s-%s' % (self.seed, '-'.join(map(str, key))))
+
+    def _user(self, id):
+        rnd = self._rnd('user', id)
+        return {
+            'id': id, 'username': 'user%d' % id,
+            'name': 'User %d' % id, 'state': 'active',
+            'email': 'user%d@example.com' % id,
+            'avatar_url': 'http://www.gravatar.com/avatar/%032x' % id,
+            'web_url': 'http://gitlab.example.com/user%d' % id,
+            'created_at': _date(rnd), 'bio': _text(rnd, 8),
+            'is_admin': False, 'external': False,
+        }
+
+    def _user_ref(self, id):
+        user = self._user(id)
+        return dict((k, user[k]) for k in ('id', 'username', 'name', 'state',
+                                           'avatar_url', 'web_url'))
+
+    def _group(self, id):
+        rnd = self._rnd('group', id)
+        return {
+            'id': id, 'name': 'group-%d' % id, 'path': 'group-%d' % id,
+            'full_path': 'group-%d' % id, 'full_name': 'group-%d' % id,
+            'description': _text(rnd, 6), 'visibility': 'private',
+            'parent_id': None, 'lfs_enabled': True,
+            'web_url': 'http://gitlab.example.com/groups/group-%d' % id,
+        }
+
+    def _project(self, id):
+        rnd = self._rnd('project', id)
+        group_id = (id - 1) % self.counts['groups'] + 1
+        path = 'group-%d/project-%d' % (group_id, id)
+        url = 'http://gitlab.example.com/%s' % path
+        return {
+            'id': id, 'name': 'project-%d' % id, 'path': 'project-%d' % id,
+            'name_with_namespace': 'group-%d / project-%d' % (group_id, id),
+            'path_with_namespace': path,
+            'description': _text(rnd, 12), 'default_branch': 'master',
+            'visibility': rnd.choice(['private', 'internal', 'public']),
+            'ssh_url_to_repo': 'git@gitlab.example.com:%s.git' % path,
+            'http_url_to_repo': '%s.git' % url, 'web_url': url,
+            'tag_list': rnd.sample(_WORDS, 2),
+            'owner': self._user_ref(rnd.randint(1, self.counts['users'])),
+            'namespace': {'id': group_id, 'name': 'group-%d' % group_id,
+                          'path': 'group-%d' % group_id, 'kind': 'group',
+                          'full_path': 'group-%d' % group_id},
+            'issues_enabled': rnd.random() > 0.2,
+            'merge_requests_enabled': True, 'wiki_enabled': True,
+            'jobs_enabled': True, 'snippets_enabled': False,
+            'archived': False, 'star_count': rnd.randint(0, 100),
+            'forks_count': rnd.randint(0, 10),
+            'open_issues_count': rnd.randint(0, 50),
+            'created_at': _date(rnd), 'last_activity_at': _date(rnd),
+            'creator_id': rnd.randint(1, self.counts['users']),
+            'permissions': {'project_access': None,
+                            'group_access': {'access_level': 30,
+                                             'notification_level': 3}},
+            '_links': {'self': 'http://gitlab.example.com/api/v4/projects/%d'
+                       % id,
+                       'issues': 'http://gitlab.example.com/api/v4/projects/'
+                       '%d/issues' % id},
+        }
+
+    def _project_child(self, project_id, name, index):
+        rnd = self._rnd(project_id, name, index)
+        users = self.counts['users']
+        if name in ('issues', 'merge_requests'):
+            item = {
+                'id': project_id * 100000 + index, 'iid': index,
+                'project_id': project_id, 'title': _text(rnd, 5),
+                'description': _text(rnd, 40),
+                'state': rnd.choice(['opened', 'closed']),
+                'created_at': _date(rnd), 'updated_at': _date(rnd),
+                'labels': rnd.sample(_WORDS, 2), 'milestone': None,
+                'author': self._user_ref(rnd.randint(1, users)),
+                'assignee': self._user_ref(rnd.randint(1, users)),
+                'user_notes_count': rnd.randint(0, 20),
+                'upvotes': 0, 'downvotes': 0, 'due_date': None,
+                'web_url': 'http://gitlab.example.com/project/%s/%d' %
+                           (name, index),
+            }
+            if name == 'merge_requests':
+                item.update({'source_branch': 'feature-%d' % index,
+                             'target_branch': 'master',
+                             'merge_status': 'can_be_merged'})
+            return item
+        if name == 'members':
+            item = self._user_ref((project_id + index) % users + 1)
+            item['access_level'] = rnd.choice([10, 20, 30, 40])
+            item['expires_at'] = None
+            return item
+        if name == 'labels':
+            return {'name': 'label-%d' % index,
+                    'color': '#%06x' % rnd.randint(0, 0xffffff),
+                    'description': _text(rnd, 4), 'open_issues_count': 0}
+        if name == 'pipelines':
+            return {'id': project_id * 100000 + index, 'sha': '%040x' % index,
+                    'ref': 'master', 'status': rnd.choice(['success',
+                                                           'failed'])}
+        if name == 'events':
+            return {'id': project_id * 100000 + index,
+                    'project_id': project_id, 'action_name': 'pushed to',
+                    'target_type': None, 'created_at': _date(rnd),
+                    'author': self._user_ref(rnd.randint(1, users))}
+        return None
+
+    def _collection(self, path):
+        # path: ('projects', ) or ('projects', '3', 'issues'), created on
+        # first access
+        collection = self._collections.get(path)
+        if collection is not None:
+            return collection
+
+        name = path[-1]
+        if len(path) == 1 and name in ('projects', 'users', 'groups'):
+            factory = getattr(self, '_%s' % name[:-1])
+            collection = _Collection()
+            for id in range(1, self.counts[name] + 1):
+                collection.add(factory(id))
+        elif len(path) == 3 and path[0] == 'projects':
+            if name not in self.PROJECT_CHILDREN:
+                return None
+            collection = _Collection(self.PROJECT_CHILDREN[name])
+            project_id = int(path[1])
+            for index in range(1, self.counts['children'] + 1):
+                item = self._project_child(project_id, name, index)
+                if item is not None:
+                    collection.add(item)
+        elif len(path) == 3 and path[0] == 'groups':
+            collection = _Collection()
+            if name == 'projects':
+                for project in self._collection(('projects', )).values():
+                    if str(project['namespace']['id']) == path[1]:
+                        collection.add(project)
+            elif name == 'members':
+                for id in range(1, min(self.counts['users'], 10) + 1):
+                    item = self._user_ref(id)
+                    item['access_level'] = 30
+                    collection.add(item)
+        else:
+            return None
+        self._collections[path] = collection
+        return collection
+
+    def _resolve(self, segments):
+        # Convert the encoded project/group paths to IDs
+        segments = list(segments)
+        if len(segments) > 1 and segments[0] in ('projects', 'groups'):
+            key = parse.unquote(segments[1])
+            if not key.isdigit():
+                attr = ('path_with_namespace' if segments[0] == 'projects'
+                        else 'full_path')
+                for item in self._collection((segments[0], )).values():
+                    if item[attr] == key:
+                        segments[1] = str(item['id'])
+                        break
+        return segments
+
+    # Request processing
+
+    def _inject(self, token):
+        # Return an error status and headers if a failure must be injected
+        with self._lock:
+            self.requests += 1
+            self.tokens[token] += 1
+            if self.rate_limit is not None:
+                second = int(time.time())
+                start, count = self._windows.get(token, (0, 0))
+                if start != second:
+                    start, count = second, 0
+                self._windows[token] = (start, count + 1)
+                if count >= self.rate_limit:
+                    return 429, {'Retry-After': '1'}
+            if self.throttle_rate and self._random.random() < \
+                    self.throttle_rate:
+                return 429, {'Retry-After': '0'}
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 500, {}
+        return None, {}
+
+    def _rate_limit_headers(self, token):
+        if self.rate_limit is None:
+            return {}
+        start, count = self._windows[token]
+        return {'RateLimit-Limit': str(self.rate_limit),
+                'RateLimit-Remaining': str(max(self.rate_limit - count, 0)),
+                'RateLimit-Reset': str(start + 1)}
+
+    def handle(self, method, url, body, headers=None):
+        """Process a request.
+
+        The rate limit applies to each token (the ``PRIVATE-TOKEN`` header).
+
+        Args:
+            method (str): The HTTP verb
+            url (str): The request path and query string
+            body (bytes): The request body
+            headers (dict): The request headers
+
+        Returns:
+            tuple: (status, headers, body), the body being bytes or a
+                generator of bytes
+        """
+        token = (headers or {}).get('PRIVATE-TOKEN')
+        if self.latency:
+            time.sleep(self.latency)
+        status, headers = self._inject(token)
+        if status is not None:
+            headers.update(self._rate_limit_headers(token))
+            return status, headers, json.dumps({'message': status}).encode()
+
+        parsed = parse.urlparse(url)
+        query = dict(parse.parse_qsl(parsed.query))
+        path = parsed.path
+        if path == '/-/liveness':
+            return self._json(200, {'status': 'ok'})
+        if not path.startswith('/api/v4/'):
+            return self._json(404, {'message': '404 Not Found'})
+        # GitLab ignores the empty segments (e.g. "/issues//1")
+        segments = self._resolve([s for s in path[len('/api/v4/'):].split('/')
+                                  if s])
+
+        with self._lock:
+            status, headers, body = self._dispatch(method, segments, query,
+                                                   body, parsed.path)
+        headers.update(self._rate_limit_headers(token))
+        return status, headers, body
+
+    def _json(self, status, data, headers=None):
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/json'
+        return status, headers, json.dumps(data).encode('utf-8')
+
+    def _dispatch(self, method, segments, query, body, path):
+        if segments == ['version']:
+            return self._json(200, {'version': '10.1.0', 'revision': 'fake'})
+        if segments == ['user']:
+            return self._json(200, self._user(1))
+        if segments[-1] == 'raw' and 'files' in segments:
+            return self._raw_file(segments)
+        if segments[-2:] == ['repository', 'tree']:
+            tree = [{'id': '%040x' % i, 'name': 'file%d' % i,
+                     'path': 'file%d' % i, 'type': 'blob', 'mode': '100644'}
+                    for i in range(self.counts['children'])]
+            return self._paginate(tree, query, path)
+
+        if len(segments) % 2:
+            collection_path, key = tuple(segments), None
+        else:
+            collection_path, key = tuple(segments[:-1]), segments[-1]
+        collection = self._collection(collection_path)
+        if collection is None:
+            return self._json(404, {'message': '404 Not Found'})
+
+        data = {}
+        if body:
+            data = json.loads(body.decode('utf-8'))
+
+        if key is None:
+            if method == 'GET':
+                return self._list(collection, query, path)
+            if method == 'POST':
+                data.setdefault(collection.key,
+                                len(collection.items) + 1)
+                data.setdefault('created_at', _date(self._random))
+                return self._json(201, collection.add(data))
+            return self._json(405, {'message': '405 Method Not Allowed'})
+
+        item = collection.get(key)
+        if item is None:
+            return self._json(404, {'message': '404 Not Found'})
+        if method == 'GET':
+            return self._json(200, item)
+        if method == 'PUT':
+            item.update(data)
+            return self._json(200, item)
+        if method == 'DELETE':
+            collection.delete(key)
+            return 204, {}, b''
+        return self._json(405, {'message': '405 Method Not Allowed'})
+
+    def _list(self, collection, query, path):
+        items = collection.values()
+        for attr in ('state', 'visibility', 'archived'):
+            if attr in query:
+                items = [i for i in items if str(i.get(attr)).lower() ==
+                         query[attr].lower()]
+        if 'search' in query:
+            items = [i for i in items
+                     if query['search'] in i.get('name', i.get('title', ''))]
+        if query.get('sort') == 'desc':
+            items = items[::-1]
+        return self._paginate(items, query, path)
+
+    def _paginate(self, items, query, path):
+        per_page = min(int(query.get('per_page', 20)), 100)
+        base_url = self.url + path
+        headers = {'X-Per-Page': str(per_page)}
+
+        if query.get('pagination') == 'keyset':
+            after = int(query.get('id_after', 0))
+            page = [i for i in items if i['id'] > after][:per_page + 1]
+            if len(page) > per_page:
+                page = page[:per_page]
+                next_query = dict(query, id_after=page[-1]['id'])
+                headers['Link'] = '<%s?%s>; rel="next"' % (
+                    base_url, parse.urlencode(sorted(next_query.items())))
+            return self._json(200, page, headers)
+
+        total = len(items)
+        total_pages = max((total + per_page - 1) // per_page, 1)
+        number = int(query.get('page', 1))
+        page = items[(number - 1) * per_page:number * per_page]
+
+        links = []
+
+        def link(number, rel):
+            page_query = dict(query, page=number, per_page=per_page)
+            links.append('<%s?%s>; rel="%s"' % (
+                base_url, parse.urlencode(sorted(page_query.items())), rel))
+
+        headers.update({'X-Page': str(number), 'X-Total': str(total),
+                        'X-Total-Pages': str(total_pages),
+                        'X-Next-Page': '', 'X-Prev-Page': ''})
+        if number > 1:
+            headers['X-Prev-Page'] = str(number - 1)
+            link(number - 1, 'prev')
+        if number < total_pages:
+            headers['X-Next-Page'] = str(number + 1)
+            link(number + 1, 'next')
+        link(1, 'first')
+        link(total_pages, 'last')
+        headers['Link'] = ', '.join(links)
+        return self._json(200, page, headers)
+
+    def _raw_file(self, segments):
+        size = self.file_size
+        chunk = (b'0123456789abcdef' * 4096)
+
+        def content():
+            remaining = size
+            while remaining > 0:
+                data = chunk[:min(remaining, len(chunk))]
+                remaining -= len(data)
+                yield data
+
+        headers = {'Content-Type': 'application/octet-stream',
+                   'Content-Length': str(size)}
+        return 200, headers, content()
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        # the headers and the body are sent separately, the delayed ACKs
+        # would add ~40ms to each request with the Nagle algorithm
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _process(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, content = self.server.fake.handle(
+            self.command, self.path, body, self.headers)
+        self.send_response(status)
+        if isinstance(content, bytes):
+            headers['Content-Length'] = str(len(content))
+            content = [content]
+        for name, value in six.iteritems(headers):
+            self.send_header(name, value)
+        self.end_headers()
+        for data in content:
+            self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _process
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
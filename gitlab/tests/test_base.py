@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import gc
 import pickle
 try:
     import unittest
@@ -129,6 +130,40 @@ class TestRESTObject(unittest.TestCase):
         self.assertDictEqual({'foo': 'foo', 'bar': 'bar'}, obj._attrs)
         self.assertDictEqual({}, obj._updated_attrs)
 
+    def test_attributes(self):
+        class ParentManager(FakeManager):
+            _from_parent_attrs = {'parent_id': 'id'}
+
+        parent = FakeObject(self.manager, {'id': 1})
+        obj = FakeObject(ParentManager(self.gitlab, parent=parent),
+                         {'foo': 'bar'})
+        self.assertDictEqual({'foo': 'bar', 'parent_id': 1},
+                             dict(obj.attributes))
+        with self.assertRaises(TypeError):
+            obj.attributes['foo'] = 'baz'
+
+        attrs = obj.attributes
+        obj.bar = 'baz'
+        self.assertDictEqual({'foo': 'bar', 'bar': 'baz', 'parent_id': 1},
+                             dict(attrs))
+        obj._update_attrs({'foo': 'foo', 'bar': 'baz'})
+        self.assertDictEqual({'foo': 'foo', 'bar': 'baz', 'parent_id': 1},
+                             attrs.copy())
+        self.assertEqual(3, len(attrs))
+        self.assertRaises(KeyError, attrs.__getitem__, 'state')
+
+        obj._attrs['state'] = 'blocked'
+        self.assertEqual('blocked', attrs['state'])
+        self.assertIn('state', attrs)
+        self.assertEqual(['foo', 'bar', 'state', 'parent_id'], list(attrs))
+
+        obj = FakeObject(self.manager, {'foo': 'bar'})
+        obj.attributes
+        unpickled = pickle.loads(pickle.dumps(obj))
+        unpickled.bar = 'baz'
+        self.assertEqual('baz', unpickled.attributes['bar'])
+        self.assertNotIn('bar', obj.attributes)
+
     def test_create_managers(self):
         class ObjectWithManager(FakeObject):
             _managers = (('fakes', 'FakeManager'), )
@@ -137,3 +172,76 @@ class TestRESTObject(unittest.TestCase):
         self.assertIsInstance(obj.fakes, FakeManager)
         self.assertEqual(obj.fakes.gitlab, self.gitlab)
         self.assertEqual(obj.fakes._parent, obj)
+
+
+class TestIdentityMap(unittest.TestCase):
+    def setUp(self):
+        self.gitlab = FakeGitlab()
+        self.gitlab._identity_map = base.IdentityMap()
+        self.manager = FakeManager(self.gitlab)
+
+    def test_same_object(self):
+        obj1 = self.manager._create_object({'id': 1, 'foo': 'bar'})
+        obj2 = self.manager._create_object({'id': 1, 'foo': 'baz'})
+        other = self.manager._create_object({'id': 2, 'foo': 'bar'})
+        self.assertIs(obj1, obj2)
+        self.assertIsNot(obj1, other)
+        self.assertEqual('baz', obj1.foo)
+        self.assertEqual(2, len(self.gitlab._identity_map))
+
+    def test_no_id(self):
+        obj1 = self.manager._create_object({'foo': 'bar'})
+        obj2 = self.manager._create_object({'foo': 'bar'})
+        self.assertIsNot(obj1, obj2)
+
+    def test_shared_nested_dicts(self):
+        user = {'id': 3, 'username': 'jdoe'}
+        obj1 = self.manager._create_object({'id': 1, 'author': dict(user)})
+        obj2 = self.manager._create_object({'id': 2,
+                                            'assignees': [dict(user)]})
+        self.assertIs(obj1.author, obj2._attrs['assignees'][0])
+        self.assertEqual(user, obj1.author)
+
+    def test_nested_dicts_not_modified(self):
+        obj1 = self.manager._create_object({'id': 1, 'author': {'id': 3,
+                                                                'name': 'a'}})
+        obj2 = self.manager._create_object({'id': 2, 'author': {'id': 3,
+                                                                'name': 'b'}})
+        self.assertEqual('a', obj1.author['name'])
+        self.assertEqual('b', obj2.author['name'])
+
+    def test_nested_dicts_per_attribute(self):
+        stub = {'id': 3, 'name': 'stub'}
+        obj1 = self.manager._create_object({'id': 1, 'owner': dict(stub)})
+        obj2 = self.manager._create_object({'id': 2,
+                                            'namespace': dict(stub)})
+        self.assertIsNot(obj1.owner, obj2.namespace)
+
+    def test_nested_dicts_between_parents(self):
+        class IssueManager(FakeManager):
+            _path = '/projects/%(project_id)s/issues'
+            _from_parent_attrs = {'project_id': 'id'}
+
+        user = {'id': 3, 'username': 'jdoe'}
+        issues = []
+        for project_id in (1, 2):
+            project = FakeObject(self.manager, {'id': project_id})
+            manager = IssueManager(self.gitlab, parent=project)
+            issues.append(manager._create_object({'id': 1,
+                                                  'author': dict(user)}))
+        self.assertIsNot(issues[0], issues[1])
+        self.assertIs(issues[0].author, issues[1].author)
+
+    def test_garbage_collection(self):
+        obj = self.manager._create_object({'id': 1, 'author': {'id': 3}})
+        self.assertEqual(1, len(self.gitlab._identity_map))
+        del obj
+        gc.collect()
+        self.assertEqual(0, len(self.gitlab._identity_map))
+        self.assertEqual(0, len(self.gitlab._identity_map._dicts))
+
+    def test_pickability(self):
+        obj = self.manager._create_object({'id': 1})
+        unpickled = pickle.loads(pickle.dumps(obj))
+        self.assertIsInstance(unpickled.manager.gitlab._identity_map,
+                              base.IdentityMap)
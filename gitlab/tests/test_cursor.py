@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import shutil
+import tempfile
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+import six
+
+from gitlab import *  # noqa
+from gitlab import cursor
+
+
+class TestCursor(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4)
+        self.project = self.gl.projects.get(1, lazy=True)
+        self.issues = [
+            {'id': 1, 'iid': 1, 'updated_at': '2017-11-01T10:00:00.000Z'},
+            {'id': 2, 'iid': 2, 'updated_at': '2017-11-02T10:00:00.000Z'},
+            {'id': 3, 'iid': 3, 'updated_at': '2017-11-02T10:00:00.000Z'},
+        ]
+        self.events = [{'id': i} for i in range(5, 0, -1)]
+        self.queries = []
+
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/(issues|events)', method="get")
+        def resp_list(url, request):
+            query = dict(six.moves.urllib.parse.parse_qsl(url.query))
+            self.queries.append(query)
+            if url.path.endswith('events'):
+                content = self.events
+            else:
+                # updated_after is inclusive
+                after = query.get('updated_after', '')
+                content = sorted([i for i in self.issues
+                                  if i['updated_at'] >= after],
+                                 key=lambda i: i['updated_at'])
+            headers = {'Content-Type': 'application/json'}
+            return response(200, json.dumps(content), headers, None, 5,
+                            request)
+        self.resp_list = resp_list
+
+    def test_updated_at(self):
+        store = cursor.MemoryStore()
+        c = cursor.Cursor(self.project.issues, store, state='opened')
+        self.assertEqual(c.key, '/projects/1/issues/?state=opened')
+        with HTTMock(self.resp_list):
+            self.assertEqual([i.id for i in c.poll()], [1, 2, 3])
+            self.assertEqual(c.mark, '2017-11-02T10:00:00.000Z')
+            self.assertEqual(c.poll(), [])
+
+            self.issues.append({'id': 4, 'iid': 4,
+                                'updated_at': '2017-11-02T10:00:00.000Z'})
+            self.issues[0]['updated_at'] = '2017-11-03T10:00:00.000Z'
+            self.assertEqual([i.id for i in c.poll()], [4, 1])
+        self.assertEqual(self.queries[-1]['updated_after'],
+                         '2017-11-02T10:00:00.000Z')
+        self.assertEqual(self.queries[-1]['order_by'], 'updated_at')
+        self.assertEqual(self.queries[-1]['state'], 'opened')
+
+    def test_updated_at_time_zones(self):
+        store = cursor.MemoryStore()
+        store.set('issues', {'value': '2017-11-02T10:00:00.000Z',
+                             'ids': [2]})
+        self.issues = [
+            {'id': 2, 'iid': 2, 'updated_at': '2017-11-02T12:00:00+02:00'},
+            {'id': 4, 'iid': 4, 'updated_at': '2017-11-02T11:30:00+02:00'},
+            {'id': 5, 'iid': 5, 'updated_at': '2017-11-02T12:00:00+02:00'},
+            {'id': 6, 'iid': 6, 'updated_at': '2017-11-02T13:00:00.5+02:00'},
+        ]
+        c = cursor.Cursor(self.project.issues, store, key='issues')
+        with HTTMock(self.resp_list):
+            self.assertEqual([i.id for i in c.poll()], [5, 6])
+        self.assertEqual(c.mark, '2017-11-02T13:00:00.5+02:00')
+        self.assertEqual(store.get('issues')['ids'], [6])
+
+    def test_commit(self):
+        store = cursor.MemoryStore()
+        c = cursor.Cursor(self.project.issues, store)
+        with HTTMock(self.resp_list):
+            self.assertEqual(len(c.poll(commit=False)), 3)
+            self.assertEqual(len(c.poll(commit=False)), 3)
+            c.commit()
+            self.assertEqual(c.poll(), [])
+            c.reset()
+            self.assertEqual(len(c.poll()), 3)
+
+    def test_id(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'cursors.json')
+            c = cursor.Cursor(self.project.events,
+                              cursor.JSONFileStore(filename), field='id')
+            with HTTMock(self.resp_list):
+                self.assertEqual(len(c.poll()), 5)
+                self.events.insert(0, {'id': 6})
+                # a new process reads the saved cursor
+                c = cursor.Cursor(self.project.events,
+                                  cursor.JSONFileStore(filename), field='id')
+                self.assertEqual(c.mark, 5)
+                self.assertEqual([e.id for e in c.poll()], [6])
+            self.assertEqual(self.queries[-1]['sort'], 'desc')
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_store_write_error(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'cursors.json')
+            store = cursor.JSONFileStore(filename)
+            store.set('events', 5)
+            self.assertRaises(TypeError, store.set, 'events', object())
+            # the previous file is kept, without temporary files
+            self.assertEqual(cursor.JSONFileStore(filename).get('events'), 5)
+            self.assertEqual(os.listdir(tmpdir), ['cursors.json'])
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import array
+import gzip
+import json
+import os
+import shutil
+import tempfile
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+
+from gitlab import *  # noqa
+from gitlab import export
+
+
+ISSUES = [
+    {'id': 1, 'title': 'one', 'weight': 3, 'author': {'username': 'jdoe'},
+     'created_at': '2017-11-03T10:00:00.000Z', 'due_date': '2017-11-04'},
+    {'id': 2, 'title': 'two', 'weight': None, 'author': None,
+     'created_at': '2017-11-03T12:00:00.500+02:00', 'due_date': None},
+]
+
+
+class TestExport(unittest.TestCase):
+    def test_parse_date(self):
+        self.assertEqual(export.parse_date('1970-01-02'), 86400)
+        self.assertEqual(export.parse_date('1970-01-01T01:00:00Z'), 3600)
+        self.assertEqual(export.parse_date('1970-01-01T01:00:00.25+01:00'),
+                         0.25)
+        self.assertIsNone(export.parse_date(None))
+        self.assertRaises(ValueError, export.parse_date, 'yesterday')
+
+    def test_to_columns(self):
+        columns = export.to_columns(ISSUES, ['id', 'title', 'weight',
+                                             'author.username', 'created_at',
+                                             'due_date'],
+                                    parse_dates=['created_at', 'due_date'])
+        self.assertIsInstance(columns['id'], array.array)
+        self.assertEqual(list(columns['id']), [1, 2])
+        self.assertEqual(columns['title'], ['one', 'two'])
+        # a missing value turns the column into a list
+        self.assertEqual(columns['weight'], [3, None])
+        self.assertEqual(columns['author.username'], ['jdoe', None])
+        self.assertEqual(columns['created_at'].typecode, 'd')
+        self.assertEqual(columns['created_at'][0], 1509703200)
+        self.assertEqual(columns['created_at'][1], 1509703200.5)
+        self.assertNotEqual(columns['due_date'][1],
+                            columns['due_date'][1])  # NaN
+
+    def test_list_to_columns(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/issues', method="get")
+        def resp_issues(url, request):
+            headers = {'Content-Type': 'application/json', 'X-Total': '2'}
+            return response(200, json.dumps(ISSUES), headers, None, 5,
+                            request)
+
+        gl = Gitlab("http://localhost", private_token="private_token",
+                    api_version=4)
+        project = gl.projects.get(1, lazy=True)
+        with HTTMock(resp_issues):
+            issues = project.issues.list(as_list=False)
+            columns = issues.to_columns(['id', 'title'])
+        self.assertEqual(list(columns['id']), [1, 2])
+        self.assertEqual(columns['title'], ['one', 'two'])
+
+
+class TestExportFile(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4)
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'users.csv')
+        self.fail_page = None
+
+        @urlmatch(scheme="http", netloc="localhost", path='/api/v4/users',
+                  method="get")
+        def resp_users(url, request):
+            page = 2 if '&page=2' in url.query else 1
+            if page == self.fail_page:
+                return response(500, '{"message": "error"}', {}, None, 5,
+                                request)
+            headers = {'Content-Type': 'application/json'}
+            if page == 1:
+                self.assertIn('active=True', url.query)
+                headers['Link'] = ('<http://localhost/api/v4/users?'
+                                   'active=True&per_page=2&page=2>; '
+                                   'rel="next"')
+            content = [{'id': page * 10 + i, 'username': 'user%d' % i,
+                        'identities': [], 'name': u'J\xe9r\xf4me'}
+                       for i in range(2)]
+            return response(200, json.dumps(content), headers, None, 5,
+                            request)
+        self.resp_users = resp_users
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_export_csv(self):
+        with HTTMock(self.resp_users):
+            count = export.export(self.gl.users, self.filename, per_page=2,
+                                  fields=['id', 'username', 'name'],
+                                  active=True)
+        self.assertEqual(count, 4)
+        with open(self.filename, 'rb') as f:
+            lines = f.read().decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'id,username,name')
+        self.assertEqual(lines[1], u'10,user0,J\xe9r\xf4me')
+        self.assertEqual(len(lines), 5)
+        self.assertFalse(os.path.exists(self.filename + '.state'))
+
+    def test_export_resume(self):
+        self.fail_page = 2
+        with HTTMock(self.resp_users):
+            self.assertRaises(GitlabListError, export.export, self.gl.users,
+                              self.filename, format='json', compress=True,
+                              per_page=2, active=True)
+        self.assertTrue(os.path.exists(self.filename + '.state'))
+
+        self.fail_page = None
+        with HTTMock(self.resp_users):
+            count = export.export(self.gl.users, self.filename,
+                                  format='json', compress=True, resume=True)
+        self.assertEqual(count, 4)
+        with gzip.open(self.filename) as f:
+            items = [json.loads(line.decode('utf-8')) for line in f]
+        self.assertEqual([i['id'] for i in items], [10, 11, 20, 21])
+        self.assertEqual(items[0]['identities'], [])
+        self.assertFalse(os.path.exists(self.filename + '.state'))
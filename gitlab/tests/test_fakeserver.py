@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from gitlab import *  # noqa
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+class TestFakeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeGitlabServer(projects=45, users=45, groups=3,
+                                       children=5, file_size=100000)
+        self.server.start()
+        self.gl = Gitlab(self.server.url, private_token="private_token",
+                         api_version=4)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_list(self):
+        projects = self.gl.projects.list(per_page=20)
+        self.assertEqual(len(projects), 20)
+        # /projects generators use keyset pagination
+        obj = self.gl.users.list(as_list=False)
+        self.assertEqual(obj.total, 45)
+        self.assertEqual(obj.total_pages, 3)
+        self.assertEqual(len(list(obj)), 45)
+        self.assertEqual(len(self.gl.groups.get(2).projects.list(all=True)),
+                         15)
+
+    def test_keyset(self):
+        ids = [p.id for p in self.gl.projects.list(as_list=False,
+                                                   pagination='keyset',
+                                                   order_by='id')]
+        self.assertEqual(ids, list(range(1, 46)))
+
+    def test_crud(self):
+        project = self.gl.projects.get('group-1/project-4')
+        self.assertEqual(project.id, 4)
+        issues = project.issues.list()
+        self.assertEqual([i.iid for i in issues], [1, 2, 3, 4, 5])
+        issue = project.issues.create({'title': 'new issue'})
+        self.assertEqual(issue.iid, 6)
+        issue.title = 'updated'
+        issue.save()
+        self.assertEqual(project.issues.get(6).title, 'updated')
+        issue.delete()
+        self.assertRaises(GitlabGetError, project.issues.get, 6)
+
+    def test_raw_file(self):
+        project = self.gl.projects.get(1, lazy=True)
+        chunks = []
+        project.files.raw('README', 'master', streamed=True,
+                          action=chunks.append)
+        self.assertEqual(sum(len(c) for c in chunks), 100000)
+
+    def test_failures(self):
+        self.server.throttle_rate = 0.5
+        self.assertEqual(len(self.gl.projects.list(all=True)), 45)
+        self.server.throttle_rate = 0
+        self.server.error_rate = 1
+        self.assertRaises(GitlabListError, self.gl.projects.list)
+
+    def test_rate_limit(self):
+        self.server.rate_limit = 2
+        result = self.gl.http_request('get', '/projects',
+                                      obey_rate_limit=False)
+        self.assertEqual(result.headers['RateLimit-Limit'], '2')
@@ -18,7 +18,12 @@
 
 from __future__ import print_function
 
+import json
+import os
 import pickle
+import subprocess
+import sys
+import time
 try:
     import unittest
 except ImportError:
@@ -27,10 +32,28 @@ except ImportError:
 from httmock import HTTMock  # noqa
 from httmock import response  # noqa
 from httmock import urlmatch  # noqa
+import mock
 import six
 
 import gitlab
 from gitlab import *  # noqa
+from gitlab import metrics
+from gitlab import utils
+
+
+class TestImport(unittest.TestCase):
+    def test_lazy_imports(self):
+        # the optional modules are not imported by the CLI
+        code = ('import sys, gitlab, gitlab.v4.cli; '
+                'gl = gitlab.Gitlab("http://localhost", api_version=4); '
+                'print(",".join(m for m in ("gitlab.parallel", '
+                '"gitlab.export", "gitlab.metrics", "multiprocessing") '
+                'if m in sys.modules))')
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(gitlab.__file__))
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         env=env)
+        self.assertEqual(output.decode().strip(), '')
 
 
 class TestSanitize(unittest.TestCase):
@@ -223,6 +246,159 @@ class TestGitlabList(unittest.TestCase):
                 self.assertEqual(l[0]['a'], 'b')
                 self.assertEqual(l[1]['c'], 'd')
 
+    def test_checkpoint(self):
+        @urlmatch(scheme='http', netloc="localhost", path="/api/v4/tests",
+                  method="get")
+        def resp_pages(url, request):
+            page = 2 if '&page=2' in url.query else 1
+            headers = {'content-type': 'application/json'}
+            if page == 1:
+                self.assertIn('per_page=2', url.query)
+                headers['Link'] = ('<http://localhost/api/v4/tests?'
+                                   'per_page=2&page=2>; rel="next"')
+            content = json.dumps([{'id': page * 10}, {'id': page * 10 + 1}])
+            return response(200, content, headers, None, 5, request)
+
+        tokens = []
+        with HTTMock(resp_pages):
+            obj = self.gl.http_list('/tests', as_list=False,
+                                    query_data={'per_page': 2},
+                                    on_checkpoint=tokens.append)
+            self.assertEqual(next(obj)['id'], 10)
+            token = obj.checkpoint()
+            self.assertEqual([i['id'] for i in obj], [11, 20, 21])
+            self.assertEqual(len(tokens), 1)
+
+            resumed = self.gl.http_list('/tests', checkpoint=token,
+                                        as_list=False)
+            self.assertEqual([i['id'] for i in resumed], [11, 20, 21])
+            resumed = self.gl.http_list('/tests', checkpoint=tokens[0],
+                                        all=True)
+            self.assertEqual([i['id'] for i in resumed], [20, 21])
+
+    def test_checkpoint_request_options(self):
+        @urlmatch(scheme='http', netloc="localhost", path="/api/v4/tests",
+                  method="get")
+        def resp_cont(url, request):
+            self.assertNotIn('retries', url.query)
+            headers = {'content-type': 'application/json'}
+            return response(200, '[{"id": 1}]', headers, None, 5, request)
+
+        with HTTMock(resp_cont):
+            obj = self.gl.http_list('/tests', as_list=False, sudo='jdoe',
+                                    max_retries=3, obey_rate_limit=False)
+            token = obj.checkpoint()
+            self.assertEqual(json.loads(token)['params'], {'sudo': 'jdoe'})
+
+            with mock.patch.object(self.gl, 'http_request',
+                                   wraps=self.gl.http_request) as request:
+                resumed = self.gl.http_list('/tests', checkpoint=token,
+                                            max_retries=5, as_list=False)
+            self.assertEqual([i['id'] for i in resumed], [1])
+            self.assertEqual(request.call_args[1]['max_retries'], 5)
+            self.assertEqual(request.call_args[1]['query_data'],
+                             {'sudo': 'jdoe'})
+
+    def test_keyset_pagination(self):
+        @urlmatch(scheme='http', netloc="localhost", path="/api/v4/projects",
+                  method="get")
+        def resp_projects(url, request):
+            headers = {'content-type': 'application/json'}
+            if 'id_after' not in url.query:
+                self.assertIn('pagination=keyset', url.query)
+                self.assertIn('order_by=id', url.query)
+                headers['Link'] = ('<http://localhost/api/v4/projects?'
+                                   'pagination=keyset&order_by=id&'
+                                   'id_after=1>; rel="next"')
+                content = '[{"id": 1}]'
+            else:
+                content = '[{"id": 2}]'
+            return response(200, content, headers, None, 5, request)
+
+        with HTTMock(resp_projects):
+            obj = self.gl.http_list('/projects', as_list=False)
+            self.assertIsNone(obj.total)
+            self.assertIsNone(obj.total_pages)
+            self.assertIsNone(obj.current_page)
+            self.assertRaises(TypeError, len, obj)
+            self.assertTrue(obj)
+            self.assertEqual([i['id'] for i in obj], [1, 2])
+
+    def test_keyset_pagination_not_used(self):
+        @urlmatch(scheme='http', netloc="localhost",
+                  path="/api/v4/(projects|groups)", method="get")
+        def resp_projects(url, request):
+            self.assertNotIn('keyset', url.query)
+            headers = {'content-type': 'application/json', 'X-Total': '0'}
+            return response(200, '[]', headers, None, 5, request)
+
+        with HTTMock(resp_projects):
+            self.assertEqual(self.gl.http_list('/projects'), [])
+            self.assertEqual(self.gl.http_list('/projects', order_by='name',
+                                               all=True), [])
+            obj = self.gl.http_list('/groups', as_list=False)
+            self.assertFalse(obj)
+
+    def test_list_intern_strings(self):
+        @urlmatch(scheme='http', netloc="localhost", path="/api/v4/tests",
+                  method="get")
+        def resp_cont(url, request):
+            headers = {'content-type': 'application/json'}
+            content = ('[{"state": "opened", "title": "%s"},'
+                       ' {"state": "opened", "title": "b"}]' % ('a' * 100))
+            return response(200, content, headers, None, 5, request)
+
+        with HTTMock(resp_cont):
+            l1 = self.gl.http_list('/tests', intern_strings=True)
+            l2 = self.gl.http_list('/tests', intern_strings=True)
+        self.assertEqual(l1[0]['state'], 'opened')
+        self.assertIs(l1[1]['state'], l2[1]['state'])
+        self.assertIs(list(l1[0])[0], list(l2[1])[0])
+        self.assertIsNot(l1[0]['title'], l2[0]['title'])
+        self.assertEqual(len(self.gl._intern_table), 4)
+
+    def test_intern_table_bounds(self):
+        table = utils.InternTable(max_size=2, max_keys=2)
+
+        def loads(data):
+            return json.loads(data, object_pairs_hook=table.object_pairs_hook)
+
+        obj1 = loads('{"a": "opened", "b": "unique"}')
+        obj2 = loads('{"a": "opened"}')
+        obj3 = loads('{"a": "opened", "c": "closed"}')
+        # values are only shared once repeated
+        self.assertEqual({'opened': 'opened'}, table._values)
+        self.assertIsNot(obj1['a'], obj2['a'])
+        self.assertIs(obj2['a'], obj3['a'])
+        # the keys and the values seen once are bounded
+        self.assertEqual(['a', 'b'], sorted(table._keys))
+        self.assertEqual({'unique', 'closed'}, table._candidates)
+        loads('{"a": "locked"}')
+        self.assertEqual({'locked'}, table._candidates)
+
+    def test_list_intern_strings_hooks(self):
+        @urlmatch(scheme='http', netloc="localhost", path="/api/v4/tests",
+                  method="get")
+        def resp_cont(url, request):
+            headers = {'content-type': 'application/json'}
+            content = '[{"state": "opened"}, {"state": "closed"}]'
+            return response(200, content, headers, None, 5, request)
+
+        calls = []
+
+        class CountingTable(utils.InternTable):
+            def object_pairs_hook(self, pairs):
+                calls.append(pairs)
+                return super(CountingTable, self).object_pairs_hook(pairs)
+
+        self.gl._intern_table = CountingTable()
+        self.gl.add_hook('response', lambda info: None)
+        with HTTMock(resp_cont):
+            result = self.gl.http_list('/tests', intern_strings=True)
+        self.assertEqual(result, [{'state': 'opened'}, {'state': 'closed'}])
+        # the response is only decoded once
+        self.assertEqual(len(calls), 2)
+
 
 class TestGitlabHttpMethods(unittest.TestCase):
     def setUp(self):
@@ -262,6 +438,142 @@ class TestGitlabHttpMethods(unittest.TestCase):
                               self.gl.http_request,
                               'get', '/not_there')
 
+    def test_http_request_rate_limit(self):
+        calls = []
+
+        @urlmatch(scheme="http", netloc="localhost", path="/api/v4/projects",
+                  method="get")
+        def resp_cont(url, request):
+            calls.append(url)
+            if len(calls) < 3:
+                headers = {'Retry-After': '0'}
+                return response(429, '{"message": "slow down"}', headers,
+                                None, 5, request)
+            return response(200, '[]', {}, None, 5, request)
+
+        with HTTMock(resp_cont):
+            http_r = self.gl.http_request('get', '/projects')
+            self.assertEqual(http_r.status_code, 200)
+            self.assertEqual(len(calls), 3)
+
+            del calls[:]
+            self.assertRaises(GitlabHttpError, self.gl.http_request, 'get',
+                              '/projects', obey_rate_limit=False)
+            del calls[:]
+            self.assertRaises(GitlabHttpError, self.gl.http_request, 'get',
+                              '/projects', max_retries=1)
+            self.assertEqual(len(calls), 2)
+
+    def test_http_request_rate_limit_wait(self):
+        calls = []
+        retry_after = []
+
+        @urlmatch(scheme="http", netloc="localhost", path="/api/v4/projects",
+                  method="get")
+        def resp_cont(url, request):
+            calls.append(url)
+            if retry_after:
+                headers = {'Retry-After': retry_after.pop(0)}
+                return response(429, '{"message": "slow down"}', headers,
+                                None, 5, request)
+            return response(200, '[]', {}, None, 5, request)
+
+        with HTTMock(resp_cont):
+            # HTTP date in the past: no wait
+            retry_after.append('Wed, 21 Oct 2015 07:28:00 GMT')
+            http_r = self.gl.http_request('get', '/projects')
+            self.assertEqual(http_r.status_code, 200)
+            self.assertEqual(len(calls), 2)
+
+            del calls[:]
+            retry_after.append('1')
+            start = time.time()
+            self.assertRaises(GitlabHttpError, self.gl.http_request, 'get',
+                              '/projects', max_retry_wait=0.5)
+            self.assertEqual(len(calls), 1)
+            self.assertLess(time.time() - start, 0.5)
+
+        self.assertEqual(utils.retry_after('2.5'), 2.5)
+        self.assertIsNone(utils.retry_after('soon'))
+
+    def test_hooks(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path="/api/v4/projects/1/issues", method="get")
+        def resp_cont(url, request):
+            headers = {'content-type': 'application/json'}
+            return response(200, '[{"id": 1}]', headers, None, 5, request)
+
+        @urlmatch(scheme="http", netloc="localhost",
+                  path="/api/v4/projects/group%2Fproject", method="get")
+        def resp_404(url, request):
+            return response(404, '{"message": "Not found"}', {}, None, 5,
+                            request)
+
+        events = []
+        for event in ('request', 'response', 'error'):
+            self.gl.add_hook(event, lambda info, event=event:
+                             events.append((event, dict(info))))
+        self.assertRaises(ValueError, self.gl.add_hook, 'foo', None)
+
+        with HTTMock(resp_cont, resp_404):
+            result = self.gl.http_get('/projects/1/issues', page=2)
+            self.assertEqual(result, [{'id': 1}])
+            self.assertRaises(GitlabHttpError, self.gl.http_get,
+                              '/projects/group%2Fproject')
+
+        self.assertEqual([e[0] for e in events],
+                         ['request', 'response', 'request', 'response',
+                          'error'])
+        info = events[1][1]
+        self.assertEqual(info['route'], '/projects/:id/issues')
+        self.assertEqual(info['verb'], 'get')
+        self.assertEqual(info['status'], 200)
+        self.assertEqual(info['bytes'], 11)
+        for timing in ('prep_time', 'network_time', 'json_time'):
+            self.assertGreaterEqual(info[timing], 0)
+        self.assertEqual(events[4][1]['route'], '/projects/:id')
+        self.assertIsInstance(events[4][1]['error'], GitlabHttpError)
+
+    def test_route_template(self):
+        route = metrics.route_template
+        self.assertEqual(route('http://localhost/api/v4/projects/12/issues/3'
+                               '?page=2', 'http://localhost/api/v4'),
+                         '/projects/:id/issues/:id')
+        self.assertEqual(route('/projects/group%2Fproject/repository/commits/'
+                               'ed899a2f4b50b4370feeea94676502b4/diff'),
+                         '/projects/:id/repository/commits/:id/diff')
+        self.assertEqual(route('/projects/1/repository/branches/master'),
+                         '/projects/:id/repository/branches/:id')
+        self.assertEqual(route('/users/jdoe/projects'), '/users/:id/projects')
+        self.assertEqual(route('/projects/1/jobs/artifacts/master/download'),
+                         '/projects/:id/jobs/artifacts/:id/download')
+        self.assertEqual(route('/projects/1/issues/'), '/projects/:id/issues/')
+
+    def test_metrics(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path=r"/api/v4/projects/\d+", method="get")
+        def resp_cont(url, request):
+            headers = {'content-type': 'application/json'}
+            return response(200, '{"id": 1}', headers, None, 5, request)
+
+        metrics = self.gl.enable_metrics()
+        self.assertIs(self.gl.enable_metrics(), metrics)
+        with HTTMock(resp_cont):
+            self.gl.http_get('/projects/1')
+            self.gl.http_get('/projects/2')
+
+        data = json.loads(metrics.to_json())['series']
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['route'], '/projects/:id')
+        self.assertEqual(data[0]['network_time']['count'], 2)
+        self.assertEqual(data[0]['bytes'], 18)
+        text = metrics.to_prometheus()
+        self.assertIn('gitlab_client_network_seconds_bucket{verb="GET",'
+                      'route="/projects/:id",status="200",le="+Inf"} 2',
+                      text)
+        self.assertIn('gitlab_client_response_bytes_total{verb="GET",'
+                      'route="/projects/:id",status="200"} 18', text)
+
     def test_get_request(self):
         @urlmatch(scheme="http", netloc="localhost", path="/api/v4/projects",
                   method="get")
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+
+from gitlab import *  # noqa
+from gitlab import mirror
+
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4)
+        self.mirror = mirror.Mirror(self.gl)
+        self.projects = [
+            {'id': 1, 'name': 'one', 'namespace': {'id': 10},
+             'issues_enabled': True,
+             'last_activity_at': '2017-11-01T10:00:00.000Z'},
+            {'id': 2, 'name': 'two', 'namespace': {'id': 11},
+             'issues_enabled': False,
+             'last_activity_at': '2017-11-02T10:00:00.000Z'},
+        ]
+        self.requests = []
+
+        @urlmatch(scheme="http", netloc="localhost", path='/api/v4/.*',
+                  method="get")
+        def resp_get(url, request):
+            self.requests.append((url.path, url.query))
+            path = url.path[len('/api/v4'):]
+            if path == '/projects':
+                content = self.projects
+                if 'last_activity_after' in url.query:
+                    content = content[1:]
+            elif path == '/groups':
+                content = [{'id': 10, 'full_path': 'group'}]
+            elif path == '/users':
+                content = [{'id': 5, 'username': 'jdoe',
+                            'created_at': '2017-10-01T10:00:00.000Z'}]
+            elif path.endswith('/members'):
+                content = [{'id': 5, 'username': 'jdoe', 'access_level': 30}]
+            else:
+                content = [{'name': 'bug', 'color': '#ff0000'}]
+            headers = {'Content-Type': 'application/json'}
+            return response(200, json.dumps(content), headers, None, 5,
+                            request)
+        self.resp_get = resp_get
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_sync_and_find(self):
+        with HTTMock(self.resp_get):
+            result = self.mirror.sync()
+        self.assertEqual(result, {'groups': 1, 'projects': 2, 'users': 1,
+                                  'members': 3, 'labels': 2})
+        self.assertEqual(self.mirror.last_sync('projects'),
+                         '2017-11-02T10:00:00.000Z')
+
+        projects = self.mirror.find('projects', {'namespace.id': 10,
+                                                 'issues_enabled': True})
+        self.assertEqual([p['name'] for p in projects], ['one'])
+        projects = self.mirror.find('projects', {'name__ne': 'one'})
+        self.assertEqual([p['id'] for p in projects], [2])
+        users = self.mirror.find('users',
+                                 {'created_at__gt': '2017-09-01'})
+        self.assertEqual(users[0]['username'], 'jdoe')
+        members = self.mirror.find('members', {'source_type': 'group'})
+        self.assertEqual(members[0]['source_id'], 10)
+        labels = self.mirror.find('labels', {'project_id': 2})
+        self.assertEqual(labels[0]['name'], 'bug')
+        self.assertEqual(self.mirror.get('projects', 2)['name'], 'two')
+        self.assertIsNone(self.mirror.get('projects', 3))
+        self.assertRaises(ValueError, self.mirror.find, 'foo')
+
+    def test_incremental_sync(self):
+        with HTTMock(self.resp_get):
+            self.mirror.sync()
+            self.projects[1]['name'] = 'renamed'
+            del self.requests[:]
+            result = self.mirror.sync()
+
+        self.assertEqual(result['projects'], 1)
+        self.assertEqual(result['members'], 1)
+        self.assertEqual(self.mirror.get('projects', 2)['name'], 'renamed')
+        self.assertEqual(self.mirror.get('projects', 1)['name'], 'one')
+        paths = [r[0] for r in self.requests]
+        self.assertNotIn('/api/v4/projects/1/labels', paths)
+        self.assertNotIn('/api/v4/groups/10/members', paths)
+        query = [r[1] for r in self.requests if r[0] == '/api/v4/projects']
+        self.assertIn('last_activity_after=2017-11-02T10', query[0])
+
+    def test_incremental_sync_group_members(self):
+        with HTTMock(self.resp_get):
+            self.mirror.sync()
+            self.projects[1]['namespace']['id'] = 10
+            del self.requests[:]
+            result = self.mirror.sync()
+
+        self.assertEqual(result['members'], 2)
+        paths = [r[0] for r in self.requests]
+        self.assertIn('/api/v4/groups/10/members', paths)
+
+    def test_full_sync_prunes(self):
+        with HTTMock(self.resp_get):
+            self.mirror.sync()
+            del self.projects[0]
+            self.mirror.sync(full=True)
+        self.assertIsNone(self.mirror.get('projects', 1))
+        self.assertEqual(self.mirror.find('labels', {'project_id': 1}), [])
+        self.assertEqual(self.mirror.find('members', {'source_id': 1}), [])
@@ -18,6 +18,7 @@
 
 from __future__ import print_function
 
+import json
 try:
     import unittest
 except ImportError:
@@ -409,3 +410,50 @@ class TestMixinMethods(unittest.TestCase):
             obj.save()
             self.assertEqual(obj._attrs['foo'], 'baz')
             self.assertDictEqual(obj._updated_attrs, {})
+
+    def test_save_mixin_only_changed_attrs(self):
+        class M(UpdateMixin, FakeManager):
+            _update_attrs = (('name', ), ('foo', 'labels'))
+
+        class O(SaveMixin, RESTObject):
+            pass
+
+        @urlmatch(scheme="http", netloc="localhost", path='/api/v4/tests/42',
+                  method="put")
+        def resp_cont(url, request):
+            self.assertEqual(json.loads(request.body),
+                             {'name': 'obj', 'labels': ['a', 'b']})
+            headers = {'Content-Type': 'application/json'}
+            content = ('{"id": 42, "name": "obj", "foo": "bar",'
+                       ' "labels": ["a", "b"]}')
+            return response(200, content, headers, None, 5, request)
+
+        with HTTMock(resp_cont):
+            mgr = M(self.gl)
+            obj = O(mgr, {'id': 42, 'name': 'obj', 'foo': 'bar',
+                          'labels': ['a']})
+            # reading a list or setting the same value is not a change
+            self.assertEqual(obj.labels, ['a'])
+            obj.foo = 'bar'
+            self.assertEqual(obj._get_updated_data(), {})
+            obj.labels.append('b')
+            obj.save()
+            self.assertEqual(obj._attrs['labels'], ['a', 'b'])
+
+    def test_save_mixin_no_change(self):
+        class M(UpdateMixin, FakeManager):
+            pass
+
+        class O(SaveMixin, RESTObject):
+            pass
+
+        @urlmatch(scheme="http", netloc="localhost", path='/api/v4/tests/42',
+                  method="put")
+        def resp_cont(url, request):
+            self.fail('No request expected')
+
+        with HTTMock(resp_cont):
+            mgr = M(self.gl)
+            obj = O(mgr, {'id': 42, 'labels': ['a']})
+            obj.labels
+            obj.save()
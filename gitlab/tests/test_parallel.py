@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from gitlab import *  # noqa
+from gitlab import parallel
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+def analyze(issue):
+    return (issue.iid, issue.manager.path, len(issue.description.split()),
+            os.getpid())
+
+
+def get_project(issue):
+    return issue.manager.gitlab.projects.get(issue.project_id)
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeGitlabServer(projects=3, children=6).start()
+        self.gl = Gitlab(self.server.url, private_token="private_token",
+                         api_version=4, timeout=10)
+        self.issues = self.gl.projects.get(2, lazy=True).issues.list()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_pack(self):
+        issue = self.issues[0]
+        issue.title = 'updated'
+        payload = parallel.pack(issue)
+        self.assertLess(len(pickle.dumps(payload)),
+                        len(pickle.dumps(issue)) / 2)
+        gl = parallel.client_from_spec(parallel.client_spec(self.gl))
+        self.assertEqual(gl._url, self.gl._url)
+        self.assertEqual(gl.timeout, 10)
+        obj = parallel.unpack(pickle.loads(pickle.dumps(payload)), gl)
+        self.assertIs(obj.manager.gitlab, gl)
+        self.assertEqual(obj.manager.path, issue.manager.path)
+        self.assertEqual(obj.attributes, issue.attributes)
+        self.assertEqual(obj._updated_attrs, {'title': 'updated'})
+        self.assertEqual(parallel.pack(42), 42)
+
+    def test_pmap(self):
+        results = list(self.gl.pmap(analyze, self.issues, processes=2))
+        self.assertEqual([r[0] for r in results], list(range(1, 7)))
+        self.assertEqual(set(r[1] for r in results),
+                         set([self.issues[0].manager.path]))
+        self.assertNotIn(os.getpid(), [r[3] for r in results])
+
+        projects = list(self.gl.pmap(get_project, self.issues[:2],
+                                     processes=2, ordered=False))
+        self.assertEqual([p.id for p in projects], [2, 2])
+        self.assertIs(projects[0].manager.gitlab, self.gl)
+        self.assertEqual(self.server.tokens['private_token'], 3)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from gitlab import *  # noqa
+from gitlab import pool
+from gitlab import utils
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+class TestTokenPool(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeGitlabServer(projects=30, rate_limit=6)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def client(self, **kwargs):
+        self.pool = pool.TokenPool(['t1', 't2', 't3'], **kwargs)
+        return Gitlab(self.server.url, private_token="private_token",
+                      api_version=4, transport=self.pool)
+
+    def test_round_robin(self):
+        gl = self.client()
+        for i in range(1, 4):
+            gl.projects.get(i)
+        self.assertEqual([s['requests'] for s in self.pool.stats()],
+                         [1, 1, 1])
+        self.assertEqual(self.server._windows.get('private_token'), None)
+
+    def test_throughput(self):
+        # 18 requests allowed per second with 3 tokens, 6 with one
+        gl = self.client(strategy='least-loaded')
+        projects = list(utils.thread_map(
+            lambda id: gl.http_get('/projects/%d' % id, obey_rate_limit=False),
+            range(1, 16), workers=4))
+        self.assertEqual(len(projects), 15)
+        self.assertEqual(sum(s['requests'] for s in self.pool.stats()) -
+                         sum(s['throttled'] for s in self.pool.stats()), 15)
+
+    def test_failover(self):
+        gl = self.client()
+        self.server.rate_limit = 1
+        for i in range(1, 4):
+            gl.http_get('/projects/%d' % i, obey_rate_limit=False)
+        # the window of the 3 tokens may have been reset in between
+        stats = self.pool.stats()
+        self.assertTrue(all(s['remaining'] in (0, None) for s in stats))
+
+    def test_errors(self):
+        self.assertRaises(ValueError, pool.TokenPool, [])
+        self.assertRaises(ValueError, pool.TokenPool, ['t'], strategy='foo')
+        p = pickle.loads(pickle.dumps(pool.TokenPool(['t1', 't2'])))
+        self.assertEqual(p._acquire().token, 't1')
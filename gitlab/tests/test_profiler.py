@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+
+from gitlab import *  # noqa
+from gitlab import profiler
+
+
+@urlmatch(scheme="http", netloc="localhost", path='/api/v4/projects/1.*',
+          method="get")
+def resp_get(url, request):
+    headers = {'Content-Type': 'application/json'}
+    if '/issues' in url.path:
+        content = [{'id': i, 'iid': i} for i in range(3)]
+    else:
+        content = {'id': 1, 'name': 'project'}
+    return response(200, json.dumps(content), headers, None, 5, request)
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4)
+
+    def test_profiler(self):
+        with HTTMock(resp_get):
+            with profiler.Profiler(self.gl) as prof:
+                project = self.gl.projects.get(1)
+                project.issues.list()
+                list(project.issues.list(as_list=False))
+            # stopped
+            self.gl.projects.get(1)
+
+        self.assertIsNone(self.gl._profiler)
+        self.assertEqual(self.gl._hooks['response'], [])
+        self.assertEqual(sorted(prof.stats),
+                         ['ProjectIssueManager.list', 'ProjectManager.get'])
+        stats = prof.stats['ProjectIssueManager.list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['objects'], 6)
+        self.assertGreater(stats['times']['objects'], 0)
+        self.assertEqual(prof.stats['ProjectManager.get']['objects'], 1)
+        self.assertGreater(prof.totals()['network'], 0)
+        self.assertGreater(prof.wall_time, 0)
+
+        report = prof.report().splitlines()
+        self.assertTrue(report[0].startswith('method'))
+        self.assertTrue(report[-1].startswith('wall time:'))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+
+from gitlab import *  # noqa
+from gitlab import reconcile
+
+
+class TestReconcile(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4, thread_safe=True)
+        self.projects = [self.gl.projects.get(1, lazy=True),
+                         self.gl.projects.get(2, lazy=True)]
+        self.requests = []
+
+        @urlmatch(scheme="http", netloc="localhost",
+                  path=r'/api/v4/projects/\d+/labels')
+        def resp_labels(url, request):
+            self.requests.append((request.method, url.path, request.body))
+            headers = {'Content-Type': 'application/json'}
+            if request.method == 'GET':
+                content = [{'name': 'bug', 'color': '#ff0000'},
+                           {'name': 'old', 'color': '#000000'}]
+                if url.path.startswith('/api/v4/projects/2/'):
+                    content[0]['color'] = '#00ff00'
+            else:
+                content = {'name': 'bug', 'color': '#ff0000'}
+            return response(200, json.dumps(content), headers, None, 5,
+                            request)
+
+        @urlmatch(scheme="http", netloc="localhost",
+                  path=r'/api/v4/projects/\d+$', method='get')
+        def resp_project(url, request):
+            self.requests.append((request.method, url.path, request.body))
+            headers = {'Content-Type': 'application/json'}
+            content = {'id': int(url.path.split('/')[-1]),
+                       'issues_enabled': True}
+            return response(200, json.dumps(content), headers, None, 5,
+                            request)
+
+        self.mocks = (resp_labels, resp_project)
+
+    def test_nothing_to_do(self):
+        spec = {'settings': {'issues_enabled': True},
+                'labels': [{'name': 'bug', 'color': '#ff0000'}]}
+        with HTTMock(*self.mocks):
+            changes = reconcile.reconcile(self.projects[:1], spec)
+        self.assertEqual(changes, [])
+        self.assertEqual(set(r[0] for r in self.requests), set(['GET']))
+
+    def test_dry_run(self):
+        spec = {'labels': [{'name': 'bug', 'color': '#ff0000'},
+                           {'name': 'new', 'color': '#0000ff'}]}
+        with HTTMock(*self.mocks):
+            changes = reconcile.reconcile(self.projects, spec, dry_run=True,
+                                          prune=True)
+        self.assertEqual(set(r[0] for r in self.requests), set(['GET']))
+        summary = sorted((c.parent.id, c.action, c.key) for c in changes)
+        self.assertEqual(summary, [(1, 'create', 'new'),
+                                   (1, 'delete', 'old'),
+                                   (2, 'create', 'new'),
+                                   (2, 'delete', 'old'),
+                                   (2, 'update', 'bug')])
+        update = [c for c in changes if c.action == 'update'][0]
+        self.assertEqual(update.diff, {'color': ('#00ff00', '#ff0000')})
+        self.assertEqual(str(update),
+                         "Project 2: update labels 'bug' "
+                         "(color: '#00ff00' -> '#ff0000')")
+
+    def test_apply(self):
+        spec = {'labels': [{'name': 'bug', 'color': '#ff0000'}]}
+        with HTTMock(*self.mocks):
+            changes = reconcile.reconcile(self.projects[1:], spec, prune=True)
+        self.assertEqual([c.error for c in changes], [None, None])
+        writes = sorted(r[:2] for r in self.requests if r[0] != 'GET')
+        self.assertEqual(writes, [('DELETE', '/api/v4/projects/2/labels'),
+                                  ('PUT', '/api/v4/projects/2/labels')])
+        put = [r for r in self.requests if r[0] == 'PUT'][0]
+        self.assertEqual(json.loads(put[2])['color'], '#ff0000')
+
+    def test_protected_branches_diff(self):
+        class FakeBranch(object):
+            attributes = {'name': 'master',
+                          'push_access_levels': [{'access_level': 40}],
+                          'merge_access_levels': [{'access_level': 30}]}
+
+        desired = [{'name': 'master', 'push_access_level': 40,
+                    'merge_access_level': 40}]
+        changes = reconcile.diff(None, 'protectedbranches', desired,
+                                 [FakeBranch()])
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].data, {'merge_access_level': 40})
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+import requests
+
+from gitlab import *  # noqa
+from gitlab import replay
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+def workload(gl):
+    project = gl.projects.get('group-1/project-1')
+    issues = project.issues.list(all=True, per_page=2)
+    issue = project.issues.create({'title': 'new'})
+    content = project.files.raw('README', 'master')
+    return [i.iid for i in issues], issue.iid, content
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'run.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def record(self):
+        with FakeGitlabServer(projects=3, children=5, file_size=3000,
+                              latency=0.02) as server:
+            with replay.RecordingSession(self.filename) as session:
+                gl = Gitlab(server.url, private_token="private_token",
+                            api_version=4, session=session)
+                return workload(gl)
+
+    def test_record_replay(self):
+        expected = self.record()
+        self.assertEqual(expected[:2], ([1, 2, 3, 4, 5], 6))
+        self.assertEqual(len(expected[2]), 3000)
+
+        with gzip.open(self.filename) as f:
+            lines = [json.loads(line.decode('utf-8')) for line in f]
+        self.assertEqual(lines[0]['version'], replay.VERSION)
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(lines[1]['headers']['PRIVATE-TOKEN'], '[redacted]')
+        self.assertEqual(lines[5]['body'], '{"title": "new"}')
+
+        session = replay.ReplaySession(self.filename)
+        gl = Gitlab("http://otherhost", api_version=4, session=session)
+        start = time.time()
+        self.assertEqual(workload(gl), expected)
+        self.assertLess(time.time() - start, 0.1)
+        self.assertRaises(GitlabReplayError, gl.projects.get, 2)
+
+        gl = Gitlab("http://otherhost", api_version=4,
+                    session=replay.ReplaySession(self.filename, timing=True))
+        start = time.time()
+        self.assertEqual(workload(gl), expected)
+        self.assertGreater(time.time() - start, 0.12)
+
+    def read_lines(self):
+        with gzip.open(self.filename) as f:
+            return [json.loads(line.decode('utf-8')) for line in f][1:]
+
+    def test_redact_session(self):
+        @urlmatch(scheme="http", netloc="localhost", path="/api/v4/session",
+                  method="post")
+        def resp_session(url, request):
+            headers = {'Content-Type': 'application/json',
+                       'Set-Cookie': '_gitlab_session=secret; path=/'}
+            content = '{"id": 1, "username": "jdoe", "private_token": "tok"}'
+            return response(201, content, headers, None, 5, request)
+
+        with replay.RecordingSession(self.filename) as session:
+            gl = Gitlab("http://localhost", email='jdoe@example.com',
+                        password='secret', api_version=4, session=session)
+            with HTTMock(resp_session):
+                gl.auth()
+        self.assertEqual(gl.private_token, 'tok')
+
+        entry = self.read_lines()[0]
+        self.assertIsNone(entry['body'])
+        self.assertEqual(entry['response_headers']['Set-Cookie'],
+                         '[redacted]')
+        body = json.loads(entry['response_body'])
+        self.assertEqual(body['private_token'], '[redacted]')
+        self.assertEqual(body['username'], 'jdoe')
+        self.assertEqual(int(entry['response_headers']['Content-Length']),
+                         len(entry['response_body']))
+        self.assertNotIn('secret', json.dumps(entry))
+        self.assertNotIn('tok"', json.dumps(entry))
+
+        # the redacted request still matches
+        gl = Gitlab("http://otherhost", email='jdoe@example.com',
+                    password='other', api_version=4,
+                    session=replay.ReplaySession(self.filename))
+        gl.auth()
+        self.assertEqual(gl.user.username, 'jdoe')
+
+    def test_redact_fields(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path="/api/v4/projects/1/triggers", method="post")
+        def resp_trigger(url, request):
+            headers = {'Content-Type': 'application/json'}
+            content = ('{"id": 10, "description": "ci", "token": "secret", '
+                       '"owner": {"id": 1, "private_token": "secret"}}')
+            return response(201, content, headers, None, 5, request)
+
+        with replay.RecordingSession(self.filename) as session:
+            gl = Gitlab("http://localhost", private_token="private_token",
+                        api_version=4, session=session)
+            with HTTMock(resp_trigger):
+                gl.http_post('/projects/1/triggers',
+                             post_data={'description': 'ci',
+                                        'password': 'secret'})
+
+        entry = self.read_lines()[0]
+        self.assertEqual(json.loads(entry['body']),
+                         {'description': 'ci', 'password': '[redacted]'})
+        self.assertEqual(json.loads(entry['response_body']),
+                         {'id': 10, 'description': 'ci',
+                          'token': '[redacted]',
+                          'owner': {'id': 1, 'private_token': '[redacted]'}})
+        self.assertNotIn('secret', json.dumps(entry))
+
+    def test_redact_headers(self):
+        @urlmatch(scheme="http", netloc="localhost", path="/api/v4/user",
+                  method="get")
+        def resp_user(url, request):
+            headers = {'content-type': 'application/json',
+                       'set-cookie': '_gitlab_session=secret; path=/'}
+            return response(200, '{"id": 1}', headers, None, 5, request)
+
+        request = requests.Request('GET', 'http://localhost/api/v4/user',
+                                   headers={'private-token': 'secret',
+                                            'authorization': 'Bearer secret'})
+        with replay.RecordingSession(self.filename) as session:
+            with HTTMock(resp_user):
+                session.send(session.prepare_request(request))
+
+        entry = self.read_lines()[0]
+        self.assertEqual(entry['headers']['private-token'], '[redacted]')
+        self.assertEqual(entry['headers']['authorization'], '[redacted]')
+        self.assertEqual(entry['response_headers']['set-cookie'],
+                         '[redacted]')
+        self.assertNotIn('secret', json.dumps(entry))
+
+    def test_request_key(self):
+        self.assertEqual(replay.request_key('get', 'http://h/a?y=1&x=2'),
+                         replay.request_key('GET', 'https://o/a?x=2&y=1'))
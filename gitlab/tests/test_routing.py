@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+import requests
+
+from gitlab import *  # noqa
+from gitlab import routing
+from gitlab import transport
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+class TestReplicaRouter(unittest.TestCase):
+    def setUp(self):
+        self.primary = FakeGitlabServer(projects=30, children=5).start()
+        self.fast = FakeGitlabServer(projects=30, children=5).start()
+        self.slow = FakeGitlabServer(projects=30, children=5,
+                                     latency=0.05).start()
+        self.servers = [self.primary, self.fast, self.slow]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def client(self, **kwargs):
+        self.router = routing.ReplicaRouter(
+            self.primary.url, [self.slow.url, self.fast.url], **kwargs)
+        return Gitlab(self.primary.url, private_token="private_token",
+                      api_version=4, transport=self.router)
+
+    def test_routing(self):
+        gl = self.client()
+        self.assertEqual(len(gl.projects.list(all=True, per_page=10)), 30)
+        project = gl.projects.get(1)
+        project.issues.create({'title': 'new'})
+        # the reads went to the fastest secondary, the write to the primary
+        self.assertEqual(self.fast.requests, 5)
+        self.assertEqual(self.slow.requests, 1)
+        self.assertEqual(self.primary.requests, 1)
+        stats = self.router.stats()
+        self.assertEqual(stats[self.fast.url]['requests'], 4)
+        self.assertGreater(stats[self.slow.url]['latency'],
+                           stats[self.fast.url]['latency'])
+
+    def test_fallback(self):
+        gl = self.client()
+        gl.projects.get(1)
+        self.fast.error_rate = 1
+        self.slow.error_rate = 1
+        self.assertEqual(gl.projects.get(2).id, 2)
+        stats = self.router.stats()
+        self.assertFalse(stats[self.fast.url]['healthy'])
+        self.assertEqual(stats[self.fast.url]['errors'], 1)
+        self.assertEqual(stats[self.primary.url]['requests'], 1)
+        gl.projects.get(3)
+        self.assertFalse(self.router.stats()[self.slow.url]['healthy'])
+        # no healthy secondary left
+        gl.projects.get(4)
+        self.assertEqual(self.router.stats()[self.primary.url]['requests'],
+                         3)
+        self.assertEqual(self.slow.requests, 2)
+
+    def test_unreachable(self):
+        self.router = routing.ReplicaRouter(self.primary.url,
+                                            ['http://127.0.0.1:1'])
+        gl = Gitlab(self.primary.url, private_token="private_token",
+                    api_version=4, transport=self.router)
+        self.assertEqual(gl.projects.get(1).id, 1)
+        self.assertFalse(self.router.stats()['http://127.0.0.1:1']['healthy'])
+
+    def test_not_found(self):
+        gl = self.client()
+        self.primary._collection(('projects', )).add({'id': 31})
+        self.assertEqual(gl.projects.get(31).id, 31)
+        self.assertEqual(self.primary.requests, 1)
+
+    def test_health_check(self):
+        statuses = {}
+
+        class StatusTransport(transport.Transport):
+            def send(self, request, **kwargs):
+                response = requests.Response()
+                response.status_code = statuses[request.url]
+                return response
+
+        router = routing.ReplicaRouter('http://primary',
+                                       ['http://a', 'http://b', 'http://c'],
+                                       transport=StatusTransport())
+        statuses.update({'http://a/api/v4/version': 401,
+                         'http://b/api/v4/version': 200,
+                         'http://c/api/v4/version': 503})
+        self.assertEqual([router.check(node) for node in router.secondaries],
+                         [True, True, False])
+
+    def test_write_stickiness(self):
+        gl = self.client()
+        project = gl.projects.get(1)
+        project.issues.create({'title': 'new'})
+        project.issues.list()
+        self.assertEqual(self.primary.requests, 2)
+
+    def test_no_write_stickiness(self):
+        gl = self.client(write_stickiness=0)
+        project = gl.projects.get(1)
+        project.issues.create({'title': 'new'})
+        project.issues.list()
+        self.assertEqual(self.primary.requests, 1)
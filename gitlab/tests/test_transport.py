@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import threading
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+import requests
+
+from gitlab import *  # noqa
+from gitlab import transport
+from gitlab import utils
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+class TestUrllib3Transport(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeGitlabServer(projects=30, children=5,
+                                       file_size=200000)
+        self.server.start()
+        self.transport = transport.Urllib3Transport()
+        self.gl = Gitlab(self.server.url, private_token="private_token",
+                         api_version=4, transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.stop()
+
+    def test_default(self):
+        gl = Gitlab("http://localhost", api_version=4)
+        self.assertIsInstance(gl.transport, transport.RequestsTransport)
+        self.assertIs(gl.transport.session, gl.session)
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, transport.Transport)
+
+    def test_managers(self):
+        self.assertEqual(len(self.gl.projects.list(all=True)), 30)
+        project = self.gl.projects.get('group-1/project-1')
+        issue = project.issues.create({'title': 'new issue'})
+        issue.title = 'updated'
+        issue.save()
+        self.assertEqual(project.issues.get(issue.iid).title, 'updated')
+        issue.delete()
+        self.assertRaises(GitlabGetError, project.issues.get, issue.iid)
+
+        chunks = []
+        project.files.raw('README', 'master', streamed=True,
+                          action=chunks.append)
+        self.assertEqual(sum(len(c) for c in chunks), 200000)
+
+    def test_errors(self):
+        self.server.latency = 0.2
+        self.gl.timeout = 0.05
+        self.assertRaises(requests.exceptions.Timeout, self.gl.projects.get,
+                          1)
+        gl = Gitlab('http://127.0.0.1:1', api_version=4,
+                    transport=self.transport)
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          gl.projects.get, 1)
+
+    def test_pickability(self):
+        self.gl.projects.get(1)
+        gl = pickle.loads(pickle.dumps(self.gl))
+        self.assertEqual(gl.transport._managers, {})
+        self.assertEqual(gl.projects.get(1).id, 1)
+
+
+class TestThreadSafety(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeGitlabServer(projects=50, children=10).start()
+        self.gl = Gitlab(self.server.url, private_token="a", api_version=4,
+                         thread_safe=True)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_stress(self):
+        gl = self.gl
+        self.assertIsInstance(gl.transport, transport.ThreadLocalTransport)
+        stop = threading.Event()
+
+        def switch_tokens():
+            i = 0
+            while not stop.is_set():
+                gl._set_token('ab'[i % 2])
+                i += 1
+
+        def work(n):
+            project = gl.projects.get(n % 50 + 1)
+            issues = project.issues.list(all=True, per_page=3)
+            self.assertEqual(len(issues), 10)
+            return n
+
+        switcher = threading.Thread(target=switch_tokens)
+        switcher.start()
+        try:
+            results = sorted(utils.thread_map(work, range(200), workers=16))
+        finally:
+            stop.set()
+            switcher.join()
+
+        self.assertEqual(results, list(range(200)))
+        self.assertEqual(self.server.requests, 200 * 5)
+        self.assertEqual(set(self.server.tokens), set(['a', 'b']))
+        self.assertGreater(gl.transport.sessions, 1)
+        self.assertLessEqual(gl.transport.sessions, 16)
+
+    def test_thread_sessions(self):
+        sessions = []
+
+        def get_session():
+            sessions.append(self.gl.transport.thread_session())
+
+        threads = [threading.Thread(target=get_session) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertIs(sessions[0].adapters['http://'],
+                      self.gl.session.adapters['http://'])
+        self.assertIs(self.gl.transport.thread_session(),
+                      self.gl.transport.thread_session())
+
+    def test_session_class(self):
+        class CountingSession(requests.Session):
+            def __init__(self):
+                super(CountingSession, self).__init__()
+                self.urls = []
+
+            def send(self, request, **kwargs):
+                self.urls.append(request.url)
+                return super(CountingSession, self).send(request, **kwargs)
+
+        session = CountingSession()
+        gl = Gitlab(self.server.url, private_token="a", api_version=4,
+                    session=session, thread_safe=True)
+        projects = list(utils.thread_map(gl.projects.get, range(1, 11),
+                                         workers=4))
+        self.assertEqual(len(projects), 10)
+        self.assertIsInstance(gl.transport.thread_session(), CountingSession)
+        self.assertIsNot(gl.transport.thread_session(), session)
+        self.assertEqual(len(session.urls), 10)
+
+    def test_copy_on_write(self):
+        headers = self.gl.headers
+        hooks = self.gl._hooks['response']
+        self.gl._set_token('b')
+        self.gl.add_hook('response', lambda info: None)
+        self.assertEqual(headers['PRIVATE-TOKEN'], 'a')
+        self.assertEqual(self.gl.headers['PRIVATE-TOKEN'], 'b')
+        self.assertEqual(hooks, [])
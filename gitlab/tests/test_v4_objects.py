@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import base64
+import copy
+import json
+import os
+import shutil
+import tempfile
+try:
+    import unittest
+except ImportError:
+    import unittest2 as unittest
+
+from httmock import HTTMock  # noqa
+from httmock import response  # noqa
+from httmock import urlmatch  # noqa
+import six
+
+from gitlab import *  # noqa
+from gitlab import utils
+from gitlab.v4 import objects
+
+
+TREE = {
+    '': [{'id': 'a1', 'path': 'README', 'type': 'blob'},
+         {'id': 't1', 'path': 'docs', 'type': 'tree'}],
+    'docs': [{'id': 'a2', 'path': 'docs/index.rst', 'type': 'blob'},
+             {'id': 't2', 'path': 'docs/api', 'type': 'tree'}],
+    'docs/api': [{'id': 'a3', 'path': 'docs/api/gitlab.rst',
+                  'type': 'blob'}],
+}
+
+
+class TestProjectRepository(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4, thread_safe=True)
+        self.project = self.gl.projects.get(1, lazy=True)
+        self.tmpdir = tempfile.mkdtemp()
+        self.tree = copy.deepcopy(TREE)
+
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/repository/tree', method="get")
+        def resp_tree(url, request):
+            # this server doesn't support recursive listings
+            query = dict(q.split('=') for q in url.query.split('&'))
+            path = query.get('path', '').replace('%2F', '/')
+            headers = {'Content-Type': 'application/json'}
+            return response(200, json.dumps(self.tree[path]), headers, None,
+                            5, request)
+        self.resp_tree = resp_tree
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_repository_walk(self):
+        with HTTMock(self.resp_tree):
+            items = self.project.repository_walk(workers=2)
+        self.assertEqual(sorted(i['path'] for i in items),
+                         ['README', 'docs', 'docs/api', 'docs/api/gitlab.rst',
+                          'docs/index.rst'])
+
+    def test_repository_walk_recursive(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/repository/tree', method="get")
+        def resp_recursive(url, request):
+            self.assertIn('recursive=True', url.query)
+            items = sum(self.tree.values(), [])
+            headers = {'Content-Type': 'application/json'}
+            return response(200, json.dumps(items), headers, None, 5, request)
+
+        with HTTMock(resp_recursive):
+            items = self.project.repository_walk()
+        self.assertEqual(len(items), 5)
+
+    def test_repository_mirror(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path=r'/api/v4/projects/1/repository/files/.*/raw',
+                  method="get")
+        def resp_raw(url, request):
+            self.assertNotIn('index', url.path)
+            headers = {'Content-Type': 'application/octet-stream'}
+            return response(200, b'content', headers, None, 5, request)
+
+        # this file is already up to date
+        os.mkdir(os.path.join(self.tmpdir, 'api'))
+        with open(os.path.join(self.tmpdir, 'index.rst'), 'wb') as f:
+            f.write(b'index')
+        sha = utils.git_blob_sha(f.name)
+
+        self.tree['docs'][0]['id'] = sha
+        with HTTMock(self.resp_tree, resp_raw):
+            paths = self.project.repository_mirror(self.tmpdir, 'master',
+                                                   path='docs', workers=2)
+        self.assertEqual(paths, ['docs/api/gitlab.rst'])
+        with open(os.path.join(self.tmpdir, 'api', 'gitlab.rst'), 'rb') as f:
+            self.assertEqual(f.read(), b'content')
+
+    def test_repository_mirror_error(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path=r'/api/v4/projects/1/repository/files/.*/raw',
+                  method="get")
+        def resp_raw(url, request):
+            return response(404, '{"message": "Not found"}', {}, None, 5,
+                            request)
+
+        filename = os.path.join(self.tmpdir, 'README')
+        with open(filename, 'wb') as f:
+            f.write(b'previous')
+        self.tree = {'': [self.tree[''][0]]}
+        with HTTMock(self.resp_tree, resp_raw):
+            self.assertRaises(GitlabGetError, self.project.repository_mirror,
+                              self.tmpdir, 'master')
+        # the previous copy is kept, without temporary files
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), b'previous')
+        self.assertEqual(os.listdir(self.tmpdir), ['README'])
+
+
+class TestProjectCommitBuilder(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4)
+        self.project = self.gl.projects.get(1, lazy=True)
+        self.payloads = []
+
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/repository/commits',
+                  method="post")
+        def resp_create(url, request):
+            self.payloads.append(json.loads(request.body))
+            headers = {'Content-Type': 'application/json'}
+            content = '{"id": "%d"}' % len(self.payloads)
+            return response(201, content, headers, None, 5, request)
+        self.resp_create = resp_create
+
+    def test_single_commit(self):
+        builder = self.project.commits.builder('master', 'Vendor update',
+                                               start_branch='base')
+        builder.create('text', 'some text')
+        builder.update('binary', stream=six.BytesIO(b'\x00\x01'))
+        builder.delete('old')
+        with HTTMock(self.resp_create):
+            commits = builder.submit()
+
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(len(builder), 0)
+        payload = self.payloads[0]
+        self.assertEqual(payload['start_branch'], 'base')
+        self.assertEqual(payload['commit_message'], 'Vendor update')
+        self.assertEqual(payload['actions'][0],
+                         {'action': 'create', 'file_path': 'text',
+                          'content': 'some text', 'encoding': 'text'})
+        self.assertEqual(payload['actions'][1],
+                         {'action': 'update', 'file_path': 'binary',
+                          'content': 'AAE=', 'encoding': 'base64'})
+        self.assertEqual(payload['actions'][2],
+                         {'action': 'delete', 'file_path': 'old'})
+
+    def test_split_commits(self):
+        builder = self.project.commits.builder('master', 'Vendor update',
+                                               max_size=1000, max_actions=2,
+                                               start_branch='base')
+        builder.create('big', b'x' * 600)
+        builder.create('big2', b'x' * 600)
+        builder.create('small', 'a')
+        builder.create('small2', 'b')
+        with HTTMock(self.resp_create):
+            commits = builder.submit()
+
+        self.assertEqual(len(commits), 3)
+        self.assertEqual([len(p['actions']) for p in self.payloads],
+                         [1, 1, 2])
+        self.assertEqual(self.payloads[2]['commit_message'],
+                         'Vendor update (part 3)')
+        self.assertNotIn('start_branch', self.payloads[1])
+
+    def test_submit_after_failure(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/repository/commits',
+                  method="post")
+        def resp_fail(url, request):
+            if json.loads(request.body)['actions'][0]['file_path'] == 'c':
+                return response(400, '{"message": "error"}', {}, None, 5,
+                                request)
+            return self.resp_create(url, request)
+
+        builder = self.project.commits.builder('master', 'Vendor update',
+                                               max_actions=1,
+                                               start_branch='base')
+        for name in 'abcd':
+            builder.create(name, name)
+        with HTTMock(resp_fail):
+            self.assertRaises(GitlabCreateError, builder.submit)
+        self.assertEqual(len(builder), 2)
+
+        with HTTMock(self.resp_create):
+            commits = builder.submit()
+        self.assertEqual(len(commits), 2)
+        self.assertEqual(len(builder), 0)
+        self.assertEqual([p['actions'][0]['file_path']
+                          for p in self.payloads], ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.payloads[2]['commit_message'],
+                         'Vendor update (part 3)')
+        self.assertNotIn('start_branch', self.payloads[2])
+
+
+class TestProjectFile(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4)
+        self.project = self.gl.projects.get(1, lazy=True)
+        self.data = bytes(bytearray(range(256))) * 10
+        self.file = self.project.files._obj_cls(
+            self.project.files,
+            {'file_path': 'data', 'size': len(self.data),
+             'content': base64.b64encode(self.data).decode()})
+
+    def test_decode(self):
+        self.assertEqual(self.file.decode(), self.data)
+
+    def test_decode_streamed(self):
+        chunks = []
+        self.file.decode(streamed=True, action=chunks.append, chunk_size=100)
+        self.assertEqual(len(chunks), 26)
+        self.assertTrue(all(len(c) <= 100 for c in chunks))
+        self.assertEqual(b''.join(chunks), self.data)
+
+    def test_decode_into(self):
+        buf = bytearray(self.file.size)
+        self.assertEqual(self.file.decode_into(buf), len(self.data))
+        self.assertEqual(bytes(buf), self.data)
+
+    def test_get_raw(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/repository/files/a%2Fb/raw',
+                  method="get")
+        def resp_raw(url, request):
+            headers = {'Content-Type': 'application/octet-stream'}
+            return response(200, b'content', headers, None, 5, request)
+
+        with HTTMock(resp_raw):
+            content = self.project.files.get('a/b', 'master', raw=True)
+            self.assertEqual(content, b'content')
+            chunks = []
+            self.project.files.get('a/b', 'master', streamed=True,
+                                   action=chunks.append)
+            self.assertEqual(chunks, [b'content'])
+
+    def test_get_not_streamed(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path='/api/v4/projects/1/repository/files/a%2Fb',
+                  method="get")
+        def resp_get(url, request):
+            self.assertNotIn('streamed', url.query)
+            headers = {'Content-Type': 'application/json'}
+            content = '{"file_path": "a/b", "content": "Y29udGVudA=="}'
+            return response(200, content, headers, None, 5, request)
+
+        with HTTMock(resp_get):
+            f = self.project.files.get('a/b', 'master', streamed=False,
+                                       action=None)
+        self.assertIsInstance(f, objects.ProjectFile)
+        self.assertEqual(f.decode(), b'content')
+
+
+class TestFanOut(unittest.TestCase):
+    def setUp(self):
+        self.gl = Gitlab("http://localhost", private_token="private_token",
+                         api_version=4, thread_safe=True)
+
+    def test_fan_out(self):
+        @urlmatch(scheme="http", netloc="localhost",
+                  path=r'/api/v4/groups/\d+/merge_requests', method="get")
+        def resp_mrs(url, request):
+            self.assertIn('state=opened', url.query)
+            group_id = int(url.path.split('/')[4])
+            content = [{'id': group_id * 10 + i, 'iid': i}
+                       for i in range(group_id)]
+            headers = {'Content-Type': 'application/json'}
+            return response(200, json.dumps(content), headers, None, 5,
+                            request)
+
+        groups = [self.gl.groups.get(i, lazy=True) for i in (1, 2, 3)]
+        with HTTMock(resp_mrs):
+            pairs = list(utils.fan_out(groups, 'mergerequests', workers=2,
+                                       state='opened'))
+        self.assertEqual(sorted((p.id, c.id) for p, c in pairs),
+                         [(1, 10), (2, 20), (2, 21), (3, 30), (3, 31),
+                          (3, 32)])
+        self.assertIsInstance(pairs[0][1], objects.GroupMergeRequest)
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""HTTP transports used by :meth:`gitlab.Gitlab.http_request`.
+
+A transport sends a prepared request and returns a :class:`requests.Response`
+(status, headers and a body that can be streamed), so the rest of the client
+doesn't depend on the HTTP stack:
+
+.. code-block:: python
+
+   from gitlab import transport
+
+   gl = gitlab.Gitlab(url, token, api_version=4,
+                      transport=transport.Urllib3Transport(maxsize=20))
+"""
+
+import abc
+import copy
+import threading
+
+import requests
+import six
+
+try:
+    import urllib3
+except ImportError:  # old requests versions only provide a vendored copy
+    from requests.packages import urllib3
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Transport(object):
+    """Base class of the transports."""
+
+    @abc.abstractmethod
+    def send(self, request, stream=False, verify=True, timeout=None):
+        """Send a request.
+
+        Args:
+            request (requests.PreparedRequest): The request to send
+            stream (bool): If False, the body is read before returning
+            verify (bool|str): Whether the SSL certificates are validated,
+                or the path to a CA file
+            timeout (float|tuple): Timeout, or (connect, read) timeouts
+
+        Returns:
+            requests.Response: The response
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails
+        """
+
+    def close(self):
+        """Release the connections."""
+
+
+class RequestsTransport(Transport):
+    """Send the requests with a ``requests`` session (the default).
+
+    Args:
+        session (requests.Session): The session
+    """
+
+    def __init__(self, session=None):
+        self.session = session or requests.Session()
+
+    def send(self, request, stream=False, verify=True, timeout=None):
+        return self.session.send(request, stream=stream, verify=verify,
+                                 timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class ThreadLocalTransport(RequestsTransport):
+    """Send the requests with one ``requests`` session per thread.
+
+    ``requests`` sessions are not thread-safe (the cookies are updated by
+    each response, for instance). This transport creates a session for each
+    thread, with the configuration of `session` (headers, authentication,
+    proxies, certificates and cookies). The sessions share the adapters of
+    `session`, so the threads use a single connection pool.
+
+    The thread sessions are shallow copies of `session` and have the same
+    class: the state of ``requests.Session`` subclasses (for instance the
+    file of a :class:`gitlab.replay.RecordingSession`) is shared by the
+    threads, and must be protected by the subclass.
+
+    Args:
+        session (requests.Session): The session to copy
+        pool_maxsize (int): If set, `session` adapters are replaced by
+            adapters keeping up to `pool_maxsize` connections for each host
+            (10 by default, the connections above are not reused)
+    """
+
+    #: The session attributes copied in the thread sessions
+    ATTRIBUTES = ('headers', 'auth', 'proxies', 'hooks', 'params', 'stream',
+                  'verify', 'cert', 'max_redirects', 'trust_env')
+
+    def __init__(self, session=None, pool_maxsize=None):
+        super(ThreadLocalTransport, self).__init__(session)
+        if pool_maxsize is not None:
+            for prefix in ('https://', 'http://'):
+                self.session.mount(prefix, requests.adapters.HTTPAdapter(
+                    pool_connections=pool_maxsize, pool_maxsize=pool_maxsize))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        #: Number of sessions created
+        self.sessions = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_local')
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def thread_session(self):
+        """Return the session of the current thread."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            # copy.copy() would only keep the requests.Session attributes
+            # (see Session.__getstate__)
+            cls = type(self.session)
+            session = cls.__new__(cls)
+            session.__dict__.update(self.session.__dict__)
+            for attr in self.ATTRIBUTES:
+                setattr(session, attr, copy.copy(getattr(self.session, attr)))
+            with self._lock:
+                session.cookies = self.session.cookies.copy()
+                self.sessions += 1
+            # the adapters (and their connection pools) are thread-safe
+            session.adapters = self.session.adapters
+            self._local.session = session
+        return session
+
+    def send(self, request, stream=False, verify=True, timeout=None):
+        return self.thread_session().send(request, stream=stream,
+                                          verify=verify, timeout=timeout)
+
+
+class Urllib3Transport(Transport):
+    """Send the requests with ``urllib3`` connection pools.
+
+    This avoids the ``requests`` session machinery (cookies, redirection and
+    adapter handling) for each request. Proxies and client certificates are
+    not supported.
+
+    Args:
+        maxsize (int): Number of connections kept for each host
+        block (bool): If True, wait for a free connection when `maxsize`
+            connections are in use
+        max_redirects (int): Maximum number of redirections to follow
+    """
+
+    def __init__(self, maxsize=10, block=False, max_redirects=30):
+        self.maxsize = maxsize
+        self.block = block
+        self.max_redirects = max_redirects
+        self._managers = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_managers'] = {}
+        return state
+
+    def _manager(self, verify):
+        # One pool manager per certificate validation setting
+        key = verify if isinstance(verify, six.string_types) else bool(verify)
+        manager = self._managers.get(key)
+        if manager is None:
+            kwargs = {'maxsize': self.maxsize, 'block': self.block}
+            if verify:
+                kwargs['cert_reqs'] = 'CERT_REQUIRED'
+                kwargs['ca_certs'] = (verify if key is not True
+                                      else requests.certs.where())
+            else:
+                kwargs['cert_reqs'] = 'CERT_NONE'
+            manager = urllib3.PoolManager(**kwargs)
+            self._managers[key] = manager
+        return manager
+
+    def send(self, request, stream=False, verify=True, timeout=None):
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        elif timeout is not None:
+            timeout = urllib3.Timeout(connect=timeout, read=timeout)
+        else:
+            timeout = urllib3.Timeout(connect=None, read=None)
+        retries = urllib3.Retry(total=None, connect=0, read=0, status=0,
+                                redirect=self.max_redirects,
+                                raise_on_redirect=False)
+
+        try:
+            raw = self._manager(verify).urlopen(
+                request.method, request.url, body=request.body,
+                headers=dict(request.headers), retries=retries,
+                timeout=timeout, preload_content=False, decode_content=False)
+        except urllib3.exceptions.ConnectTimeoutError as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except urllib3.exceptions.MaxRetryError as e:
+            if isinstance(e.reason, urllib3.exceptions.ConnectTimeoutError):
+                raise requests.exceptions.ConnectTimeout(e, request=request)
+            if isinstance(e.reason, urllib3.exceptions.ReadTimeoutError):
+                raise requests.exceptions.ReadTimeout(e, request=request)
+            if isinstance(e.reason, urllib3.exceptions.SSLError):
+                raise requests.exceptions.SSLError(e, request=request)
+            raise requests.exceptions.ConnectionError(e, request=request)
+        except urllib3.exceptions.SSLError as e:
+            raise requests.exceptions.SSLError(e, request=request)
+        except urllib3.exceptions.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = raw.status
+        response.reason = raw.reason
+        response.headers = requests.structures.CaseInsensitiveDict(
+            raw.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        response.raw = raw
+        response.url = request.url
+        response.request = request
+        if not stream:
+            # read the body and release the connection
+            response.content
+        return response
+
+    def close(self):
+        for manager in self._managers.values():
+            manager.clear()
+        self._managers = {}
@@ -15,6 +15,17 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import base64
+import contextlib
+import datetime
+import email.utils
+import hashlib
+import os
+import re
+import time
+
+import six
+
 
 class _StdoutStream(object):
     def __call__(self, chunk):
@@ -31,3 +42,261 @@ def response_content(response, streamed, action, chunk_size):
     for chunk in response.iter_content(chunk_size=chunk_size):
         if chunk:
             action(chunk)
+
+
+#: High resolution clock for duration measurements
+clock = getattr(time, 'perf_counter', time.time)
+
+
+_DATETIME_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})'
+                          r'(?:[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?'
+                          r'(Z|[+-]\d{2}:?\d{2})?)?$')
+
+
+class _FixedOffset(datetime.tzinfo):
+    # A fixed offset from UTC (datetime.timezone is not available with
+    # python 2)
+
+    def __init__(self, minutes):
+        self._offset = datetime.timedelta(minutes=minutes)
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return None
+
+
+UTC = _FixedOffset(0)
+
+
+def parse_datetime(value):
+    """Convert a GitLab date or datetime string to an aware datetime.
+
+    Values without time zone are considered as UTC, dates without time as
+    midnight UTC.
+
+    Args:
+        value (str): The datetime (e.g. '2017-11-03T10:00:00.000Z',
+            '2017-11-03T12:00:00.123+02:00' or '2017-11-03')
+
+    Returns:
+        datetime.datetime: The datetime
+
+    Raises:
+        ValueError: If the value is not a valid datetime
+    """
+    match = _DATETIME_RE.match(value)
+    if match is None:
+        raise ValueError('Invalid datetime: %r' % value)
+    year, month, day, hour, minute, second, fraction, tz = match.groups()
+    tzinfo = UTC
+    if tz and tz != 'Z':
+        sign = -1 if tz[0] == '-' else 1
+        tz = tz[1:].replace(':', '')
+        tzinfo = _FixedOffset(sign * (int(tz[:2]) * 60 + int(tz[2:])))
+    microsecond = int((fraction or '0')[:6].ljust(6, '0'))
+    return datetime.datetime(int(year), int(month), int(day), int(hour or 0),
+                             int(minute or 0), int(second or 0), microsecond,
+                             tzinfo)
+
+
+@contextlib.contextmanager
+def atomic_write(filename, mode='w', suffix='.tmp'):
+    """Write a file through a temporary file.
+
+    The temporary file replaces `filename` once written: readers and failed
+    writes never leave a truncated file. It is removed if an error occurs.
+
+    Args:
+        filename (str): The path of the file
+        mode (str): The mode used to open the temporary file ('w' or 'wb')
+        suffix (str): The suffix of the temporary file name
+
+    Returns:
+        file: The temporary file, opened with `mode`
+    """
+    tmp = filename + suffix
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        # os.rename() doesn't replace existing files on windows
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def retry_after(value):
+    """Convert a Retry-After header to a delay.
+
+    Args:
+        value (str): The header, a number of seconds or an HTTP date
+
+    Returns:
+        float: The delay in seconds (0 if the date is past), or None if the
+            value is invalid
+    """
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+        return max(email.utils.mktime_tz(date) - time.time(), 0.0)
+
+
+def b64decode_stream(data, action=None, chunk_size=65536):
+    """Decode base64 data by chunks.
+
+    Args:
+        data (str): The base64 encoded data (without line breaks)
+        action (callable): Callable receiving the decoded chunks
+        chunk_size (int): Maximum size of the decoded chunks
+    """
+    if action is None:
+        action = _StdoutStream()
+
+    # 4 encoded characters give 3 bytes
+    step = max(chunk_size // 3, 1) * 4
+    for i in range(0, len(data), step):
+        chunk = base64.b64decode(data[i:i + step])
+        if chunk:
+            action(chunk)
+
+
+class InternTable(object):
+    """Bounded table of shared strings.
+
+    Used when parsing JSON data to share the repeated keys and short string
+    values between the parsed items, instead of allocating new strings for
+    each item.
+
+    Keys are shared as soon as they are seen. A value is only added to the
+    table the second time it is seen: unique values (titles, descriptions,
+    URLs...) don't fill the table. The values seen once are tracked in a set
+    of at most `max_size` values, cleared when full.
+
+    Args:
+        max_size (int): Maximum number of shared values
+        max_length (int): Maximum length of the shared values, longer values
+            are unlikely to be repeated
+        max_keys (int): Maximum number of shared keys
+    """
+
+    def __init__(self, max_size=10000, max_length=64, max_keys=1000):
+        self.max_size = max_size
+        self.max_length = max_length
+        self.max_keys = max_keys
+        self._keys = {}
+        self._values = {}
+        self._candidates = set()
+
+    def __len__(self):
+        return len(self._keys) + len(self._values)
+
+    def object_pairs_hook(self, pairs):
+        """``json.loads`` hook building dicts with shared strings."""
+        keys = self._keys
+        values = self._values
+        candidates = self._candidates
+        obj = {}
+        for key, value in pairs:
+            if key in keys:
+                key = keys[key]
+            elif len(keys) < self.max_keys:
+                keys[key] = key
+            if isinstance(value, six.string_types):
+                if value in values:
+                    value = values[value]
+                elif (len(value) <= self.max_length and
+                      len(values) < self.max_size):
+                    if value in candidates:
+                        candidates.discard(value)
+                        values[value] = value
+                    else:
+                        if len(candidates) >= self.max_size:
+                            candidates.clear()
+                        candidates.add(value)
+            obj[key] = value
+        return obj
+
+
+def thread_map(func, items, workers=8):
+    """Apply ``func`` to every item using a pool of threads.
+
+    Results are yielded as soon as they are available, so the order of the
+    results doesn't match the order of ``items``. A ``Gitlab`` object used by
+    ``func`` must be created with ``thread_safe=True``.
+
+    Args:
+        func (callable): Function to call for each item
+        items (iterable): Items to process
+        workers (int): Maximum number of concurrent calls
+
+    Returns:
+        generator: The results of the ``func`` calls
+    """
+    from multiprocessing.pool import ThreadPool
+
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap_unordered(func, items):
+            yield result
+    finally:
+        pool.terminate()
+
+
+def fan_out(parents, name, workers=8, **kwargs):
+    """List a child collection of many parents concurrently.
+
+    The parents connection must be created with ``thread_safe=True``.
+
+    Args:
+        parents (iterable): The parent objects (e.g. projects, lazy objects
+            are supported)
+        name (str): The name of the child manager (e.g. 'mergerequests')
+        workers (int): Maximum number of concurrent listings
+        **kwargs: Extra options for the ``list()`` calls (e.g. filters). All
+            the items are returned unless ``page`` or ``per_page`` is set
+
+    Returns:
+        generator: (parent, child) tuples, yielded as soon as the listing of
+            a parent is complete
+
+    Raises:
+        GitlabListError: If the server cannot perform a request
+    """
+    if 'page' not in kwargs and 'per_page' not in kwargs:
+        kwargs.setdefault('all', True)
+
+    def list_children(parent):
+        return parent, getattr(parent, name).list(**kwargs)
+
+    for parent, children in thread_map(list_children, parents, workers):
+        for child in children:
+            yield parent, child
+
+
+def git_blob_sha(filename, chunk_size=65536):
+    """Compute the git blob SHA of a local file.
+
+    Args:
+        filename (str): Path of the file
+        chunk_size (int): Size of the chunks read from the file
+
+    Returns:
+        str: The hex digest, as used by git to identify the blob
+    """
+    size = os.path.getsize(filename)
+    sha = hashlib.sha1(('blob %d\0' % size).encode())
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
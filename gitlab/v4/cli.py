@@ -81,6 +81,21 @@ class GitlabCLI(object):
         except Exception as e:
             cli.die("Impossible to list objects", e)
 
+    def do_export(self):
+        from gitlab import export
+        filename = self.args.pop('file')
+        fields = self.args.pop('fields', None)
+        if fields:
+            fields = [x.strip() for x in fields.split(',')]
+        try:
+            count = export.export(
+                self.mgr, filename, format=self.args.pop('format'),
+                fields=fields, compress=self.args.pop('gzip'),
+                resume=self.args.pop('resume'), **self.args)
+        except Exception as e:
+            cli.die("Impossible to export objects", e)
+        return '%d objects exported to %s' % (count, filename)
+
     def do_get(self):
         id = None
         if gitlab.mixins.GetWithoutIdMixin not in inspect.getmro(self.mgr_cls):
@@ -112,9 +127,13 @@ def _populate_sub_parser_by_class(cls, sub_parser):
     mgr_cls_name = cls.__name__ + 'Manager'
     mgr_cls = getattr(gitlab.v4.objects, mgr_cls_name)
 
+    custom_actions = cli.custom_actions.get(cls.__name__, {})
     for action_name in ['list', 'get', 'create', 'update', 'delete']:
         if not hasattr(mgr_cls, action_name):
             continue
+        # the custom actions replace the standard ones
+        if action_name in custom_actions:
+            continue
 
         sub_parser_action = sub_parser.add_parser(action_name)
         sub_parser_action.add_argument("--sudo", required=False)
@@ -134,6 +153,27 @@ def _populate_sub_parser_by_class(cls, sub_parser):
             sub_parser_action.add_argument("--all", required=False,
                                            action='store_true')
 
+        if action_name == "list":
+            sub_parser_action = sub_parser.add_parser('export')
+            sub_parser_action.add_argument("--sudo", required=False)
+            if hasattr(mgr_cls, '_from_parent_attrs'):
+                [sub_parser_action.add_argument("--%s" % x.replace('_', '-'),
+                                                required=True)
+                 for x in mgr_cls._from_parent_attrs]
+            if hasattr(mgr_cls, '_list_filters'):
+                [sub_parser_action.add_argument("--%s" % x.replace('_', '-'),
+                                                required=False)
+                 for x in mgr_cls._list_filters]
+            sub_parser_action.add_argument("--file", required=True)
+            sub_parser_action.add_argument("--format", required=False,
+                                           choices=['csv', 'json'],
+                                           default='csv')
+            sub_parser_action.add_argument("--per-page", required=False)
+            sub_parser_action.add_argument("--gzip", required=False,
+                                           action='store_true')
+            sub_parser_action.add_argument("--resume", required=False,
+                                           action='store_true')
+
         if action_name == 'delete':
             id_attr = cls._id_attr.replace('_', '-')
             sub_parser_action.add_argument("--%s" % id_attr, required=True)
@@ -287,7 +327,7 @@ class LegacyPrinter(object):
             if obj._id_attr:
                 id = getattr(obj, obj._id_attr, None)
                 print('%s: %s' % (obj._id_attr, id))
-            attrs = obj.attributes
+            attrs = obj.attributes.copy()
             if obj._id_attr:
                 attrs.pop(obj._id_attr)
             display_dict(attrs, padding)
@@ -315,10 +355,10 @@ def run(gl, what, action, args, verbose, output, fields):
     printer = PRINTERS[output]()
 
     def get_dict(obj):
+        attrs = obj.attributes
         if fields:
-            return {k: v for k, v in obj.attributes.items()
-                    if k in fields}
-        return obj.attributes
+            return {k: attrs[k] for k in fields if k in attrs}
+        return attrs.copy()
 
     if isinstance(ret_val, dict):
         printer.display(ret_val, verbose=True, obj=ret_val)
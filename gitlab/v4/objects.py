@@ -18,6 +18,9 @@
 from __future__ import print_function
 from __future__ import absolute_import
 import base64
+import os
+
+import six
 
 from gitlab.base import *  # noqa
 from gitlab import cli
@@ -139,7 +142,7 @@ class UserCustomAttributeManager(RetrieveMixin, DeleteMixin, RESTManager):
         path = '%s/%s' % (self.path, key.replace('/', '%2F'))
         data = {'value': value}
         server_data = self.gitlab.http_put(path, post_data=data, **kwargs)
-        return self._obj_cls(self, server_data)
+        return self._create_object(server_data)
 
 
 class UserEmail(ObjectDeleteMixin, RESTObject):
@@ -250,7 +253,7 @@ class UserManager(CRUDMixin, RESTManager):
     _obj_cls = User
 
     _list_filters = ('active', 'blocked', 'username', 'extern_uid', 'provider',
-                     'external', 'search')
+                     'external', 'search', 'created_after', 'created_before')
     _create_attrs = (
         tuple(),
         ('email', 'username', 'name', 'password', 'reset_password', 'skype',
@@ -454,8 +457,14 @@ class GroupMergeRequest(RESTObject):
     pass
 
 
-class GroupMergeRequestManager(RESTManager):
-    pass
+class GroupMergeRequestManager(ListMixin, RESTManager):
+    _path = '/groups/%(group_id)s/merge_requests'
+    _obj_cls = GroupMergeRequest
+    _from_parent_attrs = {'group_id': 'id'}
+    _list_filters = ('state', 'order_by', 'sort', 'milestone', 'labels',
+                     'created_after', 'created_before', 'updated_after',
+                     'updated_before', 'scope', 'author_id', 'assignee_id',
+                     'search')
 
 
 class GroupMilestone(SaveMixin, ObjectDeleteMixin, RESTObject):
@@ -562,6 +571,7 @@ class Group(SaveMixin, ObjectDeleteMixin, RESTObject):
         ('notificationsettings', 'GroupNotificationSettingsManager'),
         ('projects', 'GroupProjectManager'),
         ('issues', 'GroupIssueManager'),
+        ('mergerequests', 'GroupMergeRequestManager'),
         ('variables', 'GroupVariableManager'),
     )
 
@@ -996,6 +1006,151 @@ class ProjectCommit(RESTObject):
         self.manager.gitlab.http_post(path, post_data=post_data, **kwargs)
 
 
+class ProjectCommitBuilder(object):
+    """Accumulate file actions and push them in as few commits as possible.
+
+    The file contents are only read and encoded when the commits are
+    submitted. The actions are split in several commits if a commit would
+    exceed `max_size` bytes of encoded content or `max_actions` actions.
+
+    Note: you should not instanciate such objects, use
+    ``ProjectCommitManager.builder()`` instead.
+    """
+
+    # Overhead of an action in the JSON payload, excluding its content
+    _action_overhead = 128
+
+    def __init__(self, manager, branch, commit_message,
+                 max_size=10 * 1024 * 1024, max_actions=1000, **kwargs):
+        self.manager = manager
+        self.branch = branch
+        self.commit_message = commit_message
+        self.max_size = max_size
+        self.max_actions = max_actions
+        self._commit_data = kwargs
+        self._actions = []
+        # Number of commits created
+        self._parts = 0
+
+    def __len__(self):
+        return len(self._actions)
+
+    def add(self, action, file_path, content=None, path=None, stream=None,
+            **kwargs):
+        """Add an action to the commits.
+
+        At most one of `content`, `path` and `stream` should be provided.
+
+        Args:
+            action (str): 'create', 'update', 'delete' or 'move'
+            file_path (str): Path of the file in the repository
+            content (str or bytes): Content of the file. Text is sent as is,
+                bytes are base64 encoded
+            path (str): Local file to read the content from
+            stream (file): File-like object to read the content from
+            **kwargs: Extra attributes of the action (e.g. previous_path)
+        """
+        data = {'action': action, 'file_path': file_path}
+        data.update(kwargs)
+        self._actions.append((data, content, path, stream))
+
+    def create(self, file_path, content=None, path=None, stream=None):
+        """Add a file creation. See add() for the arguments."""
+        self.add('create', file_path, content, path, stream)
+
+    def update(self, file_path, content=None, path=None, stream=None):
+        """Add a file update. See add() for the arguments."""
+        self.add('update', file_path, content, path, stream)
+
+    def delete(self, file_path):
+        """Add a file deletion."""
+        self.add('delete', file_path)
+
+    def move(self, file_path, previous_path, content=None, path=None,
+             stream=None):
+        """Add a file move. See add() for the arguments."""
+        self.add('move', file_path, content, path, stream,
+                 previous_path=previous_path)
+
+    @staticmethod
+    def _b64encode_stream(stream, chunk_size=3 * 65536):
+        # chunk_size must be a multiple of 3 to avoid padding in the middle
+        chunks = []
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            chunks.append(base64.b64encode(chunk).decode('ascii'))
+        return ''.join(chunks)
+
+    def _build_action(self, data, content, path, stream):
+        data = data.copy()
+        if path is not None:
+            with open(path, 'rb') as f:
+                data['content'] = self._b64encode_stream(f)
+            data['encoding'] = 'base64'
+        elif stream is not None:
+            data['content'] = self._b64encode_stream(stream)
+            data['encoding'] = 'base64'
+        elif isinstance(content, six.binary_type):
+            data['content'] = base64.b64encode(content).decode('ascii')
+            data['encoding'] = 'base64'
+        elif content is not None:
+            data['content'] = content
+            data['encoding'] = 'text'
+        return data
+
+    def _batches(self):
+        batch = []
+        size = 0
+        for action in list(self._actions):
+            data = self._build_action(*action)
+            action_size = (len(data.get('content', '')) +
+                           len(data['file_path']) + self._action_overhead)
+            if batch and (size + action_size > self.max_size or
+                          len(batch) >= self.max_actions):
+                yield batch
+                batch = []
+                size = 0
+            batch.append(data)
+            size += action_size
+        if batch:
+            yield batch
+
+    def submit(self, **kwargs):
+        """Create the commits on the server, in the order of the actions.
+
+        If several commits are needed, their messages get a ``(part N)``
+        suffix, starting with the second one.
+
+        The actions of each commit are removed from the builder once the
+        commit is created: if a commit fails, calling submit() again only
+        sends the actions that are not committed yet.
+
+        Args:
+            **kwargs: Extra options to send to the server (e.g. sudo)
+
+        Raises:
+            GitlabAuthenticationError: If authentication is not correct
+            GitlabCreateError: If the server cannot perform the request
+
+        Returns:
+            list: The created ProjectCommit objects
+        """
+        commits = []
+        commit_data = self._commit_data.copy()
+        for batch in self._batches():
+            message = self.commit_message
+            if self._parts:
+                message = '%s (part %d)' % (message, self._parts + 1)
+                # the branch has been created by the first commit
+                commit_data.pop('start_branch', None)
+            data = {'branch': self.branch, 'commit_message': message,
+                    'actions': batch}
+            data.update(commit_data)
+            commits.append(self.manager.create(data, **kwargs))
+            del self._actions[:len(batch)]
+            self._parts += 1
+        return commits
+
+
 class ProjectCommitManager(RetrieveMixin, CreateMixin, RESTManager):
     _path = '/projects/%(project_id)s/repository/commits'
     _obj_cls = ProjectCommit
@@ -1003,6 +1158,23 @@ class ProjectCommitManager(RetrieveMixin, CreateMixin, RESTManager):
     _create_attrs = (('branch', 'commit_message', 'actions'),
                      ('author_email', 'author_name'))
 
+    def builder(self, branch, commit_message, **kwargs):
+        """Return a builder to push many file actions in a few commits.
+
+        Args:
+            branch (str): Name of the branch to commit into
+            commit_message (str): Message of the commits
+            max_size (int): Maximum size of the encoded contents in a single
+                commit
+            max_actions (int): Maximum number of actions in a single commit
+            **kwargs: Extra commit attributes (e.g. start_branch,
+                author_email, author_name)
+
+        Returns:
+            ProjectCommitBuilder: The builder
+        """
+        return ProjectCommitBuilder(self, branch, commit_message, **kwargs)
+
 
 class ProjectEnvironment(SaveMixin, ObjectDeleteMixin, RESTObject):
     pass
@@ -1053,6 +1225,7 @@ class ProjectEventManager(ListMixin, RESTManager):
     _path = '/projects/%(project_id)s/events'
     _obj_cls = ProjectEvent
     _from_parent_attrs = {'project_id': 'id'}
+    _list_filters = ('action', 'target_type', 'before', 'after', 'sort')
 
 
 class ProjectFork(RESTObject):
@@ -1130,7 +1303,8 @@ class ProjectIssueManager(CRUDMixin, RESTManager):
     _path = '/projects/%(project_id)s/issues/'
     _obj_cls = ProjectIssue
     _from_parent_attrs = {'project_id': 'id'}
-    _list_filters = ('state', 'labels', 'milestone', 'order_by', 'sort')
+    _list_filters = ('state', 'labels', 'milestone', 'order_by', 'sort',
+                     'updated_after', 'updated_before')
     _create_attrs = (('title', ),
                      ('description', 'assignee_id', 'milestone_id', 'labels',
                       'created_at', 'due_date'))
@@ -1387,7 +1561,8 @@ class ProjectMergeRequestManager(CRUDMixin, RESTManager):
     _update_attrs = (tuple(), ('target_branch', 'assignee_id', 'title',
                                'description', 'state_event', 'labels',
                                'milestone_id'))
-    _list_filters = ('iids', 'state', 'order_by', 'sort')
+    _list_filters = ('iids', 'state', 'order_by', 'sort', 'updated_after',
+                     'updated_before')
 
     def _sanitize_data(self, data, action):
         new_data = data.copy()
@@ -1477,6 +1652,8 @@ class ProjectLabel(SubscribableMixin, SaveMixin, ObjectDeleteMixin,
             GitlabUpdateError: If the server cannot perform the request.
         """
         updated_data = self._get_updated_data()
+        if not updated_data:
+            return
 
         # call the manager
         server_data = self.manager.update(None, updated_data, **kwargs)
@@ -1512,13 +1689,45 @@ class ProjectFile(SaveMixin, ObjectDeleteMixin, RESTObject):
     _id_attr = 'file_path'
     _short_print_attr = 'file_path'
 
-    def decode(self):
+    def decode(self, streamed=False, action=None, chunk_size=65536):
         """Returns the decoded content of the file.
 
+        Args:
+            streamed (bool): If True the content is decoded by chunks of
+                `chunk_size` bytes and each chunk is passed to `action` for
+                treatment, without building a full copy of the content
+            action (callable): Callable responsible of dealing with chunk of
+                data
+            chunk_size (int): Size of each chunk
+
         Returns:
-            (str): the decoded content.
+            (str): the decoded content if streamed is False, None otherwise.
         """
-        return base64.b64decode(self.content)
+        if streamed is False:
+            return base64.b64decode(self.content)
+        utils.b64decode_stream(self.content, action, chunk_size)
+
+    def decode_into(self, buffer):
+        """Decode the content of the file into a writable buffer.
+
+        Args:
+            buffer (bytearray or memoryview): The buffer to write to. It must
+                be large enough to hold the decoded content (see the `size`
+                attribute).
+
+        Returns:
+            int: The number of bytes written
+        """
+        view = memoryview(buffer)
+        written = [0]
+
+        def write(chunk):
+            end = written[0] + len(chunk)
+            view[written[0]:end] = chunk
+            written[0] = end
+
+        utils.b64decode_stream(self.content, write)
+        return written[0]
 
     def save(self, branch, commit_message, **kwargs):
         """Save the changes made to the file to the server.
@@ -1566,12 +1775,15 @@ class ProjectFileManager(GetMixin, CreateMixin, UpdateMixin, DeleteMixin,
                      ('encoding', 'author_email', 'author_name'))
 
     @cli.register_custom_action('ProjectFileManager', ('file_path', 'ref'))
-    def get(self, file_path, ref, **kwargs):
+    def get(self, file_path, ref, raw=False, **kwargs):
         """Retrieve a single file.
 
         Args:
             file_path (str): Path of the file to retrieve
             ref (str): Name of the branch, tag or commit
+            raw (bool): If True, only retrieve the content of the file using
+                the raw endpoint, which avoids the base64 encoded copy of the
+                content. This is implied if `streamed` or `action` are used.
             **kwargs: Extra options to send to the Gitlab server (e.g. sudo)
 
         Raises:
@@ -1579,8 +1791,13 @@ class ProjectFileManager(GetMixin, CreateMixin, UpdateMixin, DeleteMixin,
             GitlabGetError: If the file could not be retrieved
 
         Returns:
-            object: The generated RESTObject
+            object: The generated RESTObject, or the file content if `raw` is
+                True (see raw())
         """
+        if raw or kwargs.get('streamed') or kwargs.get('action') is not None:
+            return self.raw(file_path, ref, **kwargs)
+        kwargs.pop('streamed', None)
+        kwargs.pop('action', None)
         file_path = file_path.replace('/', '%2F')
         return GetMixin.get(self, file_path, ref=ref, **kwargs)
 
@@ -1610,7 +1827,7 @@ class ProjectFileManager(GetMixin, CreateMixin, UpdateMixin, DeleteMixin,
         file_path = data.pop('file_path').replace('/', '%2F')
         path = '%s/%s' % (self.path, file_path)
         server_data = self.gitlab.http_post(path, post_data=data, **kwargs)
-        return self._obj_cls(self, server_data)
+        return self._create_object(server_data)
 
     @exc.on_http_error(exc.GitlabUpdateError)
     def update(self, file_path, new_data={}, **kwargs):
@@ -1724,6 +1941,8 @@ class ProjectPipelineManager(RetrieveMixin, CreateMixin, RESTManager):
     _path = '/projects/%(project_id)s/pipelines'
     _obj_cls = ProjectPipeline
     _from_parent_attrs = {'project_id': 'id'}
+    _list_filters = ('scope', 'status', 'ref', 'order_by', 'sort',
+                     'updated_after', 'updated_before')
     _create_attrs = (('ref', ), tuple())
 
     def create(self, data, **kwargs):
@@ -2053,6 +2272,105 @@ class Project(SaveMixin, ObjectDeleteMixin, RESTObject):
         return self.manager.gitlab.http_list(gl_path, query_data=query_data,
                                              **kwargs)
 
+    @exc.on_http_error(exc.GitlabGetError)
+    def repository_walk(self, path='', ref='', workers=8, **kwargs):
+        """Return the complete list of files and folders below a path.
+
+        A single recursive listing is requested first. If the server doesn't
+        support recursive listings, the sub-folders are listed level by level,
+        using up to `workers` concurrent requests. The connection must be
+        thread-safe (created with ``thread_safe=True``) if `workers` is more
+        than 1.
+
+        Args:
+            path (str): Path of the top folder (/ by default)
+            ref (str): Reference to a commit or branch
+            workers (int): Maximum number of concurrent requests
+            **kwargs: Extra options to send to the server (e.g. sudo)
+
+        Raises:
+            GitlabAuthenticationError: If authentication is not correct
+            GitlabGetError: If the server failed to perform the request
+
+        Returns:
+            list: The representation of the tree
+        """
+        items = self.repository_tree(path=path, ref=ref, recursive=True,
+                                     all=True, **kwargs)
+
+        # git doesn't store empty folders: a folder listed without any child
+        # means that the server ignored the recursive flag
+        parents = set(item['path'].rpartition('/')[0] for item in items)
+        pending = [item['path'] for item in items
+                   if item['type'] == 'tree' and item['path'] not in parents]
+
+        def list_folder(folder):
+            return self.repository_tree(path=folder, ref=ref, all=True,
+                                        **kwargs)
+
+        while pending:
+            folders = []
+            for children in utils.thread_map(list_folder, pending, workers):
+                items.extend(children)
+                folders.extend(child['path'] for child in children
+                               if child['type'] == 'tree')
+            pending = folders
+
+        return items
+
+    @exc.on_http_error(exc.GitlabGetError)
+    def repository_mirror(self, dest, ref, path='', workers=8, **kwargs):
+        """Download the files of a repository folder to a local directory.
+
+        Files already present in `dest` with the same blob SHA are not
+        downloaded again. The files are downloaded by `workers` threads: the
+        connection must be created with ``thread_safe=True`` if `workers` is
+        more than 1.
+
+        Args:
+            dest (str): Local directory to write the files to
+            ref (str): Reference to a commit or branch
+            path (str): Path of the top folder to mirror (/ by default)
+            workers (int): Maximum number of concurrent requests
+            **kwargs: Extra options to send to the server (e.g. sudo)
+
+        Raises:
+            GitlabAuthenticationError: If authentication is not correct
+            GitlabGetError: If the server failed to perform the request
+
+        Returns:
+            list: The paths of the downloaded files
+        """
+        prefix = path.strip('/')
+        blobs = [item for item in self.repository_walk(path=prefix, ref=ref,
+                                                       workers=workers,
+                                                       **kwargs)
+                 if item['type'] == 'blob']
+
+        def download(item):
+            relpath = item['path'][len(prefix):].lstrip('/')
+            filename = os.path.join(dest, *relpath.split('/'))
+            if (os.path.isfile(filename) and
+                    utils.git_blob_sha(filename) == item['id']):
+                return None
+
+            dirname = os.path.dirname(filename)
+            if not os.path.isdir(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    # another worker created it
+                    if not os.path.isdir(dirname):
+                        raise
+            # download to a temporary file, so that a failure doesn't
+            # replace the previous copy
+            with utils.atomic_write(filename, 'wb', suffix='.part') as f:
+                self.files.raw(item['path'], ref, streamed=True,
+                               action=f.write, **kwargs)
+            return item['path']
+
+        return [p for p in utils.thread_map(download, blobs, workers) if p]
+
     @cli.register_custom_action('Project', ('sha', ))
     @exc.on_http_error(exc.GitlabGetError)
     def repository_blob(self, sha, **kwargs):
@@ -2389,7 +2707,8 @@ class ProjectManager(CRUDMixin, RESTManager):
     )
     _list_filters = ('search', 'owned', 'starred', 'archived', 'visibility',
                      'order_by', 'sort', 'simple', 'membership', 'statistics',
-                     'with_issues_enabled', 'with_merge_requests_enabled')
+                     'with_issues_enabled', 'with_merge_requests_enabled',
+                     'last_activity_after', 'last_activity_before')
 
 
 class Runner(SaveMixin, ObjectDeleteMixin, RESTObject):
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Measure the cost of RESTObject.attributes.
+
+The "before" numbers use the previous implementation, which merged the
+attributes dicts in a new dict on every access. The "after" numbers use the
+read-only view. Three uses are measured for each object:
+
+* lookup: read `--keys` attributes (CLI fields, reconcile)
+* dict: dict(obj.attributes), obj.attributes.copy() is as fast as before
+* json: serialize a copy of the attributes (CLI json output)
+
+The project payloads of the v4 API have about 50 attributes (`--size`).
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import timeit
+
+from gitlab import base
+
+
+class FakeGitlab(object):
+    pass
+
+
+class Project(base.RESTObject):
+    pass
+
+
+class ProjectManager(base.RESTManager):
+    _path = '/projects'
+    _obj_cls = Project
+
+
+def payload(i, size):
+    data = {
+        'id': i, 'name': 'project-%d' % i, 'path': 'project-%d' % i,
+        'description': 'Project number %d' % i, 'visibility': 'private',
+        'web_url': 'https://gitlab.example.com/group/project-%d' % i,
+        'default_branch': 'master', 'tag_list': ['a', 'b'],
+        'namespace': {'id': 1, 'name': 'group', 'kind': 'group'},
+        'created_at': '2017-11-03T10:00:00.000Z', 'star_count': i % 7,
+    }
+    # the other attributes of a project (flags, counters and URLs)
+    for j in range(size - len(data)):
+        data['attribute_%d' % j] = j % 2 == 0
+    return data
+
+
+def merged_attributes(obj):
+    d = obj.__dict__['_updated_attrs'].copy()
+    d.update(obj.__dict__['_attrs'])
+    d.update(obj.__dict__['_parent_attrs'])
+    return d
+
+
+def view_attributes(obj):
+    return obj.attributes
+
+
+def measure(objects, accessor, use, keys):
+    def lookup():
+        for obj in objects:
+            attrs = accessor(obj)
+            for key in keys:
+                attrs[key]
+
+    def to_dict():
+        for obj in objects:
+            dict(accessor(obj))
+
+    def to_json():
+        for obj in objects:
+            json.dumps(accessor(obj).copy())
+
+    run = {'lookup': lookup, 'dict': to_dict, 'json': to_json}[use]
+    timings = [timeit.timeit(run, number=1) for _ in range(3)]
+    return min(timings) * 1e6 / len(objects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--objects', type=int, default=100000)
+    parser.add_argument('--keys', type=int, default=2)
+    parser.add_argument('--size', type=int, default=50,
+                        help='Number of attributes of the objects')
+    parser.add_argument('--json', action='store_true',
+                        help='Output the results as JSON')
+    args = parser.parse_args()
+
+    manager = ProjectManager(FakeGitlab())
+    objects = [Project(manager, payload(i, args.size))
+               for i in range(args.objects)]
+    keys = sorted(payload(0, args.size))[:args.keys]
+
+    results = {}
+    for use in ('lookup', 'dict', 'json'):
+        for name, accessor in (('before', merged_attributes),
+                               ('after', view_attributes)):
+            key = '%s/%s' % (use, name)
+            results[key] = measure(objects, accessor, use, keys)
+
+    if args.json:
+        print(json.dumps({'objects': args.objects, 'keys': args.keys,
+                          'size': args.size, 'us_per_object': results},
+                         sort_keys=True))
+        return
+
+    print('%d objects with %d attributes, %d keys read per object' %
+          (args.objects, args.size, args.keys))
+    for key in sorted(results):
+        print('%-16s %8.3f us/object' % (key, results[key]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Measure the memory used by a large listing, with and without interning.
+
+The pages are served by a fake connection, so only the parsing done by
+GitlabList is measured. Requires python 3 (tracemalloc).
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import timeit
+import tracemalloc
+
+import requests
+
+import gitlab
+from gitlab import utils
+
+LABELS = ['bug', 'feature', 'documentation', 'security', 'performance']
+STATES = ['opened', 'closed']
+
+
+def issue(i):
+    author = i % 50
+    project = i % 200
+    return {
+        'id': i, 'iid': i // 200, 'project_id': project,
+        'title': 'Issue number %d' % i,
+        'description': 'Some description for issue %d' % i,
+        'state': STATES[i % 2],
+        'labels': [LABELS[i % 5], LABELS[(i + 2) % 5]],
+        'author': {
+            'id': author, 'name': 'User %d' % author,
+            'username': 'user%d' % author, 'state': 'active',
+            'avatar_url': 'https://gitlab.example.com/uploads/user/avatar/'
+                          '%d/avatar.png' % author,
+            'web_url': 'https://gitlab.example.com/user%d' % author,
+        },
+        'milestone': None, 'assignee': None, 'user_notes_count': i % 10,
+        'created_at': '2017-11-03T10:00:00.000Z',
+        'updated_at': '2017-11-04T10:00:00.000Z',
+        'web_url': 'https://gitlab.example.com/group/project%d/issues/%d' % (
+            project, i // 200),
+        'confidential': False, 'discussion_locked': None,
+    }
+
+
+class FakeGitlab(object):
+    """Serves the pages of the listing from memory."""
+
+    def __init__(self, items, per_page):
+        self.pages = []
+        for start in range(0, items, per_page):
+            page = [issue(i) for i in range(start, min(start + per_page,
+                                                       items))]
+            self.pages.append(json.dumps(page).encode())
+
+    def http_request(self, verb, url, query_data={}, **kwargs):
+        page = int(url.rsplit('=', 1)[1]) if '=' in url else 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.pages[page - 1]
+        response.headers['Content-Type'] = 'application/json'
+        if page < len(self.pages):
+            response.headers['Link'] = (
+                '<http://localhost/api/v4/issues?page=%d>; rel="next"' %
+                (page + 1))
+        return response
+
+
+def measure(fake_gl, intern_table):
+    gc.collect()
+    tracemalloc.start()
+    start = timeit.default_timer()
+    items = list(gitlab.GitlabList(fake_gl, '/issues', {},
+                                   intern_table=intern_table))
+    elapsed = timeit.default_timer() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--json', action='store_true',
+                        help='Output the results as JSON')
+    args = parser.parse_args()
+
+    fake_gl = FakeGitlab(args.items, args.per_page)
+    plain_size, plain_time = measure(fake_gl, None)
+    interned_size, interned_time = measure(fake_gl, utils.InternTable())
+
+    results = {
+        'items': args.items,
+        'plain': {'bytes': plain_size, 'seconds': plain_time},
+        'interned': {'bytes': interned_size, 'seconds': interned_time},
+        'reduction': 1 - float(interned_size) / plain_size,
+    }
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+        return
+
+    print('%d items' % args.items)
+    for key in ('plain', 'interned'):
+        print('%-9s %8.1f MiB %7.2f s' % (key, results[key]['bytes'] / 2.0**20,
+                                          results[key]['seconds']))
+    print('reduction %7.1f %%' % (results['reduction'] * 100))
+
+
+if __name__ == '__main__':
+    main()
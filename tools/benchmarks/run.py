@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Gauvain Pocentek <gauvain@pocentek.net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Run the benchmark suite against the fake gitlab server.
+
+The results are written as JSON (in bench-results/ by default), and can be
+compared with a previous run:
+
+    tox -ebench
+    tox -ebench -- --compare bench-results/20171201-101010.json
+
+Benchmarks:
+
+* list_offset: items/s for a complete listing with offset pagination
+* list_keyset: items/s for a listing generator (keyset pagination)
+* objects: objects/s and bytes/object for the RESTObject creation
+* stream: bytes/s for a streamed raw file download
+* startup: seconds to import gitlab, and to run the CLI
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+import gitlab
+from gitlab import transport
+from gitlab.tests.fakeserver import FakeGitlabServer
+
+
+TRANSPORTS = {
+    'requests': lambda: None,
+    'urllib3': transport.Urllib3Transport,
+}
+
+
+def client(server, args):
+    return gitlab.Gitlab(server.url, private_token='token', api_version=4,
+                         transport=TRANSPORTS[args.transport]())
+
+
+def best(func, repeat):
+    # Return the result and the best time of `repeat` runs
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = timeit.default_timer()
+        result = func()
+        timings.append(timeit.default_timer() - start)
+    return result, min(timings)
+
+
+def bench_list_offset(server, args):
+    project = client(server, args).projects.get(1, lazy=True)
+    items, seconds = best(
+        lambda: len(project.issues.list(all=True, per_page=args.per_page)),
+        args.repeat)
+    return {'items': items, 'seconds': seconds,
+            'items_per_second': items / seconds}
+
+
+def bench_list_keyset(server, args):
+    gl = client(server, args)
+    items, seconds = best(
+        lambda: sum(1 for _ in gl.projects.list(as_list=False)), args.repeat)
+    return {'items': items, 'seconds': seconds,
+            'items_per_second': items / seconds}
+
+
+def bench_objects(server, args):
+    manager = client(server, args).projects.get(1, lazy=True).issues
+    data = manager.gitlab.http_list(manager.path, all=True,
+                                    per_page=args.per_page)
+
+    def create():
+        return [manager._create_object(item) for item in data]
+
+    _, seconds = best(create, args.repeat)
+    result = {'objects': len(data), 'seconds': seconds,
+              'objects_per_second': len(data) / seconds,
+              'bytes_per_object': None}
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        objects = create()
+        result['bytes_per_object'] = (tracemalloc.get_traced_memory()[0] /
+                                      float(len(objects)))
+        tracemalloc.stop()
+    return result
+
+
+def bench_stream(server, args):
+    project = client(server, args).projects.get(1, lazy=True)
+
+    def download():
+        sizes = []
+        project.files.raw('README.md', 'master', streamed=True,
+                          chunk_size=args.chunk_size,
+                          action=lambda chunk: sizes.append(len(chunk)))
+        return sum(sizes)
+
+    size, seconds = best(download, args.repeat)
+    return {'bytes': size, 'seconds': seconds,
+            'bytes_per_second': size / seconds}
+
+
+def bench_startup(server, args):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        config = os.path.join(tmpdir, 'python-gitlab.cfg')
+        with open(config, 'w') as f:
+            f.write('[global]\ndefault = fake\n\n[fake]\nurl = %s\n'
+                    'private_token = token\napi_version = 4\n' % server.url)
+        # the CLI parses sys.argv: run it as a script so that argv[0] is
+        # the script and not the options
+        script = os.path.join(tmpdir, 'gitlab-cli.py')
+        with open(script, 'w') as f:
+            f.write('import gitlab.cli\ngitlab.cli.main()\n')
+        commands = collections.OrderedDict([
+            ('import', ['-c', 'import gitlab']),
+            ('cli_version', [script, '--version']),
+            ('cli_list', [script, '--config-file', config, 'project',
+                          'list']),
+        ])
+        # the script directory replaces the current one in sys.path
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(gitlab.__file__))] +
+            [p for p in [env.get('PYTHONPATH')] if p])
+        result = {}
+        for name, command in commands.items():
+            command = [sys.executable] + command
+            with open(os.devnull, 'w') as devnull:
+                def run():
+                    return subprocess.call(command, env=env, stdout=devnull,
+                                           stderr=devnull)
+                status, seconds = best(run, args.repeat)
+            if status != 0:
+                # run it again to show the error
+                subprocess.check_call(command, env=env)
+            result[name] = seconds
+        return result
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+BENCHMARKS = collections.OrderedDict([
+    ('list_offset', bench_list_offset),
+    ('list_keyset', bench_list_keyset),
+    ('objects', bench_objects),
+    ('stream', bench_stream),
+    ('startup', bench_startup),
+])
+
+
+def git_revision():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                stderr=devnull).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, filename):
+    with open(filename) as f:
+        previous = json.load(f)['results']
+    print('%-12s %-20s %14s %14s %8s' % ('benchmark', 'metric', 'previous',
+                                         'current', 'ratio'))
+    for name, metrics in results.items():
+        for metric, value in sorted(metrics.items()):
+            old = previous.get(name, {}).get(metric)
+            if not value or not old:
+                continue
+            print('%-12s %-20s %14.4g %14.4g %8.2f' % (name, metric, old,
+                                                       value, value / old))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--items', type=int, default=5000,
+                        help='Number of items of the listings')
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--file-size', type=int, default=50 * 2**20)
+    parser.add_argument('--chunk-size', type=int, default=2**16)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Latency added by the server, in seconds')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS),
+                        default='requests')
+    parser.add_argument('--only', action='append', choices=list(BENCHMARKS),
+                        help='Run only this benchmark (can be repeated)')
+    parser.add_argument('--output',
+                        help='Result file (default: bench-results/DATE.json, '
+                             '"-" for stdout)')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='Compare with a previous result file')
+    args = parser.parse_args()
+
+    now = datetime.datetime.utcnow()
+    report = {
+        'meta': {
+            'date': now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'revision': git_revision(),
+            'version': gitlab.__version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'options': vars(args),
+        },
+        'results': collections.OrderedDict(),
+    }
+
+    server = FakeGitlabServer(projects=args.items, children=args.items,
+                              file_size=args.file_size, latency=args.latency)
+    with server:
+        for name, func in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+            print('running %s...' % name, file=sys.stderr)
+            report['results'][name] = func(server, args)
+
+    output = args.output
+    if output is None:
+        output = os.path.join('bench-results',
+                              '%s.json' % now.strftime('%Y%m%d-%H%M%S'))
+    if output == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        if os.path.dirname(output) and not os.path.isdir(
+                os.path.dirname(output)):
+            os.makedirs(os.path.dirname(output))
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('results written to %s' % output, file=sys.stderr)
+
+    if args.compare:
+        compare(report['results'], args.compare)
+    elif output != '-':
+        for name, metrics in report['results'].items():
+            for metric, value in sorted(metrics.items()):
+                print('%-12s %-20s %s' % (name, metric, value))
+
+
+if __name__ == '__main__':
+    main()